@@ -0,0 +1,87 @@
+"""
+Estadísticas de capacidad (monitor/analitica.py) para muchos hosts:
+host a host con obtener_mediciones() + statistics (lo que haría un
+informe sin el módulo) frente a una sola carga en arrays calculada con
+NumPy o en Python puro y, con --pg, frente al cálculo en Postgres
+(percentile_cont).
+
+Por defecto usa un SQLite temporal; con --pg, el Postgres configurado
+(PG_*), con hosts "bench-*" que se borran al terminar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_analitica --hosts 100 --filas 500000
+    python -m benchmarks.bench_analitica --hosts 100 --filas 500000 --pg
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.bench_consultas_historico import PASO_SEG, poblar_pg, poblar_sqlite
+from monitor import analitica, historico
+
+
+def host_a_host(nombres: list[str], desde: datetime, hasta: datetime) -> dict:
+    res = {}
+    for h in nombres:
+        filas = historico.obtener_mediciones(h, desde, hasta)
+        res[h] = {}
+        for m in analitica.METRICAS:
+            valores = [f[m] for f in filas if f[m] is not None]
+            if len(valores) > 1:
+                q = statistics.quantiles(valores, n=100, method="inclusive")
+                res[h][m] = (statistics.fmean(valores), statistics.pstdev(valores), q[49], q[94], q[98])
+    return res
+
+
+def cronometrar(funcion) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--filas", type=int, default=500_000)
+    parser.add_argument("--pg", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["PG_ENABLED"] = "true" if args.pg else "false"
+    tmp = tempfile.TemporaryDirectory()
+    historico.DB_PATH = Path(tmp.name) / "historico.db"
+    inicio = datetime.now() - timedelta(seconds=args.filas // args.hosts * PASO_SEG)
+    desde, hasta = inicio - timedelta(seconds=1), datetime.now() + timedelta(seconds=1)
+    nombres = [f"bench-{i:04d}" for i in range(args.hosts)]
+
+    try:
+        (poblar_pg if args.pg else poblar_sqlite)(0, args.filas, args.hosts, inicio)
+        print(f"Backend: {'Postgres' if args.pg else 'SQLite'}, {args.hosts} hosts, {args.filas} filas\n")
+
+        tiempos = {"host a host (statistics)": cronometrar(lambda: host_a_host(nombres, desde, hasta))}
+        carga = cronometrar(lambda: analitica.cargar_ventana(desde, hasta))
+        ventana = analitica.cargar_ventana(desde, hasta)
+        tiempos["carga en arrays"] = carga
+        if analitica.np is not None:
+            tiempos["  + cálculo NumPy"] = cronometrar(lambda: analitica._calcular_numpy(ventana, analitica.UMBRALES, 300))
+        tiempos["  + cálculo Python"] = cronometrar(lambda: analitica._calcular_python(ventana, analitica.UMBRALES, 300))
+        if args.pg:
+            tiempos["en Postgres (SQL)"] = cronometrar(
+                lambda: analitica._calcular_pg(desde, hasta, None, analitica.UMBRALES, 300)
+            )
+        for nombre, seg in tiempos.items():
+            print(f"{nombre:<28}{seg * 1000:>10.0f} ms")
+    finally:
+        if args.pg:
+            with historico._pool_pg.conexion() as conn:
+                conn.cursor().execute("DELETE FROM mediciones WHERE hostname LIKE 'bench-%%'")
+        historico.cerrar()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Backfill del historial de Zabbix (monitor/backfill.py) contra el Zabbix
+simulado: filas/s de extremo a extremo, en SQLite (base temporal) o en
+Postgres con --pg (configuración PG_* del .env).
+
+Con --pg además compara solo la escritura de las mismas filas: INSERT
+multi-fila (execute_values, como guardar_medicion) contra COPY FROM STDIN.
+Las filas del benchmark se borran al terminar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_backfill --hosts 20 --dias 7
+    python -m benchmarks.bench_backfill --hosts 20 --dias 7 --pg
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado, nombres_simulados
+
+
+def filas_sinteticas(n: int, hostname: str) -> list[tuple]:
+    from monitor import historico
+
+    base = datetime.now() - timedelta(days=1)
+    zbx = {"hostname": hostname, "cpu_uso_pct": 42.0, "ram_uso_pct": 61.5,
+           "disco_c_uso_pct": 70.1, "swap_pfree_pct": 88.0, "servicios": {"AnyDesk": 1}}
+    return [
+        historico._fila_medicion({"zabbix": zbx}, ts=base + timedelta(seconds=i), medicion_id=str(uuid.uuid4()))
+        for i in range(n)
+    ]
+
+
+def comparar_escritura_pg(n: int) -> None:
+    from monitor import backfill, historico
+
+    hostname = "BENCH-BACKFILL"
+    resultados = {}
+    for nombre, escribir in (
+        ("INSERT multi-fila", lambda filas: historico._guardar_filas_pg(filas)),
+        ("COPY", lambda filas: backfill._escribir_pg(filas, None)),
+    ):
+        filas = filas_sinteticas(n, hostname)
+        inicio = time.perf_counter()
+        for i in range(0, n, 1440):  # un día a paso de 60 s por llamada
+            escribir(filas[i:i + 1440])
+        resultados[nombre] = n / (time.perf_counter() - inicio)
+        historico._consultar_pg("DELETE FROM mediciones WHERE hostname = %s RETURNING 1", (hostname,))
+
+    print(f"\nEscritura en Postgres de {n} filas:")
+    for nombre, fps in resultados.items():
+        print(f"  {nombre:<20}{fps:>10.0f} filas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--dias", type=float, default=7)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    parser.add_argument("--latencia-ms", type=float, default=2.0)
+    parser.add_argument("--pg", action="store_true", help="cargar en Postgres (si no, SQLite temporal)")
+    parser.add_argument("--filas-escritura", type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.environ["PG_ENABLED"] = "true" if args.pg else "false"
+    from monitor import backfill, historico
+    from monitor.zabbix_client import ZabbixClient
+
+    tmp = tempfile.TemporaryDirectory()
+    if not args.pg:
+        historico.DB_PATH = Path(tmp.name) / "historico.db"
+
+    hosts = nombres_simulados(args.hosts)
+    hasta = datetime.now()
+    desde = hasta - timedelta(days=args.dias)
+    try:
+        with ServidorZabbixSimulado(hosts, latencia_seg=args.latencia_ms / 1000) as srv:
+            cliente = ZabbixClient(srv.url, "token-bench", pool_size=args.concurrencia, cache=None)
+            s = backfill.ejecutar_backfill(desde, hasta, hosts=hosts, cliente=cliente,
+                                           concurrencia=args.concurrencia)
+            cliente.cerrar()
+        destino = "Postgres (COPY)" if args.pg else "SQLite (executemany)"
+        print(f"Backfill a {destino}: {args.hosts} hosts x {args.dias:g} días, "
+              f"concurrencia {args.concurrencia}, Zabbix a {args.latencia_ms} ms")
+        print(f"  {s['hechas']} ventanas, {s['filas']} filas en {s['seg']:.2f} s "
+              f"-> {s['filas_por_seg']:.0f} filas/s, {s['errores']} errores")
+
+        if args.pg:
+            historico._consultar_pg(
+                "DELETE FROM mediciones WHERE hostname = ANY(%s) RETURNING 1", (hosts,)
+            )
+            historico._consultar_pg(
+                "DELETE FROM backfill_puntos WHERE hostname = ANY(%s) RETURNING 1", (hosts,)
+            )
+            comparar_escritura_pg(args.filas_escritura)
+    finally:
+        historico.cerrar()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Latencia de las consultas del histórico multi-host según crece la tabla:
+obtener_mediciones (un host, última hora), obtener_ultimas_por_host y
+obtener_resumen(hostname=...). Con índices (hostname, ts) deben mantenerse
+planas aunque la tabla pase de miles a millones de filas.
+
+Por defecto usa un SQLite temporal. Con --pg usa el Postgres configurado
+(PG_*): inserta filas de hosts "bench-*" y las borra al terminar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_consultas_historico --hosts 200 --tamanos 10000,100000,1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from monitor import historico
+
+PASO_SEG = 60
+
+
+def poblar_sqlite(desde: int, hasta: int, hosts: int, inicio: datetime) -> None:
+    lote = []
+    for i in range(desde, hasta):
+        ts = inicio + timedelta(seconds=(i // hosts) * PASO_SEG)
+        lote.append((
+            str(uuid.uuid4()), ts, str(i % hosts), f"bench-{i % hosts:04d}", "zabbix",
+            float(i % 100), 50.0, 60.0, 90.0, "OK", None,
+        ))
+        if len(lote) == 50000:
+            historico._guardar_filas_sqlite(lote)
+            lote = []
+    if lote:
+        historico._guardar_filas_sqlite(lote)
+
+
+def poblar_pg(desde: int, hasta: int, hosts: int, inicio: datetime) -> None:
+    with historico._pool_pg.conexion() as conn:
+        conn.cursor().execute(
+            """
+            INSERT INTO mediciones (medicion_id, ts, hostid, hostname, fuente,
+                                    cpu_uso, ram_uso, disco_c_uso, swap_pfree, estado_global)
+            SELECT gen_random_uuid(), %s + (i / %s) * %s * interval '1 second', (i %% %s)::text,
+                   'bench-' || lpad((i %% %s)::text, 4, '0'), 'zabbix',
+                   (i %% 100)::float, 50, 60, 90, 'OK'
+            FROM generate_series(%s, %s - 1) AS i
+            """,
+            (inicio, hosts, PASO_SEG, hosts, hosts, desde, hasta),
+        )
+        conn.cursor().execute("ANALYZE mediciones")
+
+
+def medir(funcion, repeticiones: int = 50) -> float:
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t)
+    return statistics.median(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--tamanos", default="10000,100000,1000000")
+    parser.add_argument("--pg", action="store_true")
+    args = parser.parse_args()
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+
+    os.environ["PG_ENABLED"] = "true" if args.pg else "false"
+    tmp = tempfile.TemporaryDirectory()
+    historico.DB_PATH = Path(tmp.name) / "historico.db"
+    poblar = poblar_pg if args.pg else poblar_sqlite
+    inicio = datetime.now() - timedelta(seconds=tamanos[-1] // args.hosts * PASO_SEG)
+    host = "bench-0007"
+    nombres = [f"bench-{i:04d}" for i in range(args.hosts)]
+
+    print(f"Backend: {'Postgres' if args.pg else 'SQLite'}, {args.hosts} hosts (mediana, ms)\n")
+    print(f"{'filas':>10}{'rango 1 h':>12}{'últimas/host':>15}{'últimas (lista)':>18}{'resumen host':>15}")
+    try:
+        hechas = 0
+        for n in tamanos:
+            poblar(hechas, n, args.hosts, inicio)
+            hechas = n
+            fin = inicio + timedelta(seconds=n // args.hosts * PASO_SEG)
+            rango = medir(lambda: historico.obtener_mediciones(host, fin - timedelta(hours=1), fin))
+            ultimas = medir(lambda: historico.obtener_ultimas_por_host(), 10)
+            lista = medir(lambda: historico.obtener_ultimas_por_host(nombres), 10)
+            resumen = medir(lambda: historico.obtener_resumen(20, hostname=host))
+            print(f"{n:>10}{rango:>12.2f}{ultimas:>15.2f}{lista:>18.2f}{resumen:>15.2f}")
+    finally:
+        if args.pg:
+            with historico._pool_pg.conexion() as conn:
+                conn.cursor().execute("DELETE FROM mediciones WHERE hostname LIKE 'bench-%%'")
+        historico.cerrar()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
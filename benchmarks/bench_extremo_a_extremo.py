@@ -0,0 +1,166 @@
+"""
+Benchmark de extremo a extremo del camino caliente contra el Zabbix simulado
+(en otro proceso), usando el código real del cliente:
+
+- refresco de un host: ZabbixClient nuevo + obtener_diagnostico_host, como
+  en cada reconocimiento_inicial();
+- tendencias: calcular_uso_sostenido (trend.get + agregados);
+- flota: obtener_diagnostico_flota sobre todos los hosts simulados;
+- opcionalmente reconocimiento_inicial() completo (--con-reconocimiento;
+  incluye lectura local, ping y Netdata según la configuración).
+
+Informa latencias p50/p95/p99, peticiones HTTP por refresco y hosts/s.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_extremo_a_extremo --hosts 200 --refrescos 50 --latencia-ms 5
+    python -m benchmarks.bench_extremo_a_extremo --tasa-error-http 0.05   # con reintentos
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def percentiles(muestras_seg: list[float]) -> str:
+    ms = sorted(m * 1000 for m in muestras_seg)
+    if len(ms) < 2:
+        return f"p50 {ms[0]:.1f} ms" if ms else "sin muestras"
+    q = statistics.quantiles(ms, n=100, method="inclusive")
+    return f"p50 {q[49]:7.1f}  p95 {q[94]:7.1f}  p99 {q[98]:7.1f} ms"
+
+
+class Simulador:
+    """Zabbix simulado en un subproceso, con acceso a sus contadores."""
+
+    def __init__(self, args):
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "benchmarks.mock_zabbix",
+                "--hosts", str(args.hosts),
+                "--latencia-ms", str(args.latencia_ms),
+                "--jitter-ms", str(args.jitter_ms),
+                "--tasa-error-http", str(args.tasa_error_http),
+                "--tasa-error-api", str(args.tasa_error_api),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.url = self.proc.stdout.readline().strip()
+        self._base = self.url.rsplit("/", 1)[0]
+
+    def contadores(self, reiniciar: bool = False) -> dict:
+        sufijo = "?reiniciar=1" if reiniciar else ""
+        with urllib.request.urlopen(f"{self._base}/estadisticas{sufijo}") as resp:
+            return json.loads(resp.read())
+
+    def cerrar(self) -> None:
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--refrescos", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--tasa-error-http", type=float, default=0.0)
+    parser.add_argument("--tasa-error-api", type=float, default=0.0)
+    parser.add_argument("--modo", choices=["lastvalue", "history"], default="lastvalue")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--con-reconocimiento", action="store_true")
+    args = parser.parse_args()
+
+    sim = Simulador(args)
+    # La configuración se lee al importar: apuntarla al simulado antes.
+    os.environ["ZABBIX_URL"] = sim.url
+    os.environ["ZABBIX_TOKEN"] = "token-bench"
+    os.environ["ZABBIX_MODO_VALORES"] = args.modo
+
+    from monitor import tendencias
+    from monitor.cache_resolucion import CacheResolucion
+    from monitor.flota import obtener_diagnostico_flota
+    from monitor.zabbix_client import ZabbixClient
+
+    try:
+        print(f"Zabbix simulado: {args.hosts} hosts, {args.latencia_ms} ms (+{args.jitter_ms} jitter), "
+              f"errores HTTP {args.tasa_error_http:.0%}, API {args.tasa_error_api:.0%}, modo {args.modo}\n")
+
+        # --- Refresco de un host (caché de resolución en memoria, como en la app) ---
+        cache = CacheResolucion(ruta=None)
+        tiempos, fallos = [], 0
+        sim.contadores(reiniciar=True)
+        for _ in range(args.refrescos):
+            inicio = time.perf_counter()
+            try:
+                with ZabbixClient(sim.url, "token-bench", cache=cache, modo_valores=args.modo) as cliente:
+                    cliente.obtener_diagnostico_host("WIN-LAPTOP")
+            except Exception:
+                fallos += 1
+            tiempos.append(time.perf_counter() - inicio)
+        c = sim.contadores()
+        print(f"{'refresco host':<16}{percentiles(tiempos)}   "
+              f"{c['peticiones_http'] / args.refrescos:.2f} peticiones/refresco, {fallos} fallos")
+
+        # --- Tendencias 90 días ---
+        tiempos = []
+        with ZabbixClient(sim.url, "token-bench", cache=cache) as cliente:
+            hostid = cliente.get_host_id("WIN-LAPTOP")
+            for _ in range(max(args.refrescos // 5, 1)):
+                tendencias._cache.clear()
+                inicio = time.perf_counter()
+                try:
+                    tendencias.calcular_uso_sostenido(cliente, hostid)
+                except Exception:
+                    pass
+                tiempos.append(time.perf_counter() - inicio)
+        print(f"{'tendencias 90d':<16}{percentiles(tiempos)}")
+
+        # --- Flota ---
+        sim.contadores(reiniciar=True)
+        stats: dict = {}
+        with ZabbixClient(sim.url, "token-bench", cache=None, pool_size=args.concurrencia,
+                          modo_valores=args.modo) as cliente:
+            duraciones = [
+                r["duracion_seg"]
+                for r in obtener_diagnostico_flota(
+                    grupo="Simulados", cliente=cliente, max_concurrencia=args.concurrencia,
+                    estadisticas=stats,
+                )
+            ]
+        c = sim.contadores()
+        print(f"{'flota (bloque)':<16}{percentiles(duraciones)}   "
+              f"{stats['hosts_por_seg']:.0f} hosts/s, {c['peticiones_http']} peticiones, "
+              f"{stats['errores']} hosts con error")
+
+        # --- reconocimiento_inicial completo ---
+        if args.con_reconocimiento:
+            from monitor.reconocimiento import reconocimiento_inicial
+
+            tiempos = []
+            por_fase: dict[str, list[float]] = {}
+            sim.contadores(reiniciar=True)
+            n = max(args.refrescos // 10, 1)
+            for _ in range(n):
+                inicio = time.perf_counter()
+                datos = reconocimiento_inicial()
+                tiempos.append(time.perf_counter() - inicio)
+                for fase, seg in datos["fases"]["tiempos_seg"].items():
+                    por_fase.setdefault(fase, []).append(seg)
+            c = sim.contadores()
+            print(f"{'reconocimiento':<16}{percentiles(tiempos)}   "
+                  f"{c['peticiones_http'] / n:.2f} peticiones/refresco")
+            # Fases en paralelo: el total se acerca a la más lenta, no a la suma.
+            for fase, segs in sorted(por_fase.items(), key=lambda x: -sum(x[1])):
+                print(f"  {fase:<14}{percentiles(segs)}")
+    finally:
+        sim.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Diagnóstico de una flota simulada: host a host (obtener_diagnostico_host en
+serie) contra obtener_diagnostico_flota (resolución en bloque, bloques en
+paralelo). Informa peticiones HTTP y hosts por segundo.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_flota --hosts 500 --latencia-ms 5
+"""
+
+import argparse
+import time
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor.flota import obtener_diagnostico_flota
+from monitor.zabbix_client import ZabbixClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--bloque", type=int, default=50)
+    args = parser.parse_args()
+
+    nombres = [f"VM-{i:04d}" for i in range(args.hosts)]
+    with ServidorZabbixSimulado(nombres, latencia_seg=args.latencia_ms / 1000) as srv:
+        # Host a host, en serie (como reconocimiento_inicial para un solo host).
+        cliente = ZabbixClient(srv.url, "token-bench", cache=None)
+        muestra = nombres[: min(50, len(nombres))]
+        inicio = time.perf_counter()
+        for nombre in muestra:
+            cliente.obtener_diagnostico_host(nombre)
+        seg = time.perf_counter() - inicio
+        print(f"{'host a host':<14}{srv.peticiones_http / len(muestra):>8.2f} peticiones/host"
+              f"{len(muestra) / seg:>12.1f} hosts/s  (muestra de {len(muestra)})")
+
+        srv.reiniciar_contadores()
+        cliente = ZabbixClient(srv.url, "token-bench", cache=None, pool_size=args.concurrencia)
+        stats: dict = {}
+        n_ok = sum(
+            r["error"] is None
+            for r in obtener_diagnostico_flota(
+                grupo="Simulados", cliente=cliente, max_concurrencia=args.concurrencia,
+                tamano_bloque=args.bloque, estadisticas=stats,
+            )
+        )
+        print(f"{'flota':<14}{srv.peticiones_http / stats['hosts']:>8.2f} peticiones/host"
+              f"{stats['hosts_por_seg']:>12.1f} hosts/s  ({n_ok}/{stats['hosts']} OK, "
+              f"{srv.peticiones_http} peticiones)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Tiempo de detectar_hipervisor (monitor/sistema_local.py) en esta máquina,
+sin memorizar y memorizada. La corrección por rama se comprueba en
+tests/test_hipervisor.py.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_hipervisor
+"""
+
+import argparse
+import time
+
+from monitor import sistema_local
+from monitor.sistema_local import detectar_hipervisor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"Esta máquina: {detectar_hipervisor()}")
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        sistema_local._detectar_hipervisor.cache_clear()
+        detectar_hipervisor()
+    sin_memo = (time.perf_counter() - inicio) / args.repeticiones
+    inicio = time.perf_counter()
+    for _ in range(args.repeticiones):
+        detectar_hipervisor()
+    memo = (time.perf_counter() - inicio) / args.repeticiones
+    print(f"sin memorizar {sin_memo * 1e6:.0f} µs, memorizada {memo * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compara el diagnóstico de un host item a item (un history.get por item)
+contra la lectura en lote por value_type, usando el Zabbix simulado.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_historial_lote --latencia-ms 5 --repeticiones 20
+"""
+
+import argparse
+import time
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor.cache_resolucion import CacheResolucion
+from monitor.zabbix_client import ZabbixClient, METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+
+
+def diagnostico_item_a_item(cliente: ZabbixClient, hostname: str) -> dict:
+    """Reproduce el camino anterior: un history.get por cada item."""
+    hostid = cliente.get_host_id(hostname)
+    items = cliente.get_items_for_host(hostid, list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE))
+    diag = {"hostname": hostname, "hostid": hostid, "servicios": {}}
+    for key_zbx, (campo, value_type) in METRICAS_DIAGNOSTICO.items():
+        diag[campo] = cliente.get_last_history_value(items[key_zbx], value_type=value_type) if key_zbx in items else None
+    for key_zbx, nombre in SERVICIOS_CLAVE.items():
+        if key_zbx in items:
+            diag["servicios"][nombre] = int(cliente.get_last_history_value(items[key_zbx], value_type=3))
+    return diag
+
+
+def medir(srv: ServidorZabbixSimulado, funcion, repeticiones: int, cache=None, modo="history") -> tuple[float, float]:
+    cliente = ZabbixClient(srv.url, "token-bench", cache=cache, modo_valores=modo)
+    funcion(cliente, "WIN-LAPTOP")  # calentamiento (y caché, si la hay)
+    srv.reiniciar_contadores()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(cliente, "WIN-LAPTOP")
+    total = time.perf_counter() - inicio
+    return srv.peticiones_http / repeticiones, total / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencia-ms", type=float, default=5.0, help="latencia inyectada por petición")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with ServidorZabbixSimulado(["WIN-LAPTOP"], latencia_seg=args.latencia_ms / 1000) as srv:
+        cliente = ZabbixClient(srv.url, "token-bench", cache=None, modo_valores="history")
+        diag = cliente.obtener_diagnostico_host("WIN-LAPTOP")
+        diag.pop("frescura_seg")
+        assert diagnostico_item_a_item(cliente, "WIN-LAPTOP") == diag
+
+        rt_antes, ms_antes = medir(srv, diagnostico_item_a_item, args.repeticiones)
+        rt_ahora, ms_ahora = medir(srv, ZabbixClient.obtener_diagnostico_host, args.repeticiones)
+        rt_cache, ms_cache = medir(
+            srv, ZabbixClient.obtener_diagnostico_host, args.repeticiones,
+            cache=CacheResolucion(ruta=None),
+        )
+        rt_last, ms_last = medir(
+            srv, ZabbixClient.obtener_diagnostico_host, args.repeticiones,
+            cache=CacheResolucion(ruta=None), modo="lastvalue",
+        )
+
+    print(f"{'modo':<22}{'peticiones/refresh':>20}{'ms/refresh':>14}")
+    print(f"{'item a item':<22}{rt_antes:>20.1f}{ms_antes:>14.1f}")
+    print(f"{'en lote':<22}{rt_ahora:>20.1f}{ms_ahora:>14.1f}")
+    print(f"{'lote + caché':<22}{rt_cache:>20.1f}{ms_cache:>14.1f}")
+    print(f"{'lastvalue + caché':<22}{rt_last:>20.1f}{ms_last:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Memoria pico y tiempo al traer 30 días de historial de 1 minuto de un item:
+un único history.get para toda la ventana contra el recorrido por tramos
+(fila a fila y en arrays compactos, con y sin concurrencia).
+
+El Zabbix simulado corre en otro proceso para que tracemalloc solo mida
+al cliente.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_historial_rango --dias 30
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+import tracemalloc
+from array import array
+
+from monitor.zabbix_client import ZabbixClient
+
+
+def medir(nombre: str, funcion) -> None:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    n = funcion()
+    seg = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<28}{n:>10}{seg:>10.2f}{pico / 1024 / 1024:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--bloque-horas", type=int, default=6)
+    args = parser.parse_args()
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_zabbix"], stdout=subprocess.PIPE, text=True
+    )
+    try:
+        url = proc.stdout.readline().strip()
+        cliente = ZabbixClient(url, "token-bench", cache=None)
+        itemid = cliente.get_items_for_host(cliente.get_host_id("WIN-LAPTOP"), ["system.cpu.util"])["system.cpu.util"]
+        hasta = int(time.time())
+        desde = hasta - args.dias * 86400
+        bloque = args.bloque_horas * 3600
+
+        def una_llamada():
+            filas = cliente._call_api("history.get", {
+                "output": ["clock", "value"], "history": 0, "itemids": [itemid],
+                "time_from": desde, "time_till": hasta, "sortfield": "clock", "sortorder": "ASC",
+            })
+            return len(filas)
+
+        def por_filas(concurrencia=1):
+            return sum(1 for _ in cliente.iterar_historial(itemid, 0, desde, hasta, bloque, concurrencia))
+
+        def compacto(concurrencia=1):
+            clocks, valores = array("q"), array("d")
+            for c, v in cliente.iterar_historial_bloques(itemid, 0, desde, hasta, bloque, concurrencia):
+                clocks.extend(c)
+                valores.extend(v)
+            return len(clocks)
+
+        print(f"{'modo':<28}{'filas':>10}{'seg':>10}{'pico (MiB)':>14}")
+        medir("un solo history.get", una_llamada)
+        medir("tramos, fila a fila", por_filas)
+        medir("tramos, fila a fila x4", lambda: por_filas(4))
+        medir("tramos, arrays compactos", compacto)
+        medir("tramos, arrays compactos x4", lambda: compacto(4))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
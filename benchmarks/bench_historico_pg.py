@@ -0,0 +1,84 @@
+"""
+Inserciones/s en el histórico Postgres: camino anterior (conexión nueva +
+CREATE TABLE en cada guardado) contra el pool de conexiones del proceso.
+Necesita un Postgres accesible con la configuración PG_* del .env.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_historico_pg --filas 500 --hilos 4
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psycopg2
+
+from monitor import historico
+from utils.config import PG_HOST, PG_PORT, PG_DB, PG_USER, PG_PASSWORD
+
+DIAG = {
+    "zabbix": {"cpu_uso_pct": 42.0, "ram_uso_pct": 61.5, "disco_c_uso_pct": 70.1, "swap_pfree_pct": 88.0},
+    "estado_global": "OK",
+}
+
+
+def _conectar():
+    return psycopg2.connect(
+        host=PG_HOST, port=int(PG_PORT), dbname=PG_DB, user=PG_USER, password=PG_PASSWORD or None,
+    )
+
+
+def guardar_sin_pool(diag: dict) -> None:
+    """Reproduce el camino anterior: _init_pg() y el INSERT con conexiones propias."""
+    conn = _conectar()
+    cur = conn.cursor()
+    cur.execute(historico._MIGRACIONES_PG[0][1][0])
+    conn.commit()
+    conn.close()
+
+    zbx = diag["zabbix"]
+    conn = _conectar()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO mediciones (ts, cpu_uso, ram_uso, disco_c_uso, swap_pfree, estado_global)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        (datetime.now(), zbx["cpu_uso_pct"], zbx["ram_uso_pct"], zbx["disco_c_uso_pct"],
+         zbx["swap_pfree_pct"], diag["estado_global"]),
+    )
+    conn.commit()
+    conn.close()
+
+
+def guardar_con_pool(diag: dict) -> None:
+    if not historico._guardar_medicion_pg(diag):
+        raise RuntimeError("El guardado en Postgres falló.")
+
+
+def medir(funcion, filas: int, hilos: int) -> float:
+    funcion(DIAG)  # calentamiento (pool y esquema)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ex:
+        list(ex.map(lambda _: funcion(DIAG), range(filas)))
+    return filas / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=500)
+    parser.add_argument("--hilos", type=int, default=1)
+    args = parser.parse_args()
+
+    antes = medir(guardar_sin_pool, args.filas, args.hilos)
+    ahora = medir(guardar_con_pool, args.filas, args.hilos)
+    historico.cerrar()
+
+    print(f"{'modo':<22}{'inserciones/s':>16}")
+    print(f"{'conexión por guardado':<22}{antes:>16.0f}")
+    print(f"{'pool':<22}{ahora:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Guardados/s en el histórico SQLite local: camino anterior (conectar,
+CREATE TABLE, INSERT y cerrar en cada guardado, journal por defecto)
+contra la conexión persistente en WAL. Opcionalmente con hilos lectores
+pidiendo obtener_resumen() a la vez.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_historico_sqlite --filas 2000 --lectores 2
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from monitor import historico
+
+DIAG = {
+    "zabbix": {"cpu_uso_pct": 42.0, "ram_uso_pct": 61.5, "disco_c_uso_pct": 70.1, "swap_pfree_pct": 88.0},
+    "estado_global": "OK",
+}
+
+
+def guardar_sin_conexion_persistente(diag: dict) -> None:
+    """Reproduce el camino anterior (_init_sqlite + conexión por guardado)."""
+    con = sqlite3.connect(historico.DB_PATH)
+    for _, sentencias in historico._MIGRACIONES_SQLITE:
+        for sql in sentencias:
+            try:
+                con.execute(sql)
+            except sqlite3.OperationalError:
+                pass  # columna ya añadida
+    con.commit()
+    con.close()
+
+    # Misma fila que el camino actual (_COLUMNAS), para comparar solo la conexión.
+    fila = historico._fila_medicion(diag)
+    con = sqlite3.connect(historico.DB_PATH)
+    con.execute(historico._SQL_INSERT_SQLITE, (fila[0], fila[1].isoformat(timespec="seconds")) + fila[2:])
+    con.commit()
+    con.close()
+
+
+def resumen_sin_conexion_persistente(n: int) -> None:
+    con = sqlite3.connect(historico.DB_PATH)
+    con.execute(
+        "SELECT AVG(cpu_uso), COUNT(*) FROM (SELECT cpu_uso FROM mediciones ORDER BY id DESC LIMIT ?)", (n,)
+    ).fetchone()
+    con.close()
+
+
+def medir(funcion, resumen, filas: int, lectores: int, ruta: Path) -> tuple[float, int]:
+    historico.cerrar()
+    historico.DB_PATH = ruta
+    funcion(DIAG)
+
+    fin = threading.Event()
+    lecturas = [0] * lectores
+
+    def leer(i):
+        while not fin.is_set():
+            resumen(20)
+            lecturas[i] += 1
+
+    hilos = [threading.Thread(target=leer, args=(i,)) for i in range(lectores)]
+    for h in hilos:
+        h.start()
+    inicio = time.perf_counter()
+    for _ in range(filas):
+        funcion(DIAG)
+    total = time.perf_counter() - inicio
+    fin.set()
+    for h in hilos:
+        h.join()
+    return filas / total, int(sum(lecturas) / total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=2000)
+    parser.add_argument("--lectores", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        antes = medir(guardar_sin_conexion_persistente, resumen_sin_conexion_persistente, args.filas, args.lectores, Path(tmp) / "antes.db")
+        ahora = medir(historico._guardar_medicion_sqlite, historico._obtener_resumen_sqlite, args.filas, args.lectores, Path(tmp) / "wal.db")
+        historico.cerrar()
+
+    print(f"{'modo':<26}{'guardados/s':>14}{'lecturas/s':>14}")
+    print(f"{'conexión por guardado':<26}{antes[0]:>14.0f}{antes[1]:>14}")
+    print(f"{'persistente + WAL':<26}{ahora[0]:>14.0f}{ahora[1]:>14}")
+
+
+if __name__ == "__main__":
+    main()
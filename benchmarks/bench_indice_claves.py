@@ -0,0 +1,78 @@
+"""
+Micro-benchmark del emparejado de claves de item: bucle anidado original
+(items x claves con `in`) contra IndiceClaves, sobre items sintéticos.
+Por debajo de indice_claves.UMBRAL_TRIE claves IndiceClaves usa el mismo
+bucle, así que ambas columnas coinciden.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_indice_claves --items 10000
+"""
+
+import argparse
+import random
+import time
+
+from monitor.indice_claves import IndiceClaves
+from monitor.zabbix_client import METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+
+
+def mapear_bucle(items: list[dict], search_keys: list[str]) -> dict:
+    mapping: dict[str, str] = {}
+    for item in items:
+        for key_wanted in search_keys:
+            if key_wanted in item["key_"]:
+                mapping[key_wanted] = item["itemid"]
+    return mapping
+
+
+def items_sinteticos(n: int, search_keys: list[str], semilla: int = 42) -> list[dict]:
+    """Parecido a una plantilla Windows con LLD: muchos perf_counter y discos."""
+    rnd = random.Random(semilla)
+    plantillas = [
+        "perf_counter_en[\"\\\\Processor Information({})\\\\% Processor Time\"]",
+        "vfs.fs.dependent.size[{}:,used]",
+        "net.if.in[\"Intel(R) Ethernet {}\"]",
+        "service.info[\"Svc{}\",state]",
+        "wmi.get[root\\\\cimv2,\"select * from Win32_{}\"]",
+    ]
+    items = []
+    for i in range(n):
+        if rnd.random() < 0.01:
+            key_ = rnd.choice(search_keys)
+            if rnd.random() < 0.5:
+                key_ = key_ + "[extra]"
+        else:
+            key_ = rnd.choice(plantillas).format(i)
+        items.append({"itemid": str(100000 + i), "key_": key_})
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument(
+        "--claves-extra", type=int, nargs="*", default=[0, 50, 200],
+        help="servicios adicionales a buscar, además de las claves del diagnóstico",
+    )
+    args = parser.parse_args()
+
+    print(f"{'claves':>8}{'bucle anidado (ms)':>22}{'IndiceClaves (ms)':>20}")
+    for extra in args.claves_extra:
+        search_keys = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
+        search_keys += [f'service.info["Srv{i}",state]' for i in range(extra)]
+        items = items_sinteticos(args.items, search_keys)
+        indice = IndiceClaves(search_keys)
+        assert indice.mapear(items) == mapear_bucle(items, search_keys)
+
+        tiempos = []
+        for funcion in (lambda: mapear_bucle(items, search_keys), lambda: indice.mapear(items)):
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                funcion()
+            tiempos.append((time.perf_counter() - inicio) / args.repeticiones * 1000)
+        print(f"{len(search_keys):>8}{tiempos[0]:>22.2f}{tiempos[1]:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Coste de guardar_medicion() para quien la llama (en la app, el hilo de Tk):
+escritura síncrona fila a fila contra la cola de escritura con flush en
+lotes. Usa un SQLite temporal, o Postgres si PG_ENABLED=true.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_ingesta --filas 5000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from monitor import historico
+
+DIAG = {
+    "zabbix": {"cpu_uso_pct": 42.0, "ram_uso_pct": 61.5, "disco_c_uso_pct": 70.1, "swap_pfree_pct": 88.0},
+    "estado_global": "OK",
+}
+
+
+def guardar_sincrono(diag: dict) -> None:
+    fila = historico._fila_medicion(diag)
+    if historico._pg_enabled() and historico._guardar_filas_pg([fila]):
+        return
+    historico._guardar_filas_sqlite([fila])
+
+
+def medir(funcion, filas: int) -> tuple[list[float], float]:
+    funcion(DIAG)
+    historico.vaciar()
+    tiempos = []
+    inicio = time.perf_counter()
+    for _ in range(filas):
+        t = time.perf_counter()
+        funcion(DIAG)
+        tiempos.append(time.perf_counter() - t)
+    historico.vaciar()
+    return tiempos, filas / (time.perf_counter() - inicio)
+
+
+def resumen(tiempos: list[float]) -> str:
+    q = statistics.quantiles([t * 1e6 for t in tiempos], n=100, method="inclusive")
+    return f"p50 {q[49]:8.1f}  p99 {q[98]:8.1f}  máx {max(tiempos) * 1e6:9.1f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        historico.DB_PATH = Path(tmp) / "historico.db"
+        t_sinc, fs_sinc = medir(guardar_sincrono, args.filas)
+        t_cola, fs_cola = medir(historico.guardar_medicion, args.filas)
+        stats = historico.estadisticas_ingesta()
+        historico.cerrar()
+
+    destino = "Postgres" if historico._pg_enabled() else "SQLite"
+    print(f"Destino: {destino}\n")
+    print(f"{'síncrono':<10}{resumen(t_sinc)}   {fs_sinc:8.0f} filas/s")
+    print(f"{'cola':<10}{resumen(t_cola)}   {fs_cola:8.0f} filas/s (incluye el vaciado final)")
+    print(f"\nCola: {stats['lotes']} lotes, flush prom {stats['flush_prom_ms']} ms, "
+          f"máx {stats['flush_max_ms']} ms, {stats['descartadas']} descartadas")
+
+
+if __name__ == "__main__":
+    main()
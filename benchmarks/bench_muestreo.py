@@ -0,0 +1,56 @@
+"""
+Coste del muestreo local en segundo plano (MuestreadorLocal de
+monitor/sistema_local.py): CPU del hilo (% de un núcleo) y CPU por muestra
+a varias frecuencias, si el tope MUESTREO_MAX_CPU_PCT tuvo que alargar el
+intervalo, y cuánto tardan ultimo() y ventana() con el búfer lleno.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_muestreo --segundos 5 --hz 1 10 100
+"""
+
+import argparse
+import time
+
+from monitor.sistema_local import MuestreadorLocal
+
+
+def cronometrar(funcion, n: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(n):
+        funcion()
+    return (time.perf_counter() - inicio) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--hz", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--capacidad", type=int, default=3600)
+    parser.add_argument("--max-cpu-pct", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'Hz':>6}{'muestras':>10}{'CPU hilo':>12}{'CPU/muestra':>14}{'intervalo final':>18}")
+    for hz in args.hz:
+        m = MuestreadorLocal(intervalo_seg=1 / hz, capacidad=args.capacidad, max_cpu_pct=args.max_cpu_pct)
+        m.iniciar()
+        time.sleep(args.segundos)
+        m.detener()
+        s = m.sobrecarga()
+        print(f"{hz:>6g}{s['muestras']:>10}{s['cpu_pct']:>11.2f}%{s['seg_por_muestra'] * 1e6:>12.0f} µs"
+              f"{s['intervalo_seg']:>16.3f} s")
+
+    # Consultas con el búfer lleno (muestras sintéticas: sin esperar capacidad segundos).
+    m = MuestreadorLocal(capacidad=args.capacidad)
+    m._leer_contadores()
+    ahora = time.time()
+    for i in range(args.capacidad):
+        m._muestrear()
+        m._ts[(m._siguiente - 1) % m.capacidad] = ahora - (args.capacidad - i)
+    print(f"\nCon {args.capacidad} muestras por serie:")
+    print(f"  ultimo()            {cronometrar(m.ultimo, 10_000) * 1e6:>10.1f} µs")
+    for seg in (60, 300, args.capacidad):
+        print(f"  ventana({seg:>5} s)    {cronometrar(lambda: m.ventana(seg), 50) * 1e3:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
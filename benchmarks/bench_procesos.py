@@ -0,0 +1,84 @@
+"""
+Top N de procesos por CPU y RAM: lo ingenuo (process_iter() con todos los
+atributos, cpu_percent() con intervalo, ordenar todo) frente a
+monitor/procesos.py (atributos restringidos, dos barridos, nlargest y
+nombres solo de los ganadores), en tiempo total y en CPU del proceso.
+
+--procesos arranca N procesos extra en reposo (`sleep`) para ver cómo
+escala con hosts de miles de procesos; se matan al terminar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_procesos --procesos 2000 --repeticiones 5
+"""
+
+import argparse
+import subprocess
+import time
+
+import psutil
+
+from monitor.procesos import RecolectorProcesos
+
+
+def ingenuo(n: int, intervalo: float) -> dict:
+    procesos = list(psutil.process_iter())
+    for p in procesos:
+        try:
+            p.cpu_percent(None)
+        except psutil.Error:
+            pass
+    time.sleep(intervalo)
+    filas = []
+    for p in procesos:
+        try:
+            d = p.as_dict()
+            d["cpu"] = p.cpu_percent(None)
+            filas.append(d)
+        except psutil.Error:
+            pass
+    por_cpu = sorted(filas, key=lambda d: d["cpu"], reverse=True)[:n]
+    por_ram = sorted(filas, key=lambda d: d["memory_info"].rss if d["memory_info"] else 0, reverse=True)[:n]
+    return {"cpu": por_cpu, "ram": por_ram}
+
+
+def medir(funcion, repeticiones: int) -> tuple[float, float]:
+    """Mediana de (segundos de pared, segundos de CPU) por llamada."""
+    pared, cpu = [], []
+    for _ in range(repeticiones):
+        p0, c0 = time.perf_counter(), time.process_time()
+        funcion()
+        pared.append(time.perf_counter() - p0)
+        cpu.append(time.process_time() - c0)
+    return sorted(pared)[len(pared) // 2], sorted(cpu)[len(cpu) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--intervalo", type=float, default=0.5)
+    args = parser.parse_args()
+
+    extra = [subprocess.Popen(["sleep", "600"]) for _ in range(args.procesos)]
+    try:
+        print(f"{len(psutil.pids())} procesos, top {args.top}, intervalo {args.intervalo} s\n")
+        r = RecolectorProcesos(intervalo_seg=args.intervalo, max_antiguedad_seg=0)
+        resultados = {
+            "ingenuo (as_dict)": medir(lambda: ingenuo(args.top, args.intervalo), args.repeticiones),
+            "procesos.py (dos barridos)": medir(lambda: r.top(args.top), args.repeticiones),
+        }
+        r.max_antiguedad_seg = 3600
+        r.top(args.top)
+        resultados["procesos.py (reusa barrido)"] = medir(lambda: r.top(args.top), args.repeticiones)
+        print(f"{'':<30}{'pared':>10}{'CPU':>10}")
+        for nombre, (pared, cpu) in resultados.items():
+            print(f"{nombre:<30}{pared * 1000:>8.0f} ms{cpu * 1000:>8.0f} ms")
+    finally:
+        for p in extra:
+            p.kill()
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
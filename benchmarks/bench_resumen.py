@@ -0,0 +1,64 @@
+"""
+obtener_resumen(): consulta SQL de las últimas N filas contra los agregados
+incrementales (búsqueda en memoria), para todas las filas y por host, en un
+SQLite temporal (o el Postgres configurado con --pg: añade una fila del
+host "bench-0007" y la borra al terminar).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_resumen --filas 200000 --hosts 200
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_consultas_historico import poblar_sqlite
+from monitor import historico
+
+
+def medir(funcion, repeticiones: int = 200) -> float:
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t)
+    return statistics.median(tiempos) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--pg", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["PG_ENABLED"] = "true" if args.pg else "false"
+    with tempfile.TemporaryDirectory() as tmp:
+        historico.DB_PATH = Path(tmp) / "historico.db"
+        if args.pg:
+            sql = historico._obtener_resumen_pg
+        else:
+            from datetime import datetime
+            poblar_sqlite(0, args.filas, args.hosts, datetime(2026, 1, 1))
+            sql = historico._obtener_resumen_sqlite
+        host = "bench-0007"
+        # Una escritura siembra los agregados de "*" y del host.
+        historico._escribir_filas([historico._fila_medicion({"zabbix": {"hostname": host, "cpu_uso_pct": 1.0}})])
+
+        print(f"{'resumen (µs, mediana)':<24}{'SQL':>10}{'incremental':>14}")
+        for etiqueta, hostname in (("todas las filas", None), ("un host", host)):
+            t_sql = medir(lambda: sql(20, hostname))
+            t_inc = medir(lambda: historico.obtener_resumen(20, hostname))
+            print(f"{etiqueta:<24}{t_sql:>10.1f}{t_inc:>14.1f}")
+        if args.pg:
+            with historico._pool_pg.conexion() as conn:
+                conn.cursor().execute("DELETE FROM mediciones WHERE hostname = %s", (host,))
+        historico.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Gráfica de un año de un host: leer todas las filas crudas contra
+obtener_serie(), que elige el nivel de rollup adecuado. Mide también lo
+que tarda la primera pasada de ejecutar_rollups() y una incremental.
+SQLite temporal con una medición por minuto (--dias días).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_rollups --dias 365
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ["PG_ENABLED"] = "false"
+# Con retención en el crudo no quedaría el año entero para comparar.
+os.environ["RETENCION_CRUDO_DIAS"] = "0"
+os.environ["RETENCION_1M_DIAS"] = "0"
+
+from benchmarks.bench_consultas_historico import poblar_sqlite  # noqa: E402
+from monitor import historico, rollups  # noqa: E402
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        historico.DB_PATH = Path(tmp) / "historico.db"
+        ahora = datetime.now().replace(microsecond=0)
+        desde = ahora - timedelta(days=args.dias)
+        filas = args.dias * 1440
+        poblar_sqlite(0, filas, 1, desde)
+        host = "bench-0000"
+
+        _, ms = cronometrar(rollups.ejecutar_rollups)
+        print(f"primera pasada de rollups ({filas} filas): {ms / 1000:.1f} s")
+        historico._guardar_filas_sqlite([historico._fila_medicion({"zabbix": {"hostname": host, "cpu_uso_pct": 1}})])
+        _, ms = cronometrar(rollups.ejecutar_rollups)
+        print(f"pasada incremental (1 fila nueva): {ms:.1f} ms\n")
+
+        crudo, ms_crudo = cronometrar(lambda: historico.obtener_mediciones(host, desde, ahora))
+        serie, ms_serie = cronometrar(lambda: rollups.obtener_serie(host, desde, ahora))
+        print(f"{'lectura':<22}{'filas':>10}{'ms':>10}")
+        print(f"{'crudo':<22}{len(crudo):>10}{ms_crudo:>10.1f}")
+        print(f"{'obtener_serie (' + serie['nivel'] + ')':<22}{len(serie['puntos']):>10}{ms_serie:>10.1f}")
+        historico.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+obtener_info_sistema_local() sin caché de hardware (get_cpu_info() en cada
+llamada), con la caché en disco (primer refresco de un proceso nuevo en el
+mismo arranque) y con la caché en memoria (refrescos siguientes).
+
+La caché se escribe en un directorio temporal, no en reportes/.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_sistema_local --repeticiones 20
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from monitor import sistema_local
+
+
+def medir(n: int, antes=None) -> list[float]:
+    tiempos = []
+    for _ in range(n):
+        if antes:
+            antes()
+        inicio = time.perf_counter()
+        sistema_local.obtener_info_sistema_local()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    sistema_local.CACHE_PATH = Path(tmp.name) / "cache_hardware.json"
+    try:
+        sistema_local.SISTEMA_LOCAL_CACHE = False
+        sin_cache = medir(max(args.repeticiones // 5, 1))
+        sistema_local.SISTEMA_LOCAL_CACHE = True
+        sistema_local.obtener_info_sistema_local()  # escribe la caché
+        en_disco = medir(args.repeticiones, antes=lambda: setattr(sistema_local, "_memoria", None))
+        en_memoria = medir(args.repeticiones)
+
+        for nombre, tiempos in (("sin caché", sin_cache), ("caché en disco", en_disco), ("caché en memoria", en_memoria)):
+            print(f"{nombre:<18}{statistics.median(tiempos) * 1000:>10.2f} ms (mediana de {len(tiempos)})")
+    finally:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
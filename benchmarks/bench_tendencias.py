@@ -0,0 +1,59 @@
+"""
+Tiempo de calcular_uso_sostenido (trend.get + agregados) para ventanas
+de 7/30/90 días contra el Zabbix simulado, con NumPy y en Python puro.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_tendencias
+"""
+
+import argparse
+import time
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor import tendencias
+from monitor.zabbix_client import ZabbixClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ventanas", type=int, nargs="+", default=[7, 30, 90])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    with ServidorZabbixSimulado(["WIN-LAPTOP"]) as srv:
+        cliente = ZabbixClient(srv.url, "token-bench", cache=None)
+        hostid = cliente.get_host_id("WIN-LAPTOP")
+
+        inicio = time.perf_counter()
+        items = cliente.get_items_for_host(hostid, list(tendencias.ITEMS_TENDENCIA.values()))
+        ahora = int(time.time())
+        series = tendencias.obtener_tendencias(
+            cliente, list(items.values()), ahora - max(args.ventanas) * 86400, ahora
+        )
+        seg_descarga = time.perf_counter() - inicio
+        horas = sum(len(s["clock"]) for s in series.values())
+        print(f"descarga trend.get: {horas} filas horarias en {seg_descarga * 1000:.1f} ms")
+
+        modos = [("Python puro", None)]
+        if tendencias.np is not None:
+            modos.insert(0, ("NumPy", tendencias.np))
+        resultados = []
+        for nombre, modulo in modos:
+            tendencias.np = modulo
+            agg = {itemid: tendencias.agregar_serie(s, args.ventanas, ahora) for itemid, s in series.items()}
+            inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                agg = {itemid: tendencias.agregar_serie(s, args.ventanas, ahora) for itemid, s in series.items()}
+            ms = (time.perf_counter() - inicio) / args.repeticiones * 1000
+            print(f"agregados ({nombre}): {ms:.2f} ms")
+            resultados.append(agg)
+
+        if len(resultados) == 2:
+            for itemid in resultados[0]:
+                for dias in args.ventanas:
+                    a, b = resultados[0][itemid][dias], resultados[1][itemid][dias]
+                    assert all(abs(a[k] - b[k]) < 1e-6 for k in a), (a, b)
+
+
+if __name__ == "__main__":
+    main()
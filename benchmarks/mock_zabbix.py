@@ -0,0 +1,338 @@
+"""
+Servidor JSON-RPC mínimo que imita la API de Zabbix para benchmarks locales.
+Solo implementa lo que usa ZabbixClient (hostgroup.get, host.get, item.get,
+history.get, trend.get),
+acepta lotes JSON-RPC (arrays) y cuenta las peticiones HTTP y las llamadas
+recibidas. Los datos (hosts, items, historial, tendencias) se generan al
+vuelo; se puede inyectar latencia, jitter y errores (HTTP 503 y JSON-RPC).
+
+En otro proceso:
+    python -m benchmarks.mock_zabbix --hosts 200 --latencia-ms 5
+(imprime la URL; GET /estadisticas devuelve los contadores).
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from monitor.zabbix_client import METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+
+
+class DatosSimulados:
+    """
+    Hosts, items e historial sintéticos generados al vuelo.
+    """
+
+    def __init__(self, hostnames: list[str], items_extra: int = 0):
+        self.hosts = {str(10000 + i): nombre for i, nombre in enumerate(hostnames)}
+        # Un único grupo con todos los hosts.
+        self.grupos = {"1": {"name": "Simulados", "hostids": set(self.hosts)}}
+        self.items: dict[str, dict] = {}
+        siguiente = 20000
+        claves = [(k, vt) for k, (_, vt) in METRICAS_DIAGNOSTICO.items()]
+        claves += [(k, 3) for k in SERVICIOS_CLAVE]
+        claves += [(f"perf_counter_en[\\Relleno({n})\\Valor]", 0) for n in range(items_extra)]
+        for hostid in self.hosts:
+            for key_, value_type in claves:
+                itemid = str(siguiente)
+                siguiente += 1
+                self.items[itemid] = {
+                    "itemid": itemid,
+                    "hostid": hostid,
+                    "name": key_,
+                    "key_": key_,
+                    "value_type": str(value_type),
+                }
+
+    def valor(self, itemid: str, clock: int) -> str:
+        item = self.items[itemid]
+        if item["value_type"] == "3":
+            if item["key_"].startswith("service.info"):
+                return "1"
+            return str(clock % 1_000_000)
+        return f"{(int(itemid) * 7 + clock // 60) % 100:.4f}"
+
+
+class ServidorZabbixSimulado:
+    """
+    Levanta el servidor en un hilo en 127.0.0.1 y un puerto libre.
+
+    Uso:
+        with ServidorZabbixSimulado(["WIN-LAPTOP"], latencia_seg=0.005) as srv:
+            cliente = ZabbixClient(srv.url, "token")
+    """
+
+    def __init__(
+        self,
+        hostnames: list[str],
+        latencia_seg: float = 0.0,
+        items_extra: int = 0,
+        jitter_seg: float = 0.0,
+        tasa_error_http: float = 0.0,
+        tasa_error_api: float = 0.0,
+        semilla: int = 1234,
+    ):
+        self.datos = DatosSimulados(hostnames, items_extra=items_extra)
+        self.latencia_seg = latencia_seg
+        self.jitter_seg = jitter_seg
+        # Fracción de peticiones que responden HTTP 503 (transitorio) y de
+        # llamadas que devuelven un error JSON-RPC.
+        self.tasa_error_http = tasa_error_http
+        self.tasa_error_api = tasa_error_api
+        self.peticiones_http = 0
+        self.errores_inyectados = 0
+        self.llamadas: dict[str, int] = {}
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._crear_handler())
+        self._httpd.daemon_threads = True
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}/api_jsonrpc.php"
+
+    def reiniciar_contadores(self) -> None:
+        with self._lock:
+            self.peticiones_http = 0
+            self.errores_inyectados = 0
+            self.llamadas = {}
+
+    def contadores(self) -> dict:
+        with self._lock:
+            return {
+                "peticiones_http": self.peticiones_http,
+                "errores_inyectados": self.errores_inyectados,
+                "llamadas": dict(self.llamadas),
+            }
+
+    def _sortear(self, tasa: float) -> bool:
+        if tasa <= 0:
+            return False
+        with self._lock:
+            fallo = self._rnd.random() < tasa
+            if fallo:
+                self.errores_inyectados += 1
+        return fallo
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # --------- Métodos API ---------
+
+    def _hostgroup_get(self, params: dict) -> list:
+        nombres = set(params.get("filter", {}).get("name", []))
+        return [
+            {"groupid": gid, "name": g["name"]}
+            for gid, g in self.datos.grupos.items()
+            if not nombres or g["name"] in nombres
+        ]
+
+    def _host_get(self, params: dict) -> list:
+        nombres = set(params.get("filter", {}).get("host", []))
+        permitidos = None
+        if "groupids" in params:
+            permitidos = set()
+            for gid in params["groupids"]:
+                permitidos |= self.datos.grupos.get(gid, {}).get("hostids", set())
+        return [
+            {"hostid": hid, "host": nombre}
+            for hid, nombre in self.datos.hosts.items()
+            if (not nombres or nombre in nombres) and (permitidos is None or hid in permitidos)
+        ]
+
+    def _item_get(self, params: dict) -> list:
+        hostids = set(params.get("hostids", []))
+        if "host" in params:
+            hostids |= {hid for hid, nombre in self.datos.hosts.items() if nombre == params["host"]} or {None}
+        # search: LIKE '%x%' sin distinguir mayúsculas; filter: igualdad exacta.
+        buscar = [b.lower() for b in params.get("search", {}).get("key_", [])]
+        exactas = set(params.get("filter", {}).get("key_", []))
+        itemids = set(params.get("itemids", []))
+        campos = params.get("output", "extend")
+        ahora = int(time.time())
+        resultado = []
+        for it in self.datos.items.values():
+            if hostids and it["hostid"] not in hostids:
+                continue
+            if itemids and it["itemid"] not in itemids:
+                continue
+            key_ = it["key_"]
+            if buscar and not any(b in key_.lower() for b in buscar):
+                continue
+            if exactas and key_ not in exactas:
+                continue
+            fila = dict(it)
+            fila["lastclock"] = str(ahora - ahora % 60)
+            fila["lastvalue"] = self.datos.valor(it["itemid"], ahora - ahora % 60)
+            if campos != "extend":
+                fila = {c: fila[c] for c in campos if c in fila}
+            resultado.append(fila)
+        return resultado
+
+    def _history_get(self, params: dict) -> list:
+        ahora = int(time.time())
+        time_from = int(params.get("time_from", ahora - 3600))
+        time_till = min(int(params.get("time_till", ahora)), ahora)
+        limit = params.get("limit")
+        # Una muestra por minuto por item.
+        ultimo = time_till - time_till % 60
+        primero = time_from + (-time_from) % 60
+        if params.get("sortorder") == "DESC":
+            clocks = range(ultimo, primero - 1, -60)
+        else:
+            clocks = range(primero, ultimo + 1, 60)
+        itemids = [i for i in params.get("itemids", []) if i in self.datos.items]
+        filas = []
+        for clock in clocks:
+            for itemid in itemids:
+                filas.append({
+                    "itemid": itemid,
+                    "clock": str(clock),
+                    "ns": "0",
+                    "value": self.datos.valor(itemid, clock),
+                })
+                if limit and len(filas) >= limit:
+                    return filas
+        return filas
+
+    def _trend_get(self, params: dict) -> list:
+        ahora = int(time.time())
+        time_from = int(params.get("time_from", ahora - 86400))
+        time_till = min(int(params.get("time_till", ahora)), ahora)
+        itemids = [i for i in params.get("itemids", []) if i in self.datos.items]
+        filas = []
+        # Una fila por hora y item: ciclo diario más una leve tendencia al alza.
+        for clock in range(time_from + (-time_from) % 3600, time_till + 1, 3600):
+            hora = (clock // 3600) % 24
+            for itemid in itemids:
+                base = int(itemid) % 40 + 20 + (clock - time_from) / 86400 * 0.1
+                avg = min(100.0, base + (15 if 9 <= hora < 18 else 0))
+                filas.append({
+                    "itemid": itemid,
+                    "clock": str(clock),
+                    "num": "60",
+                    "value_min": f"{max(0.0, avg - 10):.4f}",
+                    "value_avg": f"{avg:.4f}",
+                    "value_max": f"{min(100.0, avg + 20):.4f}",
+                })
+        return filas
+
+    def _despachar(self, llamada: dict) -> dict:
+        metodo = llamada.get("method")
+        with self._lock:
+            self.llamadas[metodo] = self.llamadas.get(metodo, 0) + 1
+        handler = {
+            "hostgroup.get": self._hostgroup_get,
+            "host.get": self._host_get,
+            "item.get": self._item_get,
+            "history.get": self._history_get,
+            "trend.get": self._trend_get,
+        }.get(metodo)
+        if handler is not None and self._sortear(self.tasa_error_api):
+            return {
+                "jsonrpc": "2.0",
+                "error": {"code": -32500, "message": "Application error.", "data": "error inyectado"},
+                "id": llamada.get("id"),
+            }
+        if handler is None:
+            return {
+                "jsonrpc": "2.0",
+                "error": {"code": -32601, "message": "Method not found.", "data": metodo},
+                "id": llamada.get("id"),
+            }
+        return {"jsonrpc": "2.0", "result": handler(llamada.get("params", {})), "id": llamada.get("id")}
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _responder(self, estado: int, respuesta) -> None:
+                datos = json.dumps(respuesta).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                # GET /estadisticas: contadores (para clientes en otro proceso);
+                # GET /estadisticas?reiniciar=1 además los pone a cero.
+                if not self.path.startswith("/estadisticas"):
+                    self._responder(404, {"error": "no encontrado"})
+                    return
+                contadores = servidor.contadores()
+                if "reiniciar=1" in self.path:
+                    servidor.reiniciar_contadores()
+                self._responder(200, contadores)
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                cuerpo = json.loads(self.rfile.read(largo))
+                with servidor._lock:
+                    servidor.peticiones_http += 1
+                espera = servidor.latencia_seg
+                if servidor.jitter_seg:
+                    with servidor._lock:
+                        espera += servidor._rnd.uniform(0, servidor.jitter_seg)
+                if espera:
+                    time.sleep(espera)
+                if servidor._sortear(servidor.tasa_error_http):
+                    self._responder(503, {"error": "Service Unavailable (inyectado)"})
+                    return
+                if isinstance(cuerpo, list):
+                    respuesta = [servidor._despachar(c) for c in cuerpo]
+                else:
+                    respuesta = servidor._despachar(cuerpo)
+                self._responder(200, respuesta)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def nombres_simulados(n: int) -> list[str]:
+    """WIN-LAPTOP (el host por defecto de la app) más VM-0001... hasta n hosts."""
+    return ["WIN-LAPTOP"] + [f"VM-{i:04d}" for i in range(1, n)]
+
+
+def main():
+    """Levanta el servidor en primer plano (útil para medir el cliente en otro proceso)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Zabbix JSON-RPC simulado")
+    parser.add_argument("--hosts", type=int, default=1)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-error-http", type=float, default=0.0, help="fracción de HTTP 503")
+    parser.add_argument("--tasa-error-api", type=float, default=0.0, help="fracción de errores JSON-RPC")
+    args = parser.parse_args()
+
+    with ServidorZabbixSimulado(
+        nombres_simulados(args.hosts),
+        latencia_seg=args.latencia_ms / 1000,
+        jitter_seg=args.jitter_ms / 1000,
+        tasa_error_http=args.tasa_error_http,
+        tasa_error_api=args.tasa_error_api,
+    ) as srv:
+        print(srv.url, flush=True)
+        try:
+            srv._hilo.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
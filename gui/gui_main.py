@@ -1,9 +1,12 @@
 import tkinter as tk
 from tkinter import ttk
+from monitor import historico, rollups
+from monitor.sistema_local import muestreador
 from monitor.historico import guardar_medicion
 from monitor.reconocimiento import reconocimiento_inicial
 from monitor.escenarios_prueba import obtener_escenarios_disponibles, aplicar_escenario
 from utils import notificaciones
+from utils.config import MUESTREO_ENABLED
 import traceback
 
 class DiagnosticoApp(tk.Tk):
@@ -53,6 +56,9 @@ class DiagnosticoApp(tk.Tk):
         self.lbl_disco_total = ttk.Label(frame_info, text="Disco total: -")
         self.lbl_disco_total.grid(row=2, column=1, sticky="w", padx=5, pady=2)
 
+        self.lbl_muestreo = ttk.Label(frame_info, text="Picos locales: -")
+        self.lbl_muestreo.grid(row=2, column=2, sticky="w", padx=5, pady=2)
+
         # Opcional: tercera columna vacía o para otro dato
         frame_info.columnconfigure(0, weight=1)
         frame_info.columnconfigure(1, weight=1)
@@ -188,15 +194,32 @@ class DiagnosticoApp(tk.Tk):
                 for m in motivos:
                     if estado == "CRÍTICO":
                         notificaciones.error(m)
-                    elif estado == "ADVERTENCIA":
+                    elif estado in ("ADVERTENCIA", "DESCONOCIDO"):
                         notificaciones.advertencia(m)
                     else:
                         notificaciones.info(m)
 
-            self.lbl_so.config(text=f"SO: {info['so']} {info['release']}")
+            for fase, error in datos.get("fases", {}).get("errores", {}).items():
+                if fase != "zabbix":  # ya está en los motivos del estado
+                    notificaciones.advertencia(f"Reconocimiento parcial, {fase}: {error}")
+
+            series = datos.get("muestreo_local", {}).get("series", {})
+            if series.get("cpu_pct"):
+                cpu_m, ram_m = series["cpu_pct"], series.get("ram_pct") or {}
+                minutos = datos["muestreo_local"]["ventana_seg"] / 60
+                texto = f"Picos locales ({minutos:.0f} min): CPU máx {cpu_m['max']:.0f} % / p95 {cpu_m['p95']:.0f} %"
+                if ram_m:
+                    texto += f", RAM máx {ram_m['max']:.0f} %"
+                self.lbl_muestreo.config(text=texto)
+
+            self.lbl_so.config(text=f"SO: {info.get('so', '-')} {info.get('release', '')}")
             tipo = "Máquina virtual" if info.get("es_vm") else "Sistema físico"
+            if info.get("es_vm") and info.get("hipervisor") not in (None, "desconocido"):
+                tipo += f" ({info['hipervisor']})"
+            if info.get("contenedor"):
+                tipo += f", contenedor {info['contenedor']}"
             self.lbl_vm.config(text=f"Tipo: {tipo}")
-            self.lbl_host.config(text=f"Hostname: {info['hostname']}")
+            self.lbl_host.config(text=f"Hostname: {info.get('hostname', '-')}")
 
             # CPU / RAM / Disco
             cpu_model = info.get("cpu_modelo", "-")
@@ -307,7 +330,11 @@ class DiagnosticoApp(tk.Tk):
             for r in recs:
                 notificaciones.advertencia(r)
 
-            notificaciones.info("Reconocimiento inicial completado correctamente.")
+            fases = datos.get("fases", {})
+            if fases.get("errores"):
+                notificaciones.info(f"Reconocimiento inicial completado con fases sin datos ({fases['total_seg']:.1f} s).")
+            else:
+                notificaciones.info("Reconocimiento inicial completado correctamente.")
         except Exception as e:
             traceback.print_exc()
             notificaciones.error(f"Error en reconocimiento inicial: {e}")
@@ -368,5 +395,11 @@ class DiagnosticoApp(tk.Tk):
             notificaciones.info(f"[PRUEBA] Recomendación: {r}")
 
 def lanzar_gui():
+    if MUESTREO_ENABLED:
+        muestreador.iniciar()
     app = DiagnosticoApp()
+    rollups.iniciar()
     app.mainloop()
+    rollups.detener()
+    muestreador.detener()
+    historico.cerrar()  # escribe las mediciones que queden en cola
@@ -0,0 +1,166 @@
+"""
+Agregados incrementales por host para el histórico: se actualizan al
+insertar cada fila, en O(1), y así obtener_resumen() no tiene que volver
+a leer las últimas N filas en cada diagnóstico.
+
+Por métrica se mantiene cuenta, suma, suma de cuadrados, mínimo, máximo y
+EWMA desde el inicio, y una ventana circular con las últimas filas (para
+"promedio de las últimas N", igual que la consulta original: los NULL no
+cuentan en el promedio pero la fila sí cuenta como muestra).
+"""
+
+import math
+from array import array
+from typing import Optional
+
+# columna en mediciones -> clave en obtener_resumen()
+METRICAS_RESUMEN = {
+    "cpu_uso": "cpu_prom",
+    "ram_uso": "ram_prom",
+    "disco_c_uso": "disco_prom",
+    "swap_pfree": "swap_pfree_prom",
+}
+_N_METRICAS = len(METRICAS_RESUMEN)
+
+
+class AcumuladoHost:
+    def __init__(self, ventana: int, alfa: float):
+        self.ventana = max(ventana, 1)
+        self.alfa = alfa
+        self.filas = 0
+        self.n = [0] * _N_METRICAS
+        self.suma = [0.0] * _N_METRICAS
+        self.suma_cuad = [0.0] * _N_METRICAS
+        self.minimo: list[Optional[float]] = [None] * _N_METRICAS
+        self.maximo: list[Optional[float]] = [None] * _N_METRICAS
+        self.ewma: list[Optional[float]] = [None] * _N_METRICAS
+        # Ventana circular: `ventana` filas x métricas; NaN = NULL.
+        self._anillo = array("d", [math.nan]) * (self.ventana * _N_METRICAS)
+        self._pos = 0
+        self._anillo_suma = [0.0] * _N_METRICAS
+        self._anillo_n = [0] * _N_METRICAS
+
+    def agregar(self, valores) -> None:
+        """valores: una fila de métricas en el orden de METRICAS_RESUMEN (None = NULL)."""
+        self.filas += 1
+        base = self._pos * _N_METRICAS
+        anillo = self._anillo
+        for i, v in enumerate(valores):
+            viejo = anillo[base + i]
+            if viejo == viejo:  # no NaN: sale de la ventana
+                self._anillo_suma[i] -= viejo
+                self._anillo_n[i] -= 1
+            if v is None:
+                anillo[base + i] = math.nan
+                continue
+            v = float(v)
+            anillo[base + i] = v
+            self._anillo_suma[i] += v
+            self._anillo_n[i] += 1
+            self.n[i] += 1
+            self.suma[i] += v
+            self.suma_cuad[i] += v * v
+            self.minimo[i] = v if self.minimo[i] is None else min(self.minimo[i], v)
+            self.maximo[i] = v if self.maximo[i] is None else max(self.maximo[i], v)
+            self.ewma[i] = v if self.ewma[i] is None else self.ewma[i] + self.alfa * (v - self.ewma[i])
+        self._pos = (self._pos + 1) % self.ventana
+
+    def resumen(self, n_ultimas: int) -> Optional[dict]:
+        """
+        Promedios de las últimas n_ultimas filas, con las claves de
+        obtener_resumen(). None si n_ultimas no cabe en la ventana.
+        """
+        if n_ultimas > self.ventana:
+            return None
+        muestras = min(self.filas, n_ultimas)
+        if muestras == 0:
+            return {}
+        if n_ultimas == self.ventana:
+            sumas, cuentas = self._anillo_suma, self._anillo_n
+        else:
+            # Recorre solo las n_ultimas filas más recientes.
+            sumas, cuentas = [0.0] * _N_METRICAS, [0] * _N_METRICAS
+            for k in range(1, muestras + 1):
+                base = ((self._pos - k) % self.ventana) * _N_METRICAS
+                for i in range(_N_METRICAS):
+                    v = self._anillo[base + i]
+                    if v == v:
+                        sumas[i] += v
+                        cuentas[i] += 1
+        res = {
+            clave: (sumas[i] / cuentas[i] if cuentas[i] else None)
+            for i, clave in enumerate(METRICAS_RESUMEN.values())
+        }
+        res["muestras"] = muestras
+        return res
+
+    def estadisticas(self) -> dict:
+        """métrica -> {n, promedio, desviacion, minimo, maximo, ewma} desde el inicio."""
+        out = {}
+        for i, columna in enumerate(METRICAS_RESUMEN):
+            n = self.n[i]
+            prom = self.suma[i] / n if n else None
+            var = max(self.suma_cuad[i] / n - prom * prom, 0.0) if n else None
+            out[columna] = {
+                "n": n,
+                "promedio": prom,
+                "desviacion": math.sqrt(var) if var is not None else None,
+                "minimo": self.minimo[i],
+                "maximo": self.maximo[i],
+                "ewma": self.ewma[i],
+            }
+        return out
+
+    # --------- Persistencia ---------
+
+    def a_dict(self) -> dict:
+        # La ventana se guarda de la fila más antigua a la más reciente.
+        filas = []
+        for k in range(self.ventana):
+            base = ((self._pos + k) % self.ventana) * _N_METRICAS
+            filas.append([None if v != v else v for v in self._anillo[base:base + _N_METRICAS]])
+        return {
+            "filas": self.filas,
+            "n": self.n,
+            "suma": self.suma,
+            "suma_cuad": self.suma_cuad,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "ewma": self.ewma,
+            "ventana": filas[-min(self.filas, self.ventana):] if self.filas else [],
+        }
+
+    @classmethod
+    def desde_dict(cls, data: dict, ventana: int, alfa: float) -> "AcumuladoHost":
+        acc = cls(ventana, alfa)
+        # La ventana se repone fila a fila (recalcula sus sumas) y luego se
+        # restauran los acumulados desde el inicio.
+        for fila in data.get("ventana", [])[-acc.ventana:]:
+            acc.agregar(fila)
+        acc.filas = data["filas"]
+        for campo in ("n", "suma", "suma_cuad", "minimo", "maximo", "ewma"):
+            setattr(acc, campo, list(data[campo]))
+        return acc
+
+
+def percentil(ordenados: list[float], p: float) -> float:
+    """Percentil con interpolación lineal (como percentile_cont de Postgres)."""
+    pos = (len(ordenados) - 1) * p / 100
+    i = int(pos)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (pos - i)
+
+
+class Percentil95:
+    """Agregado SQLite percentil_95(x); ignora NULL como los agregados de SQL."""
+
+    def __init__(self):
+        self.valores: list[float] = []
+
+    def step(self, valor) -> None:
+        if valor is not None:
+            self.valores.append(valor)
+
+    def finalize(self) -> Optional[float]:
+        return percentil(sorted(self.valores), 95) if self.valores else None
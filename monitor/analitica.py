@@ -0,0 +1,384 @@
+"""
+Estadísticas de capacidad sobre una ventana del histórico (mediciones),
+para muchos hosts a la vez.
+
+Por host y métrica: n, promedio, desviación (poblacional), mínimo,
+máximo, p50/p95/p99, tiempo por encima del umbral (segundos y fracción
+del tiempo con datos) y perfil por hora del día (promedio por hora local).
+
+- Postgres (ANALITICA_SQL=true): el cálculo se hace en la base, con
+  percentile_cont, stddev_pop y lead() para el tiempo sobre el umbral;
+  solo viaja el resultado.
+- Si no (o en SQLite): la ventana se carga en una sola consulta en arrays
+  compactos (array 'd'/'i') y se calcula de una vez para todos los hosts,
+  con NumPy si está instalado o en Python puro con el mismo criterio.
+
+El tiempo sobre el umbral cuenta, por cada muestra que lo cumple, el
+intervalo hasta la muestra siguiente del host, acotado a
+ANALITICA_MAX_HUECO_SEG para no contar los huecos sin monitoreo.
+"""
+
+import math
+from array import array
+from datetime import datetime
+from typing import Optional
+
+import psycopg2
+import psycopg2.extensions
+
+try:
+    import numpy as np
+except ImportError:  # opcional: solo acelera los cálculos
+    np = None
+
+from monitor import historico
+from monitor.agregados import METRICAS_RESUMEN, percentil
+from utils.config import ANALITICA_SQL, ANALITICA_MAX_HUECO_SEG
+
+METRICAS = tuple(METRICAS_RESUMEN)  # cpu_uso, ram_uso, disco_c_uso, swap_pfree
+PERCENTILES = (50, 95, 99)
+
+# métrica -> (operador, valor): los umbrales de ADVERTENCIA del estado global.
+UMBRALES = {
+    "cpu_uso": (">=", 80.0),
+    "ram_uso": (">=", 80.0),
+    "disco_c_uso": (">=", 80.0),
+    "swap_pfree": ("<=", 20.0),
+}
+
+
+class Ventana:
+    """
+    Mediciones de [desde, hasta) ordenadas por host y ts, en arrays:
+    host (índice en hostnames), t (segundos de reloj local) y una serie
+    por métrica (NaN = NULL).
+    """
+
+    def __init__(self):
+        self.hostnames: list[str] = []
+        self.host = array("i")
+        self.t = array("d")
+        self.valores = {m: array("d") for m in METRICAS}
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+
+def _filtro(pg: bool, hostnames: Optional[list[str]]) -> tuple[str, tuple]:
+    if hostnames is None:
+        return "hostname IS NOT NULL", ()
+    if pg:
+        return "hostname = ANY(%s)", (list(hostnames),)
+    return f"hostname IN ({', '.join('?' * len(hostnames))})", tuple(hostnames)
+
+
+def cargar_ventana(desde: datetime, hasta: datetime, hostnames: Optional[list[str]] = None) -> Ventana:
+    """Una consulta: Postgres si está habilitado; si falla, SQLite (como obtener_mediciones)."""
+    if historico._pg_enabled():
+        try:
+            return _cargar_pg(desde, hasta, hostnames)
+        except psycopg2.Error:
+            pass
+    return _cargar_sqlite(desde, hasta, hostnames)
+
+
+def _cargar_pg(desde: datetime, hasta: datetime, hostnames: Optional[list[str]]) -> Ventana:
+    filtro, params = _filtro(True, hostnames)
+    v = Ventana()
+    # ts::timestamp = reloj local de la sesión, como el naive con que se guardó.
+    sql = f"""
+        SELECT hostname, EXTRACT(EPOCH FROM ts::timestamp)::float8, {', '.join(METRICAS)} FROM mediciones
+        WHERE ts >= %s AND ts < %s AND {filtro}
+    """
+    with historico._pool_pg.conexion() as conn:
+        # Cursor de servidor y filas como tuplas (no DictCursor): se leen por tramos.
+        cur = conn.cursor(name="analitica_ventana", cursor_factory=psycopg2.extensions.cursor)
+        cur.execute(sql, (desde, hasta) + params)
+        _llenar(v, cur)
+    _ordenar(v)
+    return v
+
+
+def _cargar_sqlite(desde: datetime, hasta: datetime, hostnames: Optional[list[str]]) -> Ventana:
+    v = Ventana()
+    con = historico._base_sqlite.lector()
+    if con is None:
+        return v
+    filtro, params = _filtro(False, hostnames)
+    # ts es texto ISO local: strftime('%s') da segundos de reloj local.
+    sql = f"""
+        SELECT hostname, CAST(strftime('%s', ts) AS REAL), {', '.join(METRICAS)} FROM mediciones
+        WHERE ts >= ? AND ts < ? AND {filtro}
+    """
+    limites = (desde.isoformat(timespec="seconds"), hasta.isoformat(timespec="seconds"))
+    _llenar(v, con.execute(sql, limites + params))
+    _ordenar(v)
+    return v
+
+
+def _llenar(v: Ventana, cur, tramo: int = 20000) -> None:
+    """Pasa las filas del cursor a los arrays por columnas, de a `tramo` filas."""
+    nan = math.nan
+    indices: dict[str, int] = {}
+    series = [v.valores[m] for m in METRICAS]
+    while True:
+        filas = cur.fetchmany(tramo)
+        if not filas:
+            break
+        columnas = list(zip(*filas))
+        v.host.extend([indices.setdefault(h, len(indices)) for h in columnas[0]])
+        v.t.extend(columnas[1])
+        for serie, col in zip(series, columnas[2:]):
+            serie.extend([nan if x is None else x for x in col])
+    v.hostnames = list(indices)
+
+
+def _ordenar(v: Ventana) -> None:
+    """
+    Ordena la ventana por hostname y ts. Sale más barato aquí (una
+    ordenación de índices) que con ORDER BY en la base.
+    """
+    por_nombre = sorted(range(len(v.hostnames)), key=v.hostnames.__getitem__)
+    nuevo = [0] * len(por_nombre)
+    for posicion, i in enumerate(por_nombre):
+        nuevo[i] = posicion
+    v.hostnames = [v.hostnames[i] for i in por_nombre]
+    if np is not None:
+        host = np.asarray(nuevo, dtype=np.int32)[np.frombuffer(v.host, dtype=np.int32)]
+        orden = np.lexsort((np.frombuffer(v.t, dtype=np.float64), host))
+        v.host = array("i", host[orden].tobytes())
+        v.t = array("d", np.frombuffer(v.t, dtype=np.float64)[orden].tobytes())
+        for m in METRICAS:
+            v.valores[m] = array("d", np.frombuffer(v.valores[m], dtype=np.float64)[orden].tobytes())
+        return
+    host = array("i", (nuevo[h] for h in v.host))
+    t = v.t
+    orden = sorted(range(len(t)), key=lambda k: (host[k], t[k]))
+    v.host = array("i", (host[k] for k in orden))
+    v.t = array("d", (t[k] for k in orden))
+    for m in METRICAS:
+        serie = v.valores[m]
+        v.valores[m] = array("d", (serie[k] for k in orden))
+
+
+# ---------- Cálculo en memoria ----------
+
+def _vacia() -> dict:
+    return {
+        "n": 0, "promedio": None, "desviacion": None, "minimo": None, "maximo": None,
+        **{f"p{p}": None for p in PERCENTILES},
+        "seg_sobre_umbral": 0.0, "fraccion_sobre_umbral": None, "perfil_horario": [None] * 24,
+    }
+
+
+def _opcional(x) -> Optional[float]:
+    x = float(x)
+    return None if x != x else x
+
+
+def _calcular_numpy(v: Ventana, umbrales: dict, max_hueco: float) -> dict:
+    n_hosts = len(v.hostnames)
+    host = np.frombuffer(v.host, dtype=np.int32)
+    t = np.frombuffer(v.t, dtype=np.float64)
+    inicios = np.flatnonzero(np.r_[True, host[1:] != host[:-1]])
+
+    # Intervalo hasta la muestra siguiente del mismo host (0 en la última).
+    dt = np.minimum(np.diff(t, append=t[-1]), max_hueco)
+    dt[np.r_[inicios[1:] - 1, len(t) - 1]] = 0.0
+    hora = (t // 3600 % 24).astype(np.int64)
+
+    res = {h: {} for h in v.hostnames}
+    for m in METRICAS:
+        x = np.frombuffer(v.valores[m], dtype=np.float64)
+        hay = ~np.isnan(x)
+        xh, hh = x[hay], host[hay]
+        n = np.bincount(hh, minlength=n_hosts)
+        suma = np.bincount(hh, weights=xh, minlength=n_hosts)
+        cuad = np.bincount(hh, weights=xh * xh, minlength=n_hosts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            prom = suma / n
+            desv = np.sqrt(np.maximum(cuad / n - prom * prom, 0.0))
+            minimo = np.fmin.reduceat(x, inicios)
+            maximo = np.fmax.reduceat(x, inicios)
+
+        # Percentiles por host en una sola ordenación: por host y valor,
+        # con los NaN al final de cada host.
+        orden = np.lexsort((x, host))
+        ordenados = x[orden]
+        pct = {}
+        for p in PERCENTILES:
+            pos = (np.maximum(n, 1) - 1) * p / 100
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+            a, b = ordenados[inicios + lo], ordenados[inicios + hi]
+            pct[p] = np.where(n > 0, a + (b - a) * (pos - lo), np.nan)
+
+        op, umbral = umbrales.get(m, (">=", math.inf))
+        with np.errstate(invalid="ignore"):
+            sobre = (x >= umbral) if op == ">=" else (x <= umbral)
+        seg_sobre = np.bincount(host, weights=dt * sobre, minlength=n_hosts)
+        seg_datos = np.bincount(host, weights=dt * hay, minlength=n_hosts)
+
+        clave = hh * 24 + hora[hay]
+        suma_h = np.bincount(clave, weights=xh, minlength=n_hosts * 24).reshape(n_hosts, 24)
+        n_h = np.bincount(clave, minlength=n_hosts * 24).reshape(n_hosts, 24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            perfil = suma_h / n_h
+
+        for i, h in enumerate(v.hostnames):
+            if not n[i]:
+                res[h][m] = _vacia()
+                continue
+            res[h][m] = {
+                "n": int(n[i]),
+                "promedio": float(prom[i]),
+                "desviacion": float(desv[i]),
+                "minimo": float(minimo[i]),
+                "maximo": float(maximo[i]),
+                **{f"p{p}": float(pct[p][i]) for p in PERCENTILES},
+                "seg_sobre_umbral": float(seg_sobre[i]),
+                "fraccion_sobre_umbral": float(seg_sobre[i] / seg_datos[i]) if seg_datos[i] > 0 else None,
+                "perfil_horario": [_opcional(y) for y in perfil[i]],
+            }
+    return res
+
+
+def _calcular_python(v: Ventana, umbrales: dict, max_hueco: float) -> dict:
+    res = {h: {} for h in v.hostnames}
+    t = v.t
+    total = len(t)
+    i = 0
+    while i < total:
+        indice = v.host[i]
+        fin = i
+        while fin < total and v.host[fin] == indice:
+            fin += 1
+        dts = [min(t[k + 1] - t[k], max_hueco) for k in range(i, fin - 1)] + [0.0]
+        for m in METRICAS:
+            serie = v.valores[m][i:fin]
+            validos = [x for x in serie if x == x]
+            if not validos:
+                res[v.hostnames[indice]][m] = _vacia()
+                continue
+            n = len(validos)
+            prom = sum(validos) / n
+            ordenados = sorted(validos)
+            op, umbral = umbrales.get(m, (">=", math.inf))
+            seg_sobre = seg_datos = 0.0
+            suma_h, n_h = [0.0] * 24, [0] * 24
+            for k, x in enumerate(serie):
+                if x != x:
+                    continue
+                seg_datos += dts[k]
+                if (x >= umbral) if op == ">=" else (x <= umbral):
+                    seg_sobre += dts[k]
+                hora = int(t[i + k] // 3600 % 24)
+                suma_h[hora] += x
+                n_h[hora] += 1
+            res[v.hostnames[indice]][m] = {
+                "n": n,
+                "promedio": prom,
+                "desviacion": math.sqrt(max(sum(x * x for x in validos) / n - prom * prom, 0.0)),
+                "minimo": ordenados[0],
+                "maximo": ordenados[-1],
+                **{f"p{p}": percentil(ordenados, p) for p in PERCENTILES},
+                "seg_sobre_umbral": seg_sobre,
+                "fraccion_sobre_umbral": seg_sobre / seg_datos if seg_datos > 0 else None,
+                "perfil_horario": [s / c if c else None for s, c in zip(suma_h, n_h)],
+            }
+        i = fin
+    return res
+
+
+def calcular(v: Ventana, umbrales: dict = UMBRALES, max_hueco_seg: float = ANALITICA_MAX_HUECO_SEG) -> dict:
+    """{hostname: {métrica: estadísticas}} de una ventana ya cargada."""
+    if not len(v):
+        return {}
+    calculo = _calcular_numpy if np is not None else _calcular_python
+    return calculo(v, umbrales, max_hueco_seg)
+
+
+# ---------- Cálculo en Postgres ----------
+
+def _calcular_pg(desde: datetime, hasta: datetime, hostnames: Optional[list[str]],
+                 umbrales: dict, max_hueco: float) -> Optional[dict]:
+    filtro, params = _filtro(True, hostnames)
+    agregados = []
+    for m in METRICAS:
+        op, umbral = umbrales.get(m, (">=", math.inf))
+        condicion = f"{m} {op} {float(umbral)!r}" if math.isfinite(umbral) else "FALSE"
+        agregados.append(f"""
+            COUNT({m}), AVG({m}), stddev_pop({m}), MIN({m}), MAX({m}),
+            percentile_cont(ARRAY[{', '.join(str(p / 100) for p in PERCENTILES)}]) WITHIN GROUP (ORDER BY {m}),
+            COALESCE(SUM(dt) FILTER (WHERE {condicion}), 0), SUM(dt) FILTER (WHERE {m} IS NOT NULL)""")
+    # La última muestra de cada host cuenta 0 s (LEAST ignora los NULL).
+    base = f"""
+        SELECT hostname, ts, {', '.join(METRICAS)},
+               LEAST(EXTRACT(EPOCH FROM COALESCE(lead(ts) OVER (PARTITION BY hostname ORDER BY ts), ts) - ts), %s) AS dt
+        FROM mediciones
+        WHERE ts >= %s AND ts < %s AND {filtro}
+    """
+    filas = historico._consultar_pg(
+        f"WITH m AS ({base}) SELECT hostname, {','.join(agregados)} FROM m GROUP BY hostname",
+        (max_hueco, desde, hasta) + params,
+    )
+    horas = historico._consultar_pg(
+        f"""
+        SELECT hostname, EXTRACT(HOUR FROM ts)::int, {', '.join(f'AVG({m})' for m in METRICAS)}
+        FROM mediciones WHERE ts >= %s AND ts < %s AND {filtro}
+        GROUP BY 1, 2
+        """,
+        (desde, hasta) + params,
+    )
+    if filas is None or horas is None:
+        return None
+
+    res = {}
+    for fila in filas:
+        res[fila[0]] = por_metrica = {}
+        for k, m in enumerate(METRICAS):
+            n, prom, desv, minimo, maximo, pct, seg_sobre, seg_datos = fila[1 + 8 * k: 9 + 8 * k]
+            if not n:
+                por_metrica[m] = _vacia()
+                continue
+            por_metrica[m] = {
+                "n": n,
+                "promedio": float(prom),
+                "desviacion": float(desv),
+                "minimo": minimo,
+                "maximo": maximo,
+                **{f"p{p}": float(x) for p, x in zip(PERCENTILES, pct)},
+                "seg_sobre_umbral": float(seg_sobre),
+                "fraccion_sobre_umbral": float(seg_sobre) / float(seg_datos) if seg_datos else None,
+                "perfil_horario": [None] * 24,
+            }
+    for hostname, hora, *promedios in horas:
+        for m, prom in zip(METRICAS, promedios):
+            if hostname in res and prom is not None:
+                res[hostname][m]["perfil_horario"][hora] = float(prom)
+    return res
+
+
+def estadisticas_ventana(
+    desde: datetime,
+    hasta: datetime,
+    hostnames: Optional[list[str]] = None,
+    umbrales: dict = UMBRALES,
+    max_hueco_seg: float = ANALITICA_MAX_HUECO_SEG,
+    en_sql: Optional[bool] = None,
+) -> dict:
+    """
+    {hostname: {métrica: {"n", "promedio", "desviacion", "minimo", "maximo",
+    "p50", "p95", "p99", "seg_sobre_umbral", "fraccion_sobre_umbral",
+    "perfil_horario" (24 valores, None sin datos)}}} de [desde, hasta).
+
+    en_sql=None: en Postgres según ANALITICA_SQL; si la consulta falla se
+    calcula en memoria.
+    """
+    if en_sql is None:
+        en_sql = ANALITICA_SQL
+    if en_sql and historico._pg_enabled():
+        res = _calcular_pg(desde, hasta, hostnames, umbrales, max_hueco_seg)
+        if res is not None:
+            return res
+    return calcular(cargar_ventana(desde, hasta, hostnames), umbrales, max_hueco_seg)
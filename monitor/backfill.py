@@ -0,0 +1,345 @@
+"""
+Carga del historial de Zabbix en mediciones (backfill), para que una
+instalación nueva tenga contexto (obtener_resumen, informes, rollups)
+desde el primer día.
+
+- Por host y ventana de BACKFILL_VENTANA_SEG se piden con history.get,
+  en un solo lote JSON-RPC, los items de obtener_diagnostico_host() que
+  se guardan en mediciones (CPU, RAM, disco, swap y servicios).
+- Se arma una fila por host cada BACKFILL_PASO_SEG: promedio de cada
+  métrica en el paso y último estado conocido de cada servicio; el
+  estado_global se calcula igual que en el diagnóstico.
+- Postgres: COPY FROM STDIN a una tabla temporal y de ahí a mediciones
+  ignorando las filas ya cargadas. SQLite: executemany.
+- Cada ventana terminada queda en backfill_puntos en la misma transacción
+  que sus filas, así que al relanzar se salta lo hecho. Los medicion_id
+  son deterministas (host + instante): repetir una ventana no duplica.
+- Hasta BACKFILL_CONCURRENCIA ventanas a la vez.
+
+Uso:
+    python -m monitor.backfill --grupo "Servidores" --dias 30
+    python -m monitor.backfill --hosts WIN-LAPTOP SRV-01 --desde 2026-01-01 --hasta 2026-02-01
+"""
+
+import argparse
+import io
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Callable, Optional
+
+from monitor import historico, particiones
+from monitor.reconocimiento import calcular_estado_global
+from monitor.zabbix_client import ZabbixClient, METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+from utils.config import (
+    ZABBIX_URL,
+    ZABBIX_TOKEN,
+    BACKFILL_CONCURRENCIA,
+    BACKFILL_VENTANA_SEG,
+    BACKFILL_PASO_SEG,
+)
+
+# Campos del diagnóstico que tienen columna en mediciones.
+_CAMPOS_MEDICION = ("cpu_uso_pct", "ram_uso_pct", "disco_c_uso_pct", "swap_pfree_pct")
+
+# Espacio de nombres de los medicion_id del backfill (uuid5).
+_ESPACIO_ID = uuid.UUID("6f1d3a52-1c8e-4b7a-9d55-0b6c2f0e8a41")
+
+
+def _ventanas(desde: int, hasta: int, ventana_seg: int) -> list[tuple[int, int]]:
+    """
+    Ventanas [ini, fin) alineadas a múltiplos de ventana_seg (epoch), para
+    que dos ejecuciones con rangos solapados compartan checkpoints.
+    """
+    ventanas = []
+    ini = desde - desde % ventana_seg
+    while ini < hasta:
+        ventanas.append((ini, ini + ventana_seg))
+        ini += ventana_seg
+    return ventanas
+
+
+def _campos_host(items: dict) -> dict[str, tuple[str, str, int]]:
+    """itemid -> (tipo, campo o servicio, value_type) de lo que se carga."""
+    campos = {}
+    for key_zbx, (campo, value_type) in METRICAS_DIAGNOSTICO.items():
+        if campo in _CAMPOS_MEDICION and key_zbx in items:
+            campos[items[key_zbx]] = ("metrica", campo, value_type)
+    for key_zbx, nombre in SERVICIOS_CLAVE.items():
+        if key_zbx in items:
+            campos[items[key_zbx]] = ("servicio", nombre, 3)
+    return campos
+
+
+def _leer_ventana(cliente: ZabbixClient, campos: dict, ini: int, fin: int) -> list[tuple[str, int, float]]:
+    """(itemid, clock, valor) de todos los items del host en [ini, fin): un history.get por value_type."""
+    por_tipo: dict[int, list[str]] = {}
+    for itemid, (_, _, value_type) in campos.items():
+        por_tipo.setdefault(value_type, []).append(itemid)
+    with cliente.lote() as lote:
+        llamadas = [
+            lote.agregar("history.get", {
+                "output": ["itemid", "clock", "value"],
+                "history": value_type,
+                "itemids": itemids,
+                "time_from": ini,
+                "time_till": fin - 1,
+                "sortfield": "clock",
+                "sortorder": "ASC",
+            })
+            for value_type, itemids in por_tipo.items()
+        ]
+    return [
+        (f["itemid"], int(f["clock"]), float(f["value"]))
+        for llamada in llamadas
+        for f in llamada.resultado
+    ]
+
+
+def _filas_ventana(hostname: str, hostid: str, campos: dict, historial, paso: int) -> list[tuple]:
+    """Filas de mediciones (ver historico._COLUMNAS), una por paso con datos."""
+    cubetas: dict[int, dict[str, list]] = {}
+    cambios = []
+    for itemid, clock, valor in historial:
+        tipo, campo, _ = campos[itemid]
+        if tipo == "servicio":
+            cambios.append((clock, campo, int(valor)))
+            continue
+        acc = cubetas.setdefault(clock - clock % paso, {}).setdefault(campo, [0.0, 0])
+        acc[0] += valor
+        acc[1] += 1
+    cambios.sort()
+
+    filas = []
+    servicios: dict[str, int] = {}
+    i = 0
+    for cubeta in sorted(cubetas):
+        while i < len(cambios) and cambios[i][0] < cubeta + paso:
+            servicios[cambios[i][1]] = cambios[i][2]
+            i += 1
+        zbx = {"hostname": hostname, "hostid": hostid, "servicios": dict(servicios)}
+        for campo, (suma, n) in cubetas[cubeta].items():
+            zbx[campo] = suma / n
+        diag = {"zabbix": zbx, "estado_global": calcular_estado_global(zbx)["estado_global"]}
+        filas.append(historico._fila_medicion(
+            diag,
+            ts=datetime.fromtimestamp(cubeta),
+            medicion_id=str(uuid.uuid5(_ESPACIO_ID, f"{hostname}:{cubeta}")),
+        ))
+    return filas
+
+
+# ---------- Escritura ----------
+
+def _texto_copy(valor) -> str:
+    """Un campo en el formato de texto de COPY."""
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _escribir_pg(filas: list[tuple], punto: Optional[tuple]) -> int:
+    """COPY a una tabla temporal y de ahí a mediciones; devuelve las filas nuevas."""
+    buf = io.StringIO()
+    for fila in filas:
+        buf.write("\t".join(_texto_copy(v) for v in fila))
+        buf.write("\n")
+    buf.seek(0)
+    columnas = historico._LISTA_COLUMNAS
+    hosts = {f[historico._IDX_HOSTNAME] for f in filas}
+    with historico._pool_pg.conexion() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS backfill_tmp ON COMMIT DELETE ROWS AS "
+            f"SELECT {columnas} FROM mediciones WITH NO DATA"
+        )
+        cur.copy_expert(f"COPY backfill_tmp ({columnas}) FROM STDIN", buf)
+        cur.execute(
+            f"INSERT INTO mediciones ({columnas}) SELECT {columnas} FROM backfill_tmp "
+            f"ON CONFLICT (medicion_id, ts) DO NOTHING"
+        )
+        nuevas = cur.rowcount
+        if punto is not None:
+            cur.execute(
+                "INSERT INTO backfill_puntos (hostname, desde, hasta, filas) VALUES (%s, %s, %s, %s) "
+                "ON CONFLICT DO NOTHING",
+                punto + (nuevas,),
+            )
+    if nuevas:
+        # Los resúmenes están en el SQLite local: se invalidan tras el commit.
+        historico._resumenes.invalidar(hosts)
+    return nuevas
+
+
+def _escribir_sqlite(filas: list[tuple], punto: Optional[tuple]) -> int:
+    """
+    INSERT OR IGNORE en mediciones; devuelve las filas nuevas, como
+    _escribir_pg. En la misma transacción borra los resúmenes incrementales
+    afectados, que no conocen estas filas (se vuelven a sembrar al leerlos).
+    """
+    invalidar, claves = historico._sql_invalidar_resumenes({f[historico._IDX_HOSTNAME] for f in filas})
+    with historico._base_sqlite.transaccion() as con:
+        antes = con.total_changes
+        con.executemany(
+            historico._SQL_INSERT_SQLITE,
+            [(f[0], f[1].isoformat(timespec="seconds")) + tuple(f[2:]) for f in filas],
+        )
+        nuevas = con.total_changes - antes
+        if nuevas:
+            con.execute(invalidar, claves)
+        if punto is not None:
+            con.execute(
+                "INSERT OR IGNORE INTO backfill_puntos (hostname, desde, hasta, filas) VALUES (?, ?, ?, ?)",
+                punto + (nuevas,),
+            )
+    if nuevas:
+        historico._resumenes.olvidar(claves)
+    return nuevas
+
+
+def _hechas(pg: bool) -> set[tuple[str, int, int]]:
+    """(hostname, desde, hasta) de las ventanas ya cargadas."""
+    sql = "SELECT hostname, desde, hasta FROM backfill_puntos"
+    if pg:
+        filas = historico._consultar_pg(sql, ())
+        if filas is None:
+            raise RuntimeError("Postgres no disponible para el backfill.")
+    else:
+        historico.preparar_sqlite()
+        filas = historico._base_sqlite.lector().execute(sql).fetchall()
+    return {tuple(f) for f in filas}
+
+
+# ---------- Orquestación ----------
+
+def ejecutar_backfill(
+    desde: datetime,
+    hasta: datetime,
+    hosts: Optional[list[str]] = None,
+    grupo: Optional[str] = None,
+    cliente: Optional[ZabbixClient] = None,
+    concurrencia: int = BACKFILL_CONCURRENCIA,
+    ventana_seg: int = BACKFILL_VENTANA_SEG,
+    paso_seg: int = BACKFILL_PASO_SEG,
+    progreso: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Carga [desde, hasta) de los hosts (lista o grupo de Zabbix) en
+    mediciones: Postgres si está habilitado, si no SQLite. Devuelve (y
+    pasa a `progreso` tras cada ventana) {"ventanas", "hechas", "saltadas",
+    "errores", "filas", "seg", "filas_por_seg", "ultimo_error"}.
+    """
+    propio = cliente is None
+    if propio:
+        cliente = ZabbixClient(ZABBIX_URL, ZABBIX_TOKEN, pool_size=max(concurrencia, 1))
+    pg = historico._pg_enabled()
+    escribir = _escribir_pg if pg else _escribir_sqlite
+    ahora = int(time.time())
+    ini, fin = int(desde.timestamp()), int(hasta.timestamp())
+
+    stats = {"ventanas": 0, "hechas": 0, "saltadas": 0, "errores": 0, "filas": 0,
+             "seg": 0.0, "filas_por_seg": 0.0, "ultimo_error": None}
+    lock = threading.Lock()
+    inicio = time.monotonic()
+
+    def trabajo(hostname: str, hostid: str, campos: dict, v_ini: int, v_fin: int) -> int:
+        historial = _leer_ventana(cliente, campos, max(v_ini, ini), min(v_fin, fin))
+        filas = _filas_ventana(hostname, hostid, campos, historial, paso_seg)
+        # Solo se da por hecha una ventana completa y ya pasada.
+        completa = v_ini >= ini and v_fin <= fin and v_fin <= ahora
+        return escribir(filas, (hostname, v_ini, v_fin) if completa else None) if filas or completa else 0
+
+    try:
+        resueltos = cliente.get_host_ids(hostnames=hosts, grupo=grupo)
+        search_keys = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
+        mapeos = cliente.get_items_for_hosts(list(resueltos.values()), search_keys)
+        hechas = _hechas(pg)
+        if pg:
+            with historico._pool_pg.conexion() as conn:
+                cur = conn.cursor()
+                if particiones.esta_particionada(cur):
+                    particiones.asegurar(cur, desde, hasta)
+
+        ventanas = _ventanas(ini, fin, ventana_seg)
+        tareas = []
+        for hostname, hostid in sorted(resueltos.items()):
+            campos = _campos_host(mapeos.get(hostid, {}))
+            if not campos:
+                continue
+            for v_ini, v_fin in ventanas:
+                stats["ventanas"] += 1
+                if (hostname, v_ini, v_fin) in hechas:
+                    stats["saltadas"] += 1
+                else:
+                    tareas.append((hostname, hostid, campos, v_ini, v_fin))
+
+        # Envío acotado: nunca más de `concurrencia` ventanas en memoria.
+        with ThreadPoolExecutor(max_workers=max(concurrencia, 1), thread_name_prefix="backfill") as pool:
+            pendientes: set = set()
+            siguientes = iter(tareas)
+            while True:
+                for tarea in siguientes:
+                    pendientes.add(pool.submit(trabajo, *tarea))
+                    if len(pendientes) >= concurrencia:
+                        break
+                if not pendientes:
+                    break
+                hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    with lock:
+                        try:
+                            stats["filas"] += futuro.result()
+                            stats["hechas"] += 1
+                        except Exception as e:
+                            stats["errores"] += 1
+                            stats["ultimo_error"] = str(e)
+                        stats["seg"] = time.monotonic() - inicio
+                        stats["filas_por_seg"] = stats["filas"] / stats["seg"] if stats["seg"] > 0 else 0.0
+                    if progreso:
+                        progreso(dict(stats))
+    finally:
+        if propio:
+            cliente.cerrar()
+    stats["seg"] = time.monotonic() - inicio
+    stats["filas_por_seg"] = stats["filas"] / stats["seg"] if stats["seg"] > 0 else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--hosts", nargs="+", help="nombres técnicos de los hosts")
+    origen.add_argument("--grupo", help="grupo de hosts de Zabbix")
+    parser.add_argument("--dias", type=float, default=30, help="hacia atrás desde ahora (si no hay --desde)")
+    parser.add_argument("--desde", type=datetime.fromisoformat)
+    parser.add_argument("--hasta", type=datetime.fromisoformat)
+    parser.add_argument("--concurrencia", type=int, default=BACKFILL_CONCURRENCIA)
+    parser.add_argument("--paso", type=int, default=BACKFILL_PASO_SEG, help="segundos entre filas")
+    args = parser.parse_args()
+
+    hasta = args.hasta or datetime.now()
+    desde = args.desde or datetime.fromtimestamp(hasta.timestamp() - args.dias * 86400)
+    ultimo = [0.0]
+
+    def mostrar(s: dict) -> None:
+        if time.monotonic() - ultimo[0] >= 2:
+            ultimo[0] = time.monotonic()
+            hechas = s["hechas"] + s["errores"] + s["saltadas"]
+            print(f"{hechas}/{s['ventanas']} ventanas, {s['filas']} filas, "
+                  f"{s['filas_por_seg']:.0f} filas/s, {s['errores']} errores", flush=True)
+
+    s = ejecutar_backfill(desde, hasta, hosts=args.hosts, grupo=args.grupo,
+                          concurrencia=args.concurrencia, paso_seg=args.paso, progreso=mostrar)
+    print(f"Listo: {s['hechas']} ventanas cargadas ({s['saltadas']} ya estaban), {s['filas']} filas "
+          f"en {s['seg']:.1f} s ({s['filas_por_seg']:.0f} filas/s), {s['errores']} errores.")
+    if s["ultimo_error"]:
+        print(f"Último error: {s['ultimo_error']}")
+    historico.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Caché de resolución de IDs de Zabbix (hostname -> hostid, claves -> itemids).
+Vive en memoria y se persiste en un JSON pequeño junto a reportes/historico.db,
+así que tras reiniciar la app el primer diagnóstico ya no resuelve IDs.
+Cada entrada caduca a los ZABBIX_CACHE_TTL segundos (0 = sin caché).
+Las entradas van por servidor (la URL de la API): dos Zabbix distintos
+pueden tener el mismo hostname con otros IDs.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from utils.archivos import guardar_json_atomico
+from utils.config import ZABBIX_CACHE_TTL
+
+CACHE_PATH = Path("reportes/cache_zabbix.json")
+VERSION_CACHE = 2
+
+
+def _clave_items(search_keys: Iterable[str]) -> str:
+    return "\n".join(sorted(set(search_keys)))
+
+
+class CacheResolucion:
+    def __init__(self, ttl_seg: float = ZABBIX_CACHE_TTL, ruta: Optional[Path] = CACHE_PATH):
+        self.ttl_seg = ttl_seg
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._cargado = False
+        self._hosts: dict[str, dict] = {}   # servidor -> hostname -> {"hostid", "ts"}
+        self._items: dict[str, dict] = {}   # servidor -> hostid -> {clave_items: {"items", "ts"}}
+
+    # --------- Persistencia ---------
+
+    def _cargar(self) -> None:
+        if self._cargado:
+            return
+        self._cargado = True
+        if self.ruta is None or not self.ruta.exists():
+            return
+        try:
+            data = json.loads(self.ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return  # caché corrupta o ilegible: se reconstruye sola
+        if data.get("version") != VERSION_CACHE:
+            return
+        self._hosts = data.get("hosts", {})
+        self._items = data.get("items", {})
+
+    def _persistir(self) -> None:
+        if self.ruta is None:
+            return
+        guardar_json_atomico(self.ruta, {"version": VERSION_CACHE, "hosts": self._hosts, "items": self._items})
+
+    def _vigente(self, entrada: dict) -> bool:
+        return time.time() - entrada.get("ts", 0) < self.ttl_seg
+
+    # --------- API ---------
+
+    @property
+    def activa(self) -> bool:
+        return self.ttl_seg > 0
+
+    def hostid(self, servidor: str, hostname: str) -> Optional[str]:
+        if not self.activa:
+            return None
+        with self._lock:
+            self._cargar()
+            entrada = self._hosts.get(servidor, {}).get(hostname)
+            if entrada and self._vigente(entrada):
+                return entrada["hostid"]
+        return None
+
+    def items(self, servidor: str, hostid: str, search_keys: Iterable[str]) -> Optional[dict]:
+        if not self.activa:
+            return None
+        with self._lock:
+            self._cargar()
+            entrada = self._items.get(servidor, {}).get(hostid, {}).get(_clave_items(search_keys))
+            if entrada and self._vigente(entrada):
+                return dict(entrada["items"])
+        return None
+
+    def guardar_host(self, servidor: str, hostname: str, hostid: str) -> None:
+        self.guardar_hosts(servidor, {hostname: hostid})
+
+    def guardar_hosts(self, servidor: str, hosts: dict[str, str]) -> None:
+        """hostname -> hostid de varios hosts; el JSON se escribe una sola vez."""
+        if not self.activa or not hosts:
+            return
+        ahora = time.time()
+        with self._lock:
+            self._cargar()
+            destino = self._hosts.setdefault(servidor, {})
+            for hostname, hostid in hosts.items():
+                destino[hostname] = {"hostid": hostid, "ts": ahora}
+            self._persistir()
+
+    def guardar_items(self, servidor: str, hostid: str, search_keys: Iterable[str], items: dict) -> None:
+        self.guardar_items_lote(servidor, search_keys, {hostid: items})
+
+    def guardar_items_lote(self, servidor: str, search_keys: Iterable[str], mapeos: dict[str, dict]) -> None:
+        """hostid -> mapeo de items de varios hosts; el JSON se escribe una sola vez."""
+        if not self.activa or not mapeos:
+            return
+        clave = _clave_items(search_keys)
+        ahora = time.time()
+        with self._lock:
+            self._cargar()
+            destino = self._items.setdefault(servidor, {})
+            for hostid, items in mapeos.items():
+                destino.setdefault(hostid, {})[clave] = {"items": dict(items), "ts": ahora}
+            self._persistir()
+
+    def invalidar(self, servidor: str, hostname: str) -> None:
+        """Olvida el hostid del host y todos sus mapeos de items."""
+        with self._lock:
+            self._cargar()
+            entrada = self._hosts.get(servidor, {}).pop(hostname, None)
+            if entrada:
+                self._items.get(servidor, {}).pop(entrada["hostid"], None)
+            self._persistir()
+
+
+# Compartida por todos los ZabbixClient del proceso (reconocimiento_inicial
+# crea uno nuevo en cada refresco).
+cache_compartida = CacheResolucion()
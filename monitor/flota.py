@@ -0,0 +1,145 @@
+"""
+Diagnóstico de muchos hosts de Zabbix a la vez (flota).
+
+Los hostid se resuelven en bloque; después los hosts se reparten en bloques
+de ZABBIX_FLOTA_BLOQUE y cada bloque se resuelve con un item.get y una
+lectura de últimos valores para todos sus hosts. Los bloques corren en
+paralelo (hasta ZABBIX_FLOTA_CONCURRENCIA) y los resultados se entregan
+a medida que terminan.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, Optional
+
+from monitor.reconocimiento import calcular_estado_global
+from monitor.zabbix_client import ZabbixClient, METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+from utils.config import (
+    ZABBIX_URL,
+    ZABBIX_TOKEN,
+    ZABBIX_FLOTA_CONCURRENCIA,
+    ZABBIX_FLOTA_BLOQUE,
+    ZABBIX_FLOTA_TIMEOUT,
+)
+
+
+def _resultado(hostname: str, hostid: Optional[str], diag: Optional[dict], error: Optional[str], duracion: float) -> dict:
+    estado = calcular_estado_global(diag) if diag is not None else {
+        "estado_global": "DESCONOCIDO",
+        "motivos_estado": [error] if error else [],
+    }
+    return {
+        "hostname": hostname,
+        "hostid": hostid,
+        "zabbix": diag,
+        "estado_global": estado["estado_global"],
+        "motivos_estado": estado["motivos_estado"],
+        "error": error,
+        "duracion_seg": duracion,
+    }
+
+
+def _diagnosticar_bloque(cliente: ZabbixClient, bloque: list[tuple[str, str]], inicios: dict, clave) -> list[dict]:
+    inicios[clave] = time.monotonic()
+    search_keys = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
+    mapeos = cliente.get_items_for_hosts([hostid for _, hostid in bloque], search_keys)
+
+    pedidos: dict[str, int] = {}
+    for _, hostid in bloque:
+        pedidos.update(cliente.pedidos_para(mapeos.get(hostid, {})))
+    ultimos = cliente.obtener_ultimos_valores(pedidos, estricto=False)
+
+    duracion = time.monotonic() - inicios[clave]
+    resultados = []
+    for hostname, hostid in bloque:
+        items = mapeos.get(hostid, {})
+        if items:
+            diag, error = cliente.armar_diagnostico(hostname, hostid, items, ultimos), None
+        else:
+            # Sin items no hay métricas: el estado es DESCONOCIDO, no OK.
+            diag, error = None, "Host sin items de diagnóstico en Zabbix."
+        resultados.append(_resultado(hostname, hostid, diag, error, duracion))
+    return resultados
+
+
+def obtener_diagnostico_flota(
+    hosts: Optional[list[str]] = None,
+    grupo: Optional[str] = None,
+    cliente: Optional[ZabbixClient] = None,
+    max_concurrencia: int = ZABBIX_FLOTA_CONCURRENCIA,
+    tamano_bloque: int = ZABBIX_FLOTA_BLOQUE,
+    timeout_host: float = ZABBIX_FLOTA_TIMEOUT,
+    estadisticas: Optional[dict] = None,
+) -> Iterator[dict]:
+    """
+    Genera un resultado por host a medida que se completan:
+    {"hostname", "hostid", "zabbix", "estado_global", "motivos_estado",
+     "error", "duracion_seg"}.
+
+    - hosts / grupo: lista de nombres técnicos o nombre de grupo de Zabbix.
+    - timeout_host: tiempo máximo del diagnóstico de un host; se mide sobre
+      su bloque, que es la unidad de trabajo. Los hosts que lo superan se
+      devuelven con error y estado "DESCONOCIDO".
+    - estadisticas: dict opcional que se rellena al terminar con
+      hosts, errores, duracion_seg y hosts_por_seg.
+    """
+    propio = cliente is None
+    if propio:
+        cliente = ZabbixClient(ZABBIX_URL, ZABBIX_TOKEN, pool_size=max(max_concurrencia, 1))
+
+    inicio = time.monotonic()
+    total = errores = 0
+    try:
+        resueltos = cliente.get_host_ids(hostnames=hosts, grupo=grupo)
+        for hostname in hosts or []:
+            if hostname not in resueltos:
+                total += 1
+                errores += 1
+                yield _resultado(hostname, None, None, f"No se encontró host con nombre {hostname}", 0.0)
+
+        pares = sorted(resueltos.items())
+        bloques = [pares[i:i + tamano_bloque] for i in range(0, len(pares), max(tamano_bloque, 1))]
+        inicios: dict = {}
+        pool = ThreadPoolExecutor(max_workers=max(max_concurrencia, 1), thread_name_prefix="flota")
+        try:
+            pendientes = {
+                pool.submit(_diagnosticar_bloque, cliente, bloque, inicios, n): (n, bloque)
+                for n, bloque in enumerate(bloques)
+            }
+            while pendientes:
+                hechos, _ = wait(pendientes, timeout=0.1, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    n, bloque = pendientes.pop(futuro)
+                    try:
+                        resultados = futuro.result()
+                    except Exception as e:
+                        duracion = time.monotonic() - inicios.get(n, inicio)
+                        resultados = [_resultado(h, hid, None, f"Error consultando Zabbix: {e}", duracion) for h, hid in bloque]
+                    for r in resultados:
+                        total += 1
+                        errores += r["error"] is not None
+                        yield r
+
+                # Bloques en ejecución que superaron el timeout: se abandonan.
+                ahora = time.monotonic()
+                for futuro, (n, bloque) in list(pendientes.items()):
+                    if n in inicios and ahora - inicios[n] > timeout_host:
+                        pendientes.pop(futuro)
+                        futuro.cancel()
+                        for h, hid in bloque:
+                            total += 1
+                            errores += 1
+                            yield _resultado(h, hid, None, f"Timeout ({timeout_host:g} s) consultando Zabbix.", ahora - inicios[n])
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    finally:
+        if propio:
+            cliente.cerrar()
+        if estadisticas is not None:
+            duracion = time.monotonic() - inicio
+            estadisticas.update({
+                "hosts": total,
+                "errores": errores,
+                "duracion_seg": duracion,
+                "hosts_por_seg": total / duracion if duracion > 0 else 0.0,
+            })
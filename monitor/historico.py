@@ -3,58 +3,159 @@ Módulo de histórico de mediciones.
 Usa PostgreSQL si PG_ENABLED=true en .env, de lo contrario usa SQLite local.
 """
 
+import atexit
+import json
+import logging
 import os
+import queue
 import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional
 
 import psycopg2
-from psycopg2.extras import DictCursor
+import psycopg2.pool
+from psycopg2.extras import DictCursor, execute_values
 
+from monitor import particiones
+from monitor.agregados import AcumuladoHost, METRICAS_RESUMEN, Percentil95
 from utils.config import (
     PG_HOST,
     PG_PORT,
     PG_DB,
     PG_USER,
     PG_PASSWORD,
+    PG_POOL_MIN,
+    PG_POOL_MAX,
+    PG_POOL_CHEQUEO_SEG,
+    PG_CONNECT_TIMEOUT,
+    PG_INTERRUPTOR_FALLOS,
+    PG_INTERRUPTOR_SEG,
+    PG_REENVIO_LOTE,
+    PG_REENVIO_SEG,
+    PG_PARTICIONADO,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_KB,
+    SQLITE_MMAP_MB,
+    HISTORICO_ASINCRONO,
+    HISTORICO_COLA_MAX,
+    HISTORICO_LOTE,
+    HISTORICO_FLUSH_SEG,
+    HISTORICO_COLA_ESPERA_SEG,
+    HISTORICO_RESUMEN_INCREMENTAL,
+    HISTORICO_VENTANA_RESUMEN,
+    HISTORICO_EWMA_ALFA,
 )
 
 # SQLite como fallback/local
 DB_PATH = Path("reportes/historico.db")
 
+_log = logging.getLogger(__name__)
+
 
 def _pg_enabled() -> bool:
     return os.getenv("PG_ENABLED", "false").lower() == "true"
 
 
-# ---------- PostgreSQL ----------
+# Columnas de una fila de mediciones, en el orden de las tuplas de _fila_medicion().
+_COLUMNAS = (
+    "medicion_id", "ts", "hostid", "hostname", "fuente",
+    "cpu_uso", "ram_uso", "disco_c_uso", "swap_pfree", "estado_global", "servicios",
+)
+_LISTA_COLUMNAS = ", ".join(_COLUMNAS)
 
-def _get_pg_conn():
+
+def _fila_medicion(diag: Dict[str, Any], ts: Optional[datetime] = None, medicion_id: Optional[str] = None) -> tuple:
     """
-    Devuelve conexión a Postgres o None si falla.
-    Requiere que el contenedor 'diag_postgres' esté arriba.
+    Fila de mediciones a partir del diagnóstico (ver _COLUMNAS).
+    El ts es el del momento de la medición y el ID se genera aquí, así una
+    misma fila puede reintentarse sin duplicarse. Sirve tanto para el
+    resultado de reconocimiento_inicial() como para los de la flota; el
+    backfill pasa su propio ts e ID.
     """
-    try:
-        conn = psycopg2.connect(
-            host=PG_HOST,
-            port=int(PG_PORT),
-            dbname=PG_DB,
-            user=PG_USER,
-            password=PG_PASSWORD or None,
-            cursor_factory=DictCursor,
+    zbx = diag.get("zabbix") or {}
+    hostname = zbx.get("hostname") or diag.get("hostname") or diag.get("sistema_local", {}).get("hostname")
+    servicios = zbx.get("servicios")
+    return (
+        medicion_id or str(uuid.uuid4()),
+        ts or datetime.now(),  # timezone naive; Postgres lo almacena como timestamptz
+        zbx.get("hostid") or diag.get("hostid"),
+        hostname,
+        diag.get("fuente") or ("zabbix" if zbx else "local"),
+        zbx.get("cpu_uso_pct"),
+        zbx.get("ram_uso_pct"),
+        zbx.get("disco_c_uso_pct"),
+        zbx.get("swap_pfree_pct"),
+        diag.get("estado_global", "OK"),
+        json.dumps(servicios) if servicios else None,
+    )
+
+
+def _dict_medicion(row) -> dict:
+    """Fila leída (PG o SQLite) -> dict con ts como datetime y servicios como dict."""
+    d = dict(zip(_COLUMNAS, row))
+    if isinstance(d["ts"], str):
+        d["ts"] = datetime.fromisoformat(d["ts"])
+    if isinstance(d["servicios"], str):
+        d["servicios"] = json.loads(d["servicios"])
+    return d
+
+
+# Niveles de agregación de mediciones (tabla mediciones_<nivel>) y su tamaño
+# de cubeta en segundos; los calcula monitor/rollups.py.
+NIVELES_ROLLUP = {"1m": 60, "1h": 3600, "1d": 86400}
+ESTADISTICAS_ROLLUP = ("avg", "min", "max", "p95")
+
+
+def _ddl_rollups(tipo_ts: str, tipo_real: str, tipo_id: str) -> list[str]:
+    columnas = ",\n".join(
+        f"            {m}_{e} {tipo_real}" for m in METRICAS_RESUMEN for e in ESTADISTICAS_ROLLUP
+    )
+    ddl = []
+    for nivel in NIVELES_ROLLUP:
+        ddl.append(f"""
+        CREATE TABLE IF NOT EXISTS mediciones_{nivel} (
+            hostname TEXT NOT NULL,
+            cubeta {tipo_ts} NOT NULL,
+            muestras INTEGER NOT NULL,
+{columnas},
+            PRIMARY KEY (hostname, cubeta)
         )
-        return conn
-    except Exception:
-        return None
+        """)
+        ddl.append(f"CREATE INDEX IF NOT EXISTS mediciones_{nivel}_cubeta ON mediciones_{nivel} (cubeta)")
+    # Marca de agua: id de la última fila cruda ya agregada en cada nivel.
+    ddl.append(f"""
+        CREATE TABLE IF NOT EXISTS rollups_estado (
+            nivel TEXT PRIMARY KEY,
+            ultimo_id {tipo_id} NOT NULL
+        )
+        """)
+    return ddl
 
 
-def _init_pg():
-    conn = _get_pg_conn()
-    if conn is None:
-        return
-    cur = conn.cursor()
-    cur.execute(
+# Ventanas (epoch, [desde, hasta)) ya cargadas por monitor/backfill.py; se
+# anotan en la misma transacción que sus filas.
+_DDL_BACKFILL = """
+    CREATE TABLE IF NOT EXISTS backfill_puntos (
+        hostname TEXT NOT NULL,
+        desde BIGINT NOT NULL,
+        hasta BIGINT NOT NULL,
+        filas INTEGER NOT NULL,
+        PRIMARY KEY (hostname, desde, hasta)
+    )
+"""
+
+
+# ---------- PostgreSQL ----------
+
+# Migraciones del esquema PG: (versión, sentencias). Se aplican una vez por
+# proceso las que falten respecto a la versión guardada en esquema_version.
+_MIGRACIONES_PG = [
+    (1, [
         """
         CREATE TABLE IF NOT EXISTS mediciones (
             id SERIAL PRIMARY KEY,
@@ -65,79 +166,356 @@ def _init_pg():
             swap_pfree DOUBLE PRECISION,
             estado_global TEXT
         )
+        """,
+    ]),
+    # ID de medición generado en el cliente: el reenvío desde el spool es idempotente.
+    (2, [
+        "ALTER TABLE mediciones ADD COLUMN IF NOT EXISTS medicion_id UUID",
+        "CREATE UNIQUE INDEX IF NOT EXISTS mediciones_medicion_id ON mediciones (medicion_id)",
+    ]),
+    # Multi-host: host, origen del dato y estado de servicios. Las filas
+    # anteriores quedan con hostname NULL.
+    (3, [
+        "ALTER TABLE mediciones ADD COLUMN IF NOT EXISTS hostid TEXT",
+        "ALTER TABLE mediciones ADD COLUMN IF NOT EXISTS hostname TEXT",
+        "ALTER TABLE mediciones ADD COLUMN IF NOT EXISTS fuente TEXT",
+        "ALTER TABLE mediciones ADD COLUMN IF NOT EXISTS servicios JSONB",
+        "CREATE INDEX IF NOT EXISTS mediciones_host_ts ON mediciones (hostname, ts)",
+        "CREATE INDEX IF NOT EXISTS mediciones_ts ON mediciones (ts)",
+    ]),
+    # Agregados 1m/1h/1d (monitor/rollups.py).
+    (4, _ddl_rollups("TIMESTAMPTZ", "DOUBLE PRECISION", "BIGINT")),
+    # Idempotencia sobre (medicion_id, ts): una tabla particionada por ts
+    # (monitor/particiones.py) solo admite índices únicos que incluyan ts.
+    (5, [
+        "CREATE UNIQUE INDEX IF NOT EXISTS mediciones_medicion_id_ts ON mediciones (medicion_id, ts)",
+        "DROP INDEX IF EXISTS mediciones_medicion_id",
+    ]),
+    # Ventanas ya cargadas por monitor/backfill.py.
+    (6, [_DDL_BACKFILL]),
+]
+
+
+class _Interruptor:
+    """
+    Circuit breaker para Postgres: tras PG_INTERRUPTOR_FALLOS fallos de
+    conexión seguidos se abre y las llamadas fallan al instante durante
+    PG_INTERRUPTOR_SEG; luego deja pasar una sola prueba (semiabierto).
+    """
+
+    def __init__(self, fallos_apertura: int, espera_seg: float):
+        self.fallos_apertura = max(fallos_apertura, 1)
+        self.espera_seg = espera_seg
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self._fallos < self.fallos_apertura:
+                return True
+            ahora = time.monotonic()
+            if ahora < self._abierto_hasta:
+                return False
+            # Semiabierto: esta llamada es la prueba; las demás siguen esperando.
+            self._abierto_hasta = ahora + self.espera_seg
+            return True
+
+    def exito(self) -> None:
+        with self._lock:
+            self._fallos = 0
+
+    def fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self._fallos >= self.fallos_apertura:
+                self._abierto_hasta = time.monotonic() + self.espera_seg
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._fallos < self.fallos_apertura:
+                return "cerrado"
+            return "abierto" if time.monotonic() < self._abierto_hasta else "semiabierto"
+
+
+class _PoolPG:
+    """
+    Pool de conexiones Postgres compartido por todo el proceso.
+    - Entre PG_POOL_MIN y PG_POOL_MAX conexiones; si están todas en uso,
+      espera a que se libere una (psycopg2 lanzaría PoolError).
+    - Al prestar una conexión descarta las cerradas y valida con SELECT 1
+      las que llevan más de PG_POOL_CHEQUEO_SEG ociosas (reconexión).
+    - Crea/migra el esquema la primera vez que se conecta.
+    - Con Postgres caído, el interruptor evita esperar PG_CONNECT_TIMEOUT
+      en cada llamada.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, chequeo_seg: float):
+        self.minconn = minconn
+        self.maxconn = max(maxconn, 1)
+        self.chequeo_seg = chequeo_seg
+        self._pool = None
+        self._lock = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(self.maxconn)
+        self._ultimo_uso: dict[int, float] = {}
+        self._esquema_ok = False
+        self.interruptor = _Interruptor(PG_INTERRUPTOR_FALLOS, PG_INTERRUPTOR_SEG)
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = psycopg2.pool.ThreadedConnectionPool(
+                    self.minconn,
+                    self.maxconn,
+                    host=PG_HOST,
+                    port=int(PG_PORT),
+                    dbname=PG_DB,
+                    user=PG_USER,
+                    password=PG_PASSWORD or None,
+                    connect_timeout=PG_CONNECT_TIMEOUT,
+                    cursor_factory=DictCursor,
+                )
+            return self._pool
+
+    def _sana(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - self._ultimo_uso.get(id(conn), 0) < self.chequeo_seg:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _prestar(self, pool):
+        # Un intento extra por si la primera conexión estaba rota.
+        for _ in range(self.maxconn + 1):
+            conn = pool.getconn()
+            if self._sana(conn):
+                return conn
+            pool.putconn(conn, close=True)
+            self._ultimo_uso.pop(id(conn), None)
+        raise psycopg2.OperationalError("No se pudo obtener una conexión sana a Postgres.")
+
+    @contextmanager
+    def conexion(self):
         """
-    )
+        Presta una conexión del pool: commit al salir, rollback si hay
+        excepción. Lanza psycopg2.Error si Postgres no está disponible.
+        """
+        if not self.interruptor.permitir():
+            raise psycopg2.OperationalError("Postgres no disponible (interruptor abierto).")
+        self._cupos.acquire()
+        try:
+            try:
+                pool = self._obtener_pool()
+                conn = self._prestar(pool)
+            except psycopg2.Error:
+                self.interruptor.fallo()
+                raise
+            try:
+                if not self._esquema_ok:
+                    _asegurar_esquema_pg(conn)
+                    self._esquema_ok = True
+                yield conn
+                conn.commit()
+            except BaseException as e:
+                if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                    self.interruptor.fallo()
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            else:
+                self.interruptor.exito()
+            finally:
+                self._ultimo_uso[id(conn)] = time.monotonic()
+                pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._cupos.release()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+            self._ultimo_uso.clear()
+
+
+_pool_pg = _PoolPG(PG_POOL_MIN, PG_POOL_MAX, PG_POOL_CHEQUEO_SEG)
+
+
+def _asegurar_esquema_pg(conn) -> None:
+    """Aplica las migraciones pendientes; serializado entre procesos con un advisory lock."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('diag_mediciones_esquema'))")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS esquema_version (
+                componente TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+            """
+        )
+        cur.execute("SELECT version FROM esquema_version WHERE componente = 'mediciones'")
+        row = cur.fetchone()
+        actual = row[0] if row else 0
+        for version, sentencias in _MIGRACIONES_PG:
+            if version <= actual:
+                continue
+            for sql in sentencias:
+                cur.execute(sql)
+            cur.execute(
+                """
+                INSERT INTO esquema_version (componente, version) VALUES ('mediciones', %s)
+                ON CONFLICT (componente) DO UPDATE SET version = EXCLUDED.version
+                """,
+                (version,),
+            )
+        if PG_PARTICIONADO:
+            particiones.preparar(cur)
     conn.commit()
-    conn.close()
 
 
-def _guardar_medicion_pg(diag: Dict[str, Any]) -> bool:
-    _init_pg()
-    conn = _get_pg_conn()
-    if conn is None:
+# Errores con los que Postgres (o psycopg2 al adaptar los valores) rechaza
+# una fila concreta por su contenido. Los demás (solo lectura tras un
+# failover, permisos, tabla ausente...) afectan a cualquier fila.
+_ERRORES_DATOS = (psycopg2.DataError, psycopg2.IntegrityError, ValueError, TypeError)
+
+
+def _guardar_filas_pg(filas: list[tuple]) -> bool:
+    """
+    INSERT multi-fila (execute_values) en una sola transacción; ignora IDs
+    ya cargados. False si Postgres no puede aceptar filas (caído, interruptor
+    abierto o cualquier error que no sea de datos, que cuenta como fallo en
+    el interruptor); si rechaza el lote por sus datos (_ERRORES_DATOS), la
+    excepción se propaga (ver _guardar_o_apartar_pg).
+    """
+    try:
+        with _pool_pg.conexion() as conn:
+            cur = conn.cursor()
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO mediciones ({_LISTA_COLUMNAS})
+                VALUES %s
+                ON CONFLICT (medicion_id, ts) DO NOTHING
+                """,
+                filas,
+                page_size=1000,
+            )
+        return True
+    except _ERRORES_DATOS:
+        raise
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False  # conexion() ya lo contó en el interruptor
+    except psycopg2.Error:
+        _pool_pg.interruptor.fallo()
         return False
 
-    zbx = diag.get("zabbix", {})
-    ts = datetime.now()  # timezone naive; Postgres lo almacena como timestamptz
-    fila = (
-        ts,
-        zbx.get("cpu_uso_pct"),
-        zbx.get("ram_uso_pct"),
-        zbx.get("disco_c_uso_pct"),
-        zbx.get("swap_pfree_pct"),
-        diag.get("estado_global", "OK"),
-    )
 
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO mediciones (ts, cpu_uso, ram_uso, disco_c_uso, swap_pfree, estado_global)
-        VALUES (%s, %s, %s, %s, %s, %s)
+def _guardar_medicion_pg(diag: Dict[str, Any]) -> bool:
+    return _guardar_filas_pg([_fila_medicion(diag)])
+
+
+def _obtener_resumen_pg(n_ultimas: int, hostname: Optional[str] = None) -> Optional[dict]:
+    # Por ts (la clave de partición): con mediciones particionada se leen
+    # las particiones más recientes y el LIMIT corta sin tocar las demás.
+    if hostname is None:
+        filtro, params = "", (n_ultimas,)
+    else:
+        filtro, params = "WHERE hostname = %s", (hostname, n_ultimas)
+    try:
+        with _pool_pg.conexion() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                SELECT
+                    AVG(cpu_uso) AS cpu_prom,
+                    AVG(ram_uso) AS ram_prom,
+                    AVG(disco_c_uso) AS disco_prom,
+                    AVG(swap_pfree) AS swap_pfree_prom,
+                    COUNT(*) AS muestras
+                FROM (
+                    SELECT cpu_uso, ram_uso, disco_c_uso, swap_pfree
+                    FROM mediciones
+                    {filtro}
+                    ORDER BY ts DESC, id DESC
+                    LIMIT %s
+                ) t
+                """,
+                params,
+            )
+            row = cur.fetchone()
+    except Exception:
+        return None
+    if not row or row["muestras"] == 0:
+        return None
+    return dict(row)
+
+
+def _consultar_pg(sql: str, params: tuple) -> Optional[list]:
+    try:
+        with _pool_pg.conexion() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            return cur.fetchall()
+    except Exception:
+        return None
+
+
+def _mediciones_rango_pg(hostname: str, desde: datetime, hasta: datetime) -> Optional[list]:
+    return _consultar_pg(
+        f"""
+        SELECT {_LISTA_COLUMNAS} FROM mediciones
+        WHERE hostname = %s AND ts >= %s AND ts < %s
+        ORDER BY ts
         """,
-        fila,
+        (hostname, desde, hasta),
     )
-    conn.commit()
-    conn.close()
-    return True
 
 
-def _obtener_resumen_pg(n_ultimas: int) -> Optional[dict]:
-    _init_pg()
-    conn = _get_pg_conn()
-    if conn is None:
-        return None
-    cur = conn.cursor()
-    cur.execute(
+def _ultimas_por_host_pg(hostnames: Optional[list[str]]) -> Optional[list]:
+    # Sin lista de hosts, los distintos hostname se recorren saltando por el
+    # índice (hostname, ts) en vez de agrupar toda la tabla: el coste depende
+    # del número de hosts, no de filas.
+    if hostnames is None:
+        hosts = """
+            WITH RECURSIVE hosts(h) AS (
+                SELECT MIN(hostname) FROM mediciones
+                UNION ALL
+                SELECT (SELECT MIN(hostname) FROM mediciones WHERE hostname > h)
+                FROM hosts WHERE h IS NOT NULL
+            )
+            SELECT h FROM hosts WHERE h IS NOT NULL
         """
-        SELECT
-            AVG(cpu_uso) AS cpu_prom,
-            AVG(ram_uso) AS ram_prom,
-            AVG(disco_c_uso) AS disco_prom,
-            AVG(swap_pfree) AS swap_pfree_prom,
-            COUNT(*) AS muestras
-        FROM (
-            SELECT cpu_uso, ram_uso, disco_c_uso, swap_pfree
-            FROM mediciones
-            ORDER BY id DESC
-            LIMIT %s
-        ) t
+        params: tuple = ()
+    else:
+        hosts = "SELECT unnest(%s::text[]) AS h"
+        params = (list(hostnames),)
+    return _consultar_pg(
+        f"""
+        SELECT m.* FROM ({hosts}) hs
+        CROSS JOIN LATERAL (
+            SELECT {_LISTA_COLUMNAS} FROM mediciones
+            WHERE hostname = hs.h
+            ORDER BY ts DESC
+            LIMIT 1
+        ) m
         """,
-        (n_ultimas,),
+        params,
     )
-    row = cur.fetchone()
-    conn.close()
-    if not row or row["muestras"] == 0:
-        return None
-    return dict(row)
 
 
 # ---------- SQLite (fallback/local) ----------
 
-def _init_sqlite():
-    DB_PATH.parent.mkdir(exist_ok=True)
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute(
+# Migraciones del esquema SQLite: (versión, sentencias); la versión aplicada
+# se guarda en PRAGMA user_version.
+_MIGRACIONES_SQLITE = [
+    (1, [
         """
         CREATE TABLE IF NOT EXISTS mediciones (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -148,45 +526,225 @@ def _init_sqlite():
             swap_pfree REAL,
             estado_global TEXT
         )
+        """,
+    ]),
+    # medicion_id + spool de filas pendientes de llegar a Postgres (salida_pg).
+    (2, [
+        "ALTER TABLE mediciones ADD COLUMN medicion_id TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_mediciones_medicion_id ON mediciones (medicion_id)",
         """
-    )
-    con.commit()
-    con.close()
+        CREATE TABLE IF NOT EXISTS salida_pg (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            medicion_id TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            cpu_uso REAL,
+            ram_uso REAL,
+            disco_c_uso REAL,
+            swap_pfree REAL,
+            estado_global TEXT
+        )
+        """,
+    ]),
+    (3, [
+        "ALTER TABLE mediciones ADD COLUMN hostid TEXT",
+        "ALTER TABLE mediciones ADD COLUMN hostname TEXT",
+        "ALTER TABLE mediciones ADD COLUMN fuente TEXT",
+        "ALTER TABLE mediciones ADD COLUMN servicios TEXT",  # JSON
+        "CREATE INDEX IF NOT EXISTS idx_mediciones_host_ts ON mediciones (hostname, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_mediciones_ts ON mediciones (ts)",
+        "ALTER TABLE salida_pg ADD COLUMN hostid TEXT",
+        "ALTER TABLE salida_pg ADD COLUMN hostname TEXT",
+        "ALTER TABLE salida_pg ADD COLUMN fuente TEXT",
+        "ALTER TABLE salida_pg ADD COLUMN servicios TEXT",
+    ]),
+    # Agregados incrementales de obtener_resumen() (ver monitor/agregados.py).
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS resumenes (
+            clave TEXT PRIMARY KEY,
+            datos TEXT NOT NULL
+        )
+        """,
+    ]),
+    # Agregados 1m/1h/1d (monitor/rollups.py); cubeta en ISO como ts.
+    (5, _ddl_rollups("TEXT", "REAL", "INTEGER")),
+    (6, [_DDL_BACKFILL]),
+    # Filas que Postgres rechazó por sus datos; se apartan del spool para no
+    # bloquear el reenvío y quedan aquí, con el error, para revisarlas.
+    (7, [
+        """
+        CREATE TABLE IF NOT EXISTS salida_pg_rechazadas (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            medicion_id TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            hostid TEXT,
+            hostname TEXT,
+            fuente TEXT,
+            cpu_uso REAL,
+            ram_uso REAL,
+            disco_c_uso REAL,
+            swap_pfree REAL,
+            estado_global TEXT,
+            servicios TEXT,
+            error TEXT NOT NULL,
+            rechazada_ts TEXT NOT NULL
+        )
+        """,
+    ]),
+]
 
+_MARCADORES = ", ".join("?" * len(_COLUMNAS))
+_SQL_INSERT_SQLITE = f"INSERT OR IGNORE INTO mediciones ({_LISTA_COLUMNAS}) VALUES ({_MARCADORES})"
+_SQL_INSERT_SALIDA = f"INSERT INTO salida_pg ({_LISTA_COLUMNAS}) VALUES ({_MARCADORES})"
+_SQL_INSERT_RECHAZADA = (
+    f"INSERT INTO salida_pg_rechazadas ({_LISTA_COLUMNAS}, error, rechazada_ts) VALUES ({_MARCADORES}, ?, ?)"
+)
 
-def _guardar_medicion_sqlite(diag: Dict[str, Any]) -> None:
-    _init_sqlite()
-    zbx = diag.get("zabbix", {})
-    ts = datetime.now().isoformat(timespec="seconds")
-    fila = (
-        ts,
-        zbx.get("cpu_uso_pct"),
-        zbx.get("ram_uso_pct"),
-        zbx.get("disco_c_uso_pct"),
-        zbx.get("swap_pfree_pct"),
-        diag.get("estado_global", "OK"),
-    )
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute(
+
+class _BaseSQLite:
+    """
+    Acceso persistente a reportes/historico.db.
+    - Una conexión de escritura de larga vida, compartida entre hilos y
+      serializada con un lock; el esquema se migra al abrirla.
+    - Una conexión de lectura por hilo: en modo WAL los lectores no
+      bloquean al escritor ni al revés.
+    sqlite3 guarda las sentencias preparadas por conexión
+    (cached_statements), así que reutilizar conexiones y textos SQL
+    constantes evita recompilarlas en cada llamada.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._escritura: Optional[sqlite3.Connection] = None
+        self._ruta: Optional[Path] = None
+        self._lectura = threading.local()
+        self._generacion = 0
+
+    def _abrir(self, ruta: Path) -> sqlite3.Connection:
+        con = sqlite3.connect(ruta, check_same_thread=False, timeout=5, cached_statements=64)
+        con.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        con.execute(f"PRAGMA cache_size={-SQLITE_CACHE_KB}")
+        con.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        con.execute("PRAGMA temp_store=MEMORY")
+        # Mismo criterio que percentile_cont(0.95) de Postgres, para los rollups.
+        con.create_aggregate("percentil_95", 1, Percentil95)
+        return con
+
+    def _escritor(self) -> sqlite3.Connection:
+        """Conexión de escritura; llamar con self._lock tomado."""
+        # DB_PATH puede cambiar en tiempo de ejecución (p. ej. en benchmarks).
+        if self._escritura is not None and self._ruta == DB_PATH:
+            return self._escritura
+        self._cerrar_escritor()
+        DB_PATH.parent.mkdir(exist_ok=True)
+        con = self._abrir(DB_PATH)
+        con.execute("PRAGMA journal_mode=WAL")
+        _migrar_sqlite(con)
+        self._escritura, self._ruta = con, DB_PATH
+        self._generacion += 1
+        return con
+
+    def _cerrar_escritor(self) -> None:
+        if self._escritura is not None:
+            self._escritura.close()
+            self._escritura = None
+
+    @contextmanager
+    def transaccion(self):
         """
-        INSERT INTO mediciones (ts, cpu_uso, ram_uso, disco_c_uso, swap_pfree, estado_global)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        fila,
-    )
-    con.commit()
-    con.close()
+        Conexión de escritura en exclusiva dentro de una transacción: commit
+        al salir, rollback si hay excepción.
+        """
+        with self._lock:
+            con = self._escritor()
+            with con:
+                yield con
 
+    def preparar(self) -> None:
+        """Crea la base si no existe y aplica las migraciones pendientes."""
+        with self._lock:
+            self._escritor()
 
-def _obtener_resumen_sqlite(n_ultimas: int) -> dict:
-    if not DB_PATH.exists():
+    def escribir(self, *sentencias: tuple[str, list]) -> None:
+        """(sql, filas) ejecutadas con executemany, todas en una transacción."""
+        with self.transaccion() as con:
+            for sql, filas in sentencias:
+                con.executemany(sql, filas)
+
+    def ejecutar(self, sql: str, params: tuple = ()) -> int:
+        """Una sentencia de escritura en su propia transacción; devuelve rowcount."""
+        with self._lock:
+            con = self._escritor()
+            with con:
+                return con.execute(sql, params).rowcount
+
+    def lector(self) -> Optional[sqlite3.Connection]:
+        """Conexión de lectura del hilo actual, o None si aún no hay base."""
+        if not DB_PATH.exists():
+            return None
+        if self._escritura is None or self._ruta != DB_PATH:
+            with self._lock:
+                self._escritor()  # garantiza esquema migrado y modo WAL
+        generacion = self._generacion
+        local = self._lectura
+        if getattr(local, "generacion", None) != generacion:
+            if getattr(local, "con", None) is not None:
+                local.con.close()
+            local.con = self._abrir(DB_PATH)
+            local.con.execute("PRAGMA query_only=ON")
+            local.generacion = generacion
+        return local.con
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._cerrar_escritor()
+            self._generacion += 1
+
+
+def _migrar_sqlite(con: sqlite3.Connection) -> None:
+    actual = con.execute("PRAGMA user_version").fetchone()[0]
+    for version, sentencias in _MIGRACIONES_SQLITE:
+        if version <= actual:
+            continue
+        with con:
+            for sql in sentencias:
+                con.execute(sql)
+            con.execute(f"PRAGMA user_version={version}")
+
+
+_base_sqlite = _BaseSQLite()
+
+
+def _guardar_filas_sqlite(filas: list[tuple], al_spool: bool = False) -> None:
+    """
+    Inserta en mediciones; con al_spool=True además las deja en salida_pg,
+    en la misma transacción, para reenviarlas a Postgres.
+    """
+    # ts en ISO con segundos: ordena igual como texto que como fecha.
+    sentencias = [(
+        _SQL_INSERT_SQLITE,
+        [(f[0], f[1].isoformat(timespec="seconds")) + tuple(f[2:]) for f in filas],
+    )]
+    if al_spool:
+        sentencias.append((_SQL_INSERT_SALIDA, [(f[0], f[1].isoformat()) + tuple(f[2:]) for f in filas]))
+    _base_sqlite.escribir(*sentencias)
+
+
+def _guardar_medicion_sqlite(diag: Dict[str, Any]) -> None:
+    _guardar_filas_sqlite([_fila_medicion(diag)])
+
+
+def _obtener_resumen_sqlite(n_ultimas: int, hostname: Optional[str] = None) -> dict:
+    con = _base_sqlite.lector()
+    if con is None:
         return {}
 
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute(
-        """
+    if hostname is None:
+        filtro, params = "", (n_ultimas,)
+    else:
+        filtro, params = "WHERE hostname = ?", (hostname, n_ultimas)
+    row = con.execute(
+        f"""
         SELECT
             AVG(cpu_uso),
             AVG(ram_uso),
@@ -196,14 +754,13 @@ def _obtener_resumen_sqlite(n_ultimas: int) -> dict:
         FROM (
             SELECT cpu_uso, ram_uso, disco_c_uso, swap_pfree
             FROM mediciones
-            ORDER BY id DESC
+            {filtro}
+            ORDER BY ts DESC, id DESC
             LIMIT ?
         )
         """,
-        (n_ultimas,),
-    )
-    row = cur.fetchone()
-    con.close()
+        params,
+    ).fetchone()
 
     if not row or row[-1] == 0:
         return {}
@@ -217,29 +774,601 @@ def _obtener_resumen_sqlite(n_ultimas: int) -> dict:
     }
 
 
+def _mediciones_rango_sqlite(hostname: str, desde: datetime, hasta: datetime) -> list:
+    con = _base_sqlite.lector()
+    if con is None:
+        return []
+    return con.execute(
+        f"""
+        SELECT {_LISTA_COLUMNAS} FROM mediciones
+        WHERE hostname = ? AND ts >= ? AND ts < ?
+        ORDER BY ts, id
+        """,
+        (hostname, desde.isoformat(timespec="seconds"), hasta.isoformat(timespec="seconds")),
+    ).fetchall()
+
+
+def _ultimas_por_host_sqlite(hostnames: Optional[list[str]]) -> list:
+    con = _base_sqlite.lector()
+    if con is None:
+        return []
+    if hostnames is None:
+        # Mismo recorrido por saltos del índice que en Postgres.
+        hosts, params = """
+            WITH RECURSIVE hosts(h) AS (
+                SELECT MIN(hostname) FROM mediciones
+                UNION ALL
+                SELECT (SELECT MIN(hostname) FROM mediciones WHERE hostname > h)
+                FROM hosts WHERE h IS NOT NULL
+            )
+            SELECT h FROM hosts WHERE h IS NOT NULL
+        """, ()
+    else:
+        hosts = "SELECT value AS h FROM json_each(?)"
+        params = (json.dumps(list(hostnames)),)
+    return con.execute(
+        f"""
+        SELECT {_LISTA_COLUMNAS} FROM mediciones
+        WHERE id IN (
+            SELECT (SELECT id FROM mediciones WHERE hostname = hs.h ORDER BY ts DESC, id DESC LIMIT 1)
+            FROM ({hosts}) hs
+        )
+        ORDER BY hostname
+        """,
+        params,
+    ).fetchall()
+
+
+# ---------- Spool y reenvío a Postgres ----------
+
+
+def _motivo_rechazo(e: Exception) -> str:
+    """Clase y primera línea del error (psycopg2 añade el contexto del SQL)."""
+    lineas = str(e).strip().splitlines()
+    return f"{type(e).__name__}: {lineas[0]}" if lineas else type(e).__name__
+
+
+def _guardar_o_apartar_pg(filas: list[tuple]) -> tuple[bool, int]:
+    """
+    Escribe filas en Postgres. Si el lote se rechaza por sus datos, lo
+    reintenta fila a fila y aparta las rechazadas en salida_pg_rechazadas
+    (SQLite), así una fila envenenada no frena a las demás. Devuelve
+    (escrito, rechazadas); escrito es False solo si Postgres no está
+    disponible, y entonces no se aparta nada.
+    """
+    try:
+        return _guardar_filas_pg(filas), 0
+    except _ERRORES_DATOS:
+        pass
+    rechazadas = []
+    for fila in filas:
+        try:
+            if not _guardar_filas_pg([fila]):
+                return False, 0
+        except _ERRORES_DATOS as e:
+            rechazadas.append((fila, e))
+    ahora = datetime.now().isoformat(timespec="seconds")
+    motivos = [_motivo_rechazo(e) for _, e in rechazadas]
+    _base_sqlite.escribir((
+        _SQL_INSERT_RECHAZADA,
+        [(f[0], f[1].isoformat()) + tuple(f[2:]) + (m, ahora) for (f, _), m in zip(rechazadas, motivos)],
+    ))
+    for (fila, _), motivo in zip(rechazadas, motivos):
+        _log.warning("Postgres rechazó la medición %s (apartada en salida_pg_rechazadas): %s", fila[0], motivo)
+    return True, len(rechazadas)
+
+class _Reenvio:
+    """
+    Con PG habilitado, las filas que no pueden escribirse en Postgres van
+    a SQLite y al spool salida_pg (persistente). Un hilo de fondo las
+    reenvía en orden, en lotes de PG_REENVIO_LOTE, cuando Postgres vuelve;
+    el ON CONFLICT sobre (medicion_id, ts) hace el reenvío idempotente.
+    Mientras quede spool, las filas nuevas también pasan por él, para no
+    adelantarse a las antiguas.
+    """
+
+    def __init__(self, lote: int, espera_seg: float):
+        self.lote = max(lote, 1)
+        self.espera_seg = espera_seg
+        self._lock = threading.Lock()
+        self._pendientes: Optional[int] = None  # filas en salida_pg; se cuenta al primer uso
+        self._reenviadas = 0
+        self._rechazadas = 0
+        self._hilo: Optional[threading.Thread] = None
+        self._aviso = threading.Event()
+        self._fin = threading.Event()
+
+    def _contar(self) -> int:
+        """Llamar con self._lock tomado."""
+        if self._pendientes is None:
+            con = _base_sqlite.lector()
+            self._pendientes = (
+                con.execute("SELECT COUNT(*) FROM salida_pg").fetchone()[0] if con is not None else 0
+            )
+        return self._pendientes
+
+    def escribir(self, filas: list[tuple]) -> str:
+        """Escribe en Postgres o, si no se puede (o hay spool), al spool. Devuelve el destino."""
+        with self._lock:
+            if self._contar() == 0:
+                escrito, rechazadas = _guardar_o_apartar_pg(filas)
+                self._rechazadas += rechazadas
+                if escrito:
+                    return "escritas_pg"
+            _guardar_filas_sqlite(filas, al_spool=True)
+            self._pendientes += len(filas)
+        self._arrancar()
+        self._aviso.set()
+        return "al_spool"
+
+    def _arrancar(self) -> None:
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._fin.clear()
+                self._hilo = threading.Thread(target=self._bucle, name="historico-reenvio", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        while not self._fin.is_set():
+            with self._lock:
+                pendientes = self._contar()
+            if not pendientes:
+                self._aviso.wait(self.espera_seg)
+                self._aviso.clear()
+                continue
+            if not self.reenviar_lote():
+                self._fin.wait(self.espera_seg)
+
+    def reenviar_lote(self) -> bool:
+        """
+        Reenvía las filas más antiguas del spool. False si Postgres no está
+        disponible; las filas que rechaza por sus datos se apartan y el
+        spool avanza igual.
+        """
+        con = _base_sqlite.lector()
+        if con is None:
+            return True
+        filas = con.execute(
+            f"SELECT seq, {_LISTA_COLUMNAS} FROM salida_pg ORDER BY seq LIMIT ?",
+            (self.lote,),
+        ).fetchall()
+        rechazadas = 0
+        if filas:
+            escrito, rechazadas = _guardar_o_apartar_pg(
+                [(f[1], datetime.fromisoformat(f[2])) + tuple(f[3:]) for f in filas]
+            )
+            if not escrito:
+                return False
+        with self._lock:
+            self._rechazadas += rechazadas
+            if filas:
+                _base_sqlite.escribir(("DELETE FROM salida_pg WHERE seq <= ?", [(filas[-1][0],)]))
+                self._reenviadas += len(filas) - rechazadas
+            if len(filas) < self.lote:
+                self._pendientes = None  # recontar: el spool puede haber cambiado por fuera
+            else:
+                self._pendientes = max(self._pendientes - len(filas), 0)
+        return True
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "en_spool": self._pendientes or 0,
+                "reenviadas": self._reenviadas,
+                "rechazadas_pg": self._rechazadas,
+            }
+
+    def detener(self) -> None:
+        self._fin.set()
+        self._aviso.set()
+
+
+_reenvio = _Reenvio(PG_REENVIO_LOTE, PG_REENVIO_SEG)
+
+
+def _escribir_filas(filas: list[tuple]) -> str:
+    """Escribe filas en el histórico y devuelve el destino (clave de estadísticas)."""
+    _resumenes.preparar(filas)
+    if _pg_enabled():
+        destino = _reenvio.escribir(filas)
+    else:
+        _guardar_filas_sqlite(filas)
+        destino = "escritas_sqlite"
+    _resumenes.actualizar(filas)
+    return destino
+
+
+# ---------- Resúmenes incrementales ----------
+
+_TODOS = "*"  # clave del agregado de todas las filas (obtener_resumen sin hostname)
+_IDX_METRICAS = [_COLUMNAS.index(c) for c in METRICAS_RESUMEN]
+_IDX_HOSTNAME = _COLUMNAS.index("hostname")
+
+
+def _semilla(clave: str) -> AcumuladoHost:
+    """
+    Agregado de una clave a partir de las filas ya guardadas (una sola vez,
+    para bases anteriores a los resúmenes o claves sin estado persistido).
+    """
+    columnas = list(METRICAS_RESUMEN)
+    totales_sql = "SELECT COUNT(*), " + ", ".join(
+        f"COUNT({c}), SUM({c}), SUM({c} * {c}), MIN({c}), MAX({c})" for c in columnas
+    ) + " FROM mediciones {filtro}"
+    ventana_sql = f"SELECT {', '.join(columnas)} FROM mediciones {{filtro}} ORDER BY {{orden}} LIMIT {{ph}}"
+    params: tuple = () if clave == _TODOS else (clave,)
+    # Mismo orden que las consultas de resumen: por ts y, a igual ts, por id.
+    orden = "ts DESC, id DESC"
+
+    totales = ventana = None
+    if _pg_enabled():
+        filtro = "" if clave == _TODOS else "WHERE hostname = %s"
+        totales = _consultar_pg(totales_sql.format(filtro=filtro), params)
+        ventana = _consultar_pg(ventana_sql.format(filtro=filtro, orden=orden, ph="%s"), params + (HISTORICO_VENTANA_RESUMEN,))
+    if totales is None or ventana is None:
+        con = _base_sqlite.lector()
+        if con is None:
+            totales, ventana = [(0,) + (0, None, None, None, None) * len(columnas)], []
+        else:
+            filtro = "" if clave == _TODOS else "WHERE hostname = ?"
+            totales = con.execute(totales_sql.format(filtro=filtro), params).fetchall()
+            ventana = con.execute(
+                ventana_sql.format(filtro=filtro, orden=orden, ph="?"), params + (HISTORICO_VENTANA_RESUMEN,)
+            ).fetchall()
+
+    acc = AcumuladoHost(HISTORICO_VENTANA_RESUMEN, HISTORICO_EWMA_ALFA)
+    for fila in reversed(ventana):  # de la más antigua a la más reciente; da también el EWMA
+        acc.agregar(tuple(fila))
+    t = tuple(totales[0])
+    acc.filas = t[0]
+    for i in range(len(columnas)):
+        n, suma, suma_cuad, minimo, maximo = t[1 + 5 * i:6 + 5 * i]
+        acc.n[i] = n or 0
+        acc.suma[i] = float(suma or 0.0)
+        acc.suma_cuad[i] = float(suma_cuad or 0.0)
+        acc.minimo[i] = minimo
+        acc.maximo[i] = maximo
+    return acc
+
+
+def _sql_invalidar_resumenes(hostnames) -> tuple[str, tuple]:
+    """DELETE de los agregados persistidos de esos hosts y del de todas las filas."""
+    claves = (_TODOS, *sorted(set(hostnames)))
+    return f"DELETE FROM resumenes WHERE clave IN ({', '.join('?' * len(claves))})", claves
+
+
+class _Resumenes:
+    """
+    hostname (y "*" para todas las filas) -> AcumuladoHost. Se actualiza
+    al escribir cada lote, así obtener_resumen() es una búsqueda en memoria,
+    y se persiste en la tabla resumenes del SQLite local para sobrevivir a
+    reinicios. Refleja las filas escritas por esta instalación: con varios
+    procesos escribiendo en el mismo Postgres, desactivarlo con
+    HISTORICO_RESUMEN_INCREMENTAL=false.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acc: dict[str, AcumuladoHost] = {}
+        self._persistidas: set[str] = set()  # claves con fila en la tabla resumenes
+        self._cargado = False
+
+    def _cargar(self) -> None:
+        if self._cargado:
+            return
+        con = _base_sqlite.lector()
+        if con is not None:
+            for clave, datos in con.execute("SELECT clave, datos FROM resumenes"):
+                self._acc[clave] = AcumuladoHost.desde_dict(
+                    json.loads(datos), HISTORICO_VENTANA_RESUMEN, HISTORICO_EWMA_ALFA,
+                )
+                self._persistidas.add(clave)
+        self._cargado = True
+
+    def preparar(self, filas: list[tuple]) -> None:
+        """Siembra, antes de escribir, los agregados de hosts aún sin estado."""
+        if not HISTORICO_RESUMEN_INCREMENTAL:
+            return
+        with self._lock:
+            self._cargar()
+            for clave in {_TODOS} | {f[_IDX_HOSTNAME] for f in filas if f[_IDX_HOSTNAME]}:
+                if clave not in self._acc:
+                    self._acc[clave] = _semilla(clave)
+
+    def actualizar(self, filas: list[tuple]) -> None:
+        if not HISTORICO_RESUMEN_INCREMENTAL:
+            return
+        with self._lock:
+            sucias = {}
+            for f in filas:
+                valores = [f[i] for i in _IDX_METRICAS]
+                for clave in (_TODOS, f[_IDX_HOSTNAME]):
+                    if clave and clave in self._acc:
+                        self._acc[clave].agregar(valores)
+                        sucias[clave] = self._acc[clave]
+            datos = [(clave, json.dumps(acc.a_dict())) for clave, acc in sucias.items()]
+            nuevas = set(sucias) - self._persistidas
+        # Una fila que ya no está la borró otro proceso (p. ej. un backfill,
+        # ver invalidar()): el agregado en memoria está desfasado y se vuelve
+        # a sembrar desde la base en el próximo lote.
+        obsoletas = []
+        try:
+            with _base_sqlite.transaccion() as con:
+                for clave, texto in datos:
+                    if clave in nuevas:
+                        con.execute("INSERT OR REPLACE INTO resumenes (clave, datos) VALUES (?, ?)", (clave, texto))
+                    elif not con.execute("UPDATE resumenes SET datos = ? WHERE clave = ?", (texto, clave)).rowcount:
+                        obsoletas.append(clave)
+        except sqlite3.Error:
+            return  # se vuelve a persistir en el próximo lote
+        with self._lock:
+            self._persistidas |= nuevas
+        self.olvidar(obsoletas)
+
+    def obtener(self, hostname: Optional[str]) -> Optional[AcumuladoHost]:
+        if not HISTORICO_RESUMEN_INCREMENTAL:
+            return None
+        with self._lock:
+            self._cargar()
+            return self._acc.get(hostname or _TODOS)
+
+    def olvidar(self, claves) -> None:
+        """Descarta de memoria esos agregados; se vuelven a sembrar al usarlos."""
+        with self._lock:
+            for clave in claves:
+                self._acc.pop(clave, None)
+                self._persistidas.discard(clave)
+
+    def invalidar(self, hostnames) -> None:
+        """
+        Borra los agregados de esos hosts y el de todas las filas, en la
+        tabla y en memoria, para que se vuelvan a sembrar desde la base: las
+        filas cargadas por fuera (backfill) no pasaron por actualizar().
+        Otro proceso con el histórico abierto lo nota en su siguiente lote.
+        """
+        sql, claves = _sql_invalidar_resumenes(hostnames)
+        _base_sqlite.escribir((sql, [claves]))
+        self.olvidar(claves)
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._acc.clear()
+            self._persistidas.clear()
+            self._cargado = False
+
+
+_resumenes = _Resumenes()
+
+
+# ---------- Cola de escritura (write-behind) ----------
+
+class _Marca:
+    """Marcador en la cola: el hilo de escritura lo señala al llegar a él."""
+
+    def __init__(self, fin: bool = False):
+        self.fin = fin
+        self.hecho = threading.Event()
+
+
+class _ColaEscritura:
+    """
+    guardar_medicion() solo encola la fila; un hilo de fondo la escribe en
+    lotes de hasta HISTORICO_LOTE filas o cada HISTORICO_FLUSH_SEG segundos
+    (lo que llegue antes): INSERT multi-fila en Postgres, executemany en
+    SQLite. Si la cola está llena el llamador espera como mucho
+    HISTORICO_COLA_ESPERA_SEG y, si sigue llena, la fila se descarta.
+    """
+
+    def __init__(self, maximo: int, lote: int, intervalo_seg: float, espera_seg: float):
+        self.lote = max(lote, 1)
+        self.intervalo_seg = intervalo_seg
+        self.espera_seg = espera_seg
+        self._cola: queue.Queue = queue.Queue(maxsize=max(maximo, 1))
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._stats = {
+            "encoladas": 0,
+            "escritas_pg": 0,
+            "escritas_sqlite": 0,
+            "al_spool": 0,
+            "descartadas": 0,
+            "perdidas": 0,  # filas de lotes que fallaron al escribirse (ni en SQLite)
+            "lotes": 0,
+            "flush_total_seg": 0.0,
+            "flush_max_seg": 0.0,
+            "flush_ult_seg": 0.0,
+        }
+
+    def _arrancar(self) -> None:
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="historico-escritura", daemon=True)
+                self._hilo.start()
+
+    def encolar(self, fila: tuple) -> bool:
+        self._arrancar()
+        try:
+            self._cola.put(fila, timeout=self.espera_seg)
+        except queue.Full:
+            with self._lock:
+                self._stats["descartadas"] += 1
+            return False
+        with self._lock:
+            self._stats["encoladas"] += 1
+        return True
+
+    def _bucle(self) -> None:
+        lote: list[tuple] = []
+        limite = 0.0
+        while True:
+            try:
+                if lote:
+                    elem = self._cola.get(timeout=max(limite - time.monotonic(), 0))
+                else:
+                    elem = self._cola.get()
+            except queue.Empty:
+                elem = None
+
+            if isinstance(elem, tuple):
+                if not lote:
+                    limite = time.monotonic() + self.intervalo_seg
+                lote.append(elem)
+                if len(lote) < self.lote:
+                    continue
+            if lote:
+                self._escribir(lote)
+                lote = []
+            if isinstance(elem, _Marca):
+                elem.hecho.set()
+                if elem.fin:
+                    return
+
+    def _escribir(self, lote: list[tuple]) -> None:
+        inicio = time.perf_counter()
+        try:
+            destino = _escribir_filas(lote)
+        except Exception:
+            # Cualquier fallo (no solo de SQLite) pierde el lote, no el hilo.
+            _log.exception("No se pudo escribir un lote de %d mediciones; se pierde.", len(lote))
+            destino = "perdidas"
+        dur = time.perf_counter() - inicio
+        with self._lock:
+            st = self._stats
+            st[destino] += len(lote)
+            st["lotes"] += 1
+            st["flush_total_seg"] += dur
+            st["flush_ult_seg"] = dur
+            st["flush_max_seg"] = max(st["flush_max_seg"], dur)
+
+    def vaciar(self, timeout: Optional[float] = None, fin: bool = False) -> bool:
+        """Espera a que se escriba todo lo encolado hasta ahora."""
+        with self._lock:
+            activo = self._hilo is not None and self._hilo.is_alive()
+        if not activo:
+            if self._cola.empty():
+                return True
+            self._arrancar()
+        marca = _Marca(fin)
+        self._cola.put(marca)
+        return marca.hecho.wait(timeout)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            st = dict(self._stats)
+        total = st.pop("flush_total_seg")
+        st["en_cola"] = self._cola.qsize()
+        st["flush_prom_ms"] = round(total / st["lotes"] * 1000, 2) if st["lotes"] else 0.0
+        st["flush_ult_ms"] = round(st.pop("flush_ult_seg") * 1000, 2)
+        st["flush_max_ms"] = round(st.pop("flush_max_seg") * 1000, 2)
+        return st
+
+
+_cola_escritura = _ColaEscritura(
+    HISTORICO_COLA_MAX, HISTORICO_LOTE, HISTORICO_FLUSH_SEG, HISTORICO_COLA_ESPERA_SEG,
+)
+
+
 # ---------- API pública del módulo ----------
 
 def guardar_medicion(diag: Dict[str, Any]) -> None:
     """
     Guarda una fila en el histórico. Intenta Postgres si está habilitado;
-    si falla, usa SQLite local.
+    si falla, usa SQLite local. Con HISTORICO_ASINCRONO=true (por defecto)
+    solo encola la fila y vuelve enseguida: la escribe el hilo de fondo.
     """
-    if _pg_enabled():
-        ok = _guardar_medicion_pg(diag)
-        if ok:
-            return
-    # Fallback
-    _guardar_medicion_sqlite(diag)
+    fila = _fila_medicion(diag)
+    if HISTORICO_ASINCRONO:
+        _cola_escritura.encolar(fila)
+        return
+    _escribir_filas([fila])
 
 
-def obtener_resumen(n_ultimas: int = 20) -> dict:
+def obtener_resumen(n_ultimas: int = 20, hostname: Optional[str] = None) -> dict:
     """
-    Devuelve promedios simples de las últimas N mediciones.
-    Intenta Postgres si está habilitado; si falla, usa SQLite.
+    Devuelve promedios simples de las últimas N mediciones (de un host,
+    si se indica). Sale de los agregados incrementales si N cabe en su
+    ventana (HISTORICO_VENTANA_RESUMEN); si no, consulta Postgres si está
+    habilitado y, si falla, SQLite.
     """
+    acc = _resumenes.obtener(hostname)
+    if acc is not None:
+        resumen = acc.resumen(n_ultimas)
+        if resumen is not None:  # n_ultimas cabe en la ventana incremental
+            return resumen
     if _pg_enabled():
-        resumen = _obtener_resumen_pg(n_ultimas)
+        resumen = _obtener_resumen_pg(n_ultimas, hostname)
         if resumen is not None and resumen.get("muestras", 0) > 0:
             return resumen
     # Fallback
-    return _obtener_resumen_sqlite(n_ultimas)
+    return _obtener_resumen_sqlite(n_ultimas, hostname)
+
+
+def obtener_estadisticas(hostname: Optional[str] = None) -> dict:
+    """
+    métrica -> {n, promedio, desviacion, minimo, maximo, ewma} de todas las
+    mediciones (del host, si se indica), desde los agregados incrementales.
+    {} si no hay agregado para esa clave.
+    """
+    acc = _resumenes.obtener(hostname)
+    return acc.estadisticas() if acc is not None else {}
+
+
+def obtener_mediciones(hostname: str, desde: datetime, hasta: datetime) -> list[dict]:
+    """
+    Mediciones del host con desde <= ts < hasta, ordenadas por ts (índice
+    (hostname, ts)). Postgres si está habilitado; si falla, SQLite.
+    """
+    filas = _mediciones_rango_pg(hostname, desde, hasta) if _pg_enabled() else None
+    if filas is None:
+        filas = _mediciones_rango_sqlite(hostname, desde, hasta)
+    return [_dict_medicion(f) for f in filas]
+
+
+def obtener_ultimas_por_host(hostnames: Optional[list[str]] = None) -> dict[str, dict]:
+    """
+    hostname -> última medición de ese host (de todos los hosts con
+    mediciones, o solo de `hostnames`). Postgres si está habilitado; si
+    falla, SQLite.
+    """
+    filas = _ultimas_por_host_pg(hostnames) if _pg_enabled() else None
+    if filas is None:
+        filas = _ultimas_por_host_sqlite(hostnames)
+    return {d["hostname"]: d for d in map(_dict_medicion, filas)}
+
+
+def preparar_sqlite() -> None:
+    """Crea reportes/historico.db si no existe y aplica las migraciones pendientes."""
+    _base_sqlite.preparar()
+
+
+def vaciar(timeout: Optional[float] = None) -> bool:
+    """Espera a que las mediciones encoladas queden escritas."""
+    return _cola_escritura.vaciar(timeout)
+
+
+def estadisticas_ingesta() -> dict:
+    """
+    Contadores de la cola de escritura (en_cola, encoladas, escritas_pg,
+    escritas_sqlite, al_spool, descartadas, perdidas, lotes, latencia de
+    flush en ms), del spool hacia Postgres (en_spool, reenviadas y
+    rechazadas_pg, apartadas en salida_pg_rechazadas) y el estado del
+    interruptor de Postgres.
+    """
+    stats = _cola_escritura.estadisticas()
+    stats.update(_reenvio.estadisticas())
+    stats["interruptor_pg"] = _pool_pg.interruptor.estado
+    return stats
+
+
+def cerrar(timeout: Optional[float] = 10) -> None:
+    """
+    Escribe lo pendiente en la cola y cierra el pool de Postgres y la base
+    SQLite (al salir de la app).
+    """
+    _cola_escritura.vaciar(timeout, fin=True)
+    _reenvio.detener()  # lo que quede en el spool se reenvía en la próxima ejecución
+    _pool_pg.cerrar()
+    _base_sqlite.cerrar()
+    _resumenes.reiniciar()  # se recarga de la base activa en el próximo uso
+
+
+atexit.register(cerrar)
@@ -0,0 +1,114 @@
+"""
+Índice para mapear claves de item de Zabbix (key_) a las claves buscadas.
+
+La regla es la de siempre en ZabbixClient: una clave buscada "coincide"
+con un item si es subcadena de su key_. El índice precalcula:
+- un dict exacto key_ -> claves buscadas contenidas en ella (caso típico:
+  el item tiene exactamente la clave pedida);
+- un autómata (regex factorizada como trie) que descarta en una pasada
+  las key_ que no contienen ninguna clave y, si hay coincidencia, localiza
+  todas las posiciones donde empieza alguna.
+
+Con pocas claves (las 8 del diagnóstico) el bucle anidado con `in` es más
+rápido que la regex; el autómata solo se usa a partir de UMBRAL_TRIE
+claves (ver benchmarks/bench_indice_claves.py).
+"""
+
+import re
+from typing import Iterable
+
+# Claves a partir de las que el autómata gana al bucle anidado (~10 en el
+# benchmark con 10 000 items).
+UMBRAL_TRIE = 12
+
+
+def _regex_trie(claves: Iterable[str]) -> str:
+    """
+    Regex equivalente a la alternancia de `claves`, factorizada por prefijos
+    comunes (trie). El motor de re la recorre como un autómata: el coste por
+    carácter apenas crece con el número de claves, a diferencia de "a|b|c".
+    En cada posición se queda con la clave más larga que empiece ahí.
+    """
+    trie: dict = {}
+    for clave in claves:
+        nodo = trie
+        for ch in clave:
+            nodo = nodo.setdefault(ch, {})
+        nodo[""] = {}
+
+    def construir(nodo: dict) -> str:
+        ramas = [re.escape(ch) + construir(hijo) for ch, hijo in sorted(nodo.items()) if ch]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        if "" in nodo:
+            return cuerpo + "?" if cuerpo.startswith("(?:") else "(?:" + cuerpo + ")?"
+        return cuerpo
+
+    return construir(trie)
+
+
+class IndiceClaves:
+    def __init__(self, claves: Iterable[str]):
+        self.claves = list(dict.fromkeys(claves))
+        # clave -> todas las claves buscadas que son subcadena de ella (incluida ella misma)
+        self._contenidas = {
+            c: tuple(otra for otra in self.claves if otra in c) for c in self.claves
+        }
+        # La cadena vacía es subcadena de todo.
+        self._siempre = ("",) if "" in self._contenidas else ()
+        no_vacias = [c for c in self.claves if c]
+        self._bucle = len(self.claves) < UMBRAL_TRIE
+        if no_vacias and not self._bucle:
+            trie = _regex_trie(no_vacias)
+            # Filtro rápido: ¿aparece alguna clave?
+            self._filtro = re.compile(trie).search
+            # Todas las posiciones donde empieza alguna clave (con solapes).
+            self._todas = re.compile("(?=(" + trie + "))").finditer
+        else:
+            self._filtro = None
+
+    def coincidencias(self, key_: str) -> tuple[str, ...]:
+        """Claves buscadas que son subcadena de `key_`."""
+        if self._bucle:
+            return tuple(c for c in self.claves if c in key_)
+        exactas = self._contenidas.get(key_)
+        if exactas is not None:
+            return exactas
+        if self._filtro is None or not self._filtro(key_):
+            return self._siempre
+        return self._buscar_todas(key_)
+
+    def _buscar_todas(self, key_: str) -> tuple[str, ...]:
+        return tuple({c for m in self._todas(key_) for c in self._contenidas[m.group(1)]})
+
+    def mapear(self, items: Iterable[dict]) -> dict[str, str]:
+        """
+        clave buscada -> itemid. Si varias key_ contienen la misma clave,
+        gana el último item (mismo criterio que el bucle original).
+        """
+        mapping: dict[str, str] = {}
+        if self._bucle:
+            for item in items:
+                for clave in self.claves:
+                    if clave in item["key_"]:
+                        mapping[clave] = item["itemid"]
+            return mapping
+        # Versión "en línea" de coincidencias(): este bucle corre sobre
+        # todos los items del host.
+        contenidas = self._contenidas
+        filtro = self._filtro
+        siempre = self._siempre
+        for item in items:
+            key_ = item["key_"]
+            claves = contenidas.get(key_)
+            if claves is None:
+                if filtro is not None and filtro(key_):
+                    claves = self._buscar_todas(key_)
+                elif siempre:
+                    claves = siempre
+                else:
+                    continue
+            for clave in claves:
+                mapping[clave] = item["itemid"]
+        return mapping
@@ -0,0 +1,232 @@
+"""
+Particionado mensual (por rango de ts) de la tabla mediciones en Postgres,
+opcional con PG_PARTICIONADO=true.
+
+- Una partición por mes (mediciones_AAAA_MM) más mediciones_default para
+  lo que no caiga en ninguna; se crean por adelantado
+  PG_PARTICIONES_FUTURAS meses (mantener()).
+- La retención del crudo borra particiones enteras (purgar()) en vez de
+  filas.
+- Como las claves únicas de una tabla particionada deben incluir ts, la PK
+  es (id, ts) y el índice de idempotencia (medicion_id, ts).
+
+Una base nueva se crea ya particionada. Para convertir una existente:
+    python -m monitor.particiones migrar [--conservar]
+(mejor con la app parada; lo que se escriba mientras tanto va al spool).
+"""
+
+import argparse
+from datetime import date, datetime
+from typing import Optional
+
+from utils.config import PG_PARTICIONES_FUTURAS
+
+PREFIJO = "mediciones_"
+DEFAULT = "mediciones_default"
+
+
+def _mes(d) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _sumar_meses(mes: date, n: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _nombre(mes: date) -> str:
+    return f"{PREFIJO}{mes.year:04d}_{mes.month:02d}"
+
+
+def esta_particionada(cur) -> bool:
+    cur.execute("SELECT relkind FROM pg_class WHERE relname = 'mediciones' AND relkind IN ('r', 'p')")
+    fila = cur.fetchone()
+    return bool(fila) and fila[0] == "p"
+
+
+def listar(cur) -> list[date]:
+    """Meses con partición, ordenados."""
+    cur.execute(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'mediciones'
+        """
+    )
+    meses = []
+    for (nombre,) in cur.fetchall():
+        sufijo = nombre[len(PREFIJO):]
+        if nombre.startswith(PREFIJO) and len(sufijo) == 7 and sufijo[4] == "_" and sufijo.replace("_", "").isdigit():
+            meses.append(date(int(sufijo[:4]), int(sufijo[5:]), 1))
+    return sorted(meses)
+
+
+def crear_particion(cur, mes: date) -> None:
+    """
+    Crea la partición del mes. Si mediciones_default ya tiene filas de ese
+    mes (llegaron antes que la partición), las mueve a la nueva.
+    """
+    nombre, desde, hasta = _nombre(mes), mes, _sumar_meses(mes, 1)
+    cur.execute(f"CREATE TABLE {nombre} (LIKE mediciones INCLUDING DEFAULTS)")
+    cur.execute(f"SELECT to_regclass('{DEFAULT}')")
+    if cur.fetchone()[0] is not None:
+        cur.execute(
+            f"WITH movidas AS (DELETE FROM {DEFAULT} WHERE ts >= %s AND ts < %s RETURNING *) "
+            f"INSERT INTO {nombre} SELECT * FROM movidas",
+            (desde, hasta),
+        )
+    cur.execute(
+        f"ALTER TABLE mediciones ATTACH PARTITION {nombre} FOR VALUES FROM (%s) TO (%s)",
+        (desde, hasta),
+    )
+
+
+def _bloquear(cur) -> None:
+    # Varios procesos pueden mantener particiones a la vez.
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('diag_mediciones_particiones'))")
+
+
+def asegurar(cur, desde, hasta) -> list[str]:
+    """Crea las particiones que falten para los meses de [desde, hasta]."""
+    _bloquear(cur)
+    existentes = set(listar(cur))
+    creadas = []
+    mes, ultimo = _mes(desde), _mes(hasta)
+    while mes <= ultimo:
+        if mes not in existentes:
+            crear_particion(cur, mes)
+            creadas.append(_nombre(mes))
+        mes = _sumar_meses(mes, 1)
+    return creadas
+
+
+def mantener(cur, ahora: Optional[datetime] = None) -> list[str]:
+    """
+    Particiones del mes actual y de los PG_PARTICIONES_FUTURAS siguientes,
+    más las de los meses que hayan caído en mediciones_default (filas
+    atrasadas o importadas), que así salen de ella.
+    """
+    hoy = _mes(ahora or datetime.now())
+    creadas = asegurar(cur, hoy, _sumar_meses(hoy, PG_PARTICIONES_FUTURAS))
+    cur.execute(f"SELECT DISTINCT date_trunc('month', ts) FROM {DEFAULT}")
+    for (mes,) in cur.fetchall():
+        creadas += asegurar(cur, mes, mes)
+    return creadas
+
+
+def purgar(cur, limite: datetime, agregado_hasta: int) -> list[str]:
+    """
+    Elimina las particiones que terminan antes de `limite` y cuyas filas ya
+    están agregadas (id <= agregado_hasta). DROP en vez de DELETE: sin
+    filas muertas para el vacuum. Un mes con filas sin hostname (que los
+    rollups no agregan) se conserva.
+    """
+    _bloquear(cur)
+    borradas = []
+    for mes in listar(cur):
+        if _sumar_meses(mes, 1) > limite.date():
+            break
+        nombre = _nombre(mes)
+        cur.execute(f"SELECT MAX(id), bool_or(hostname IS NULL) FROM {nombre}")
+        max_id, sin_host = cur.fetchone()
+        if max_id is not None and max_id > agregado_hasta:
+            break  # aún sin agregar; se reintenta en la próxima pasada
+        if sin_host:
+            continue
+        cur.execute(f"DROP TABLE {nombre}")
+        borradas.append(nombre)
+    return borradas
+
+
+def _crear_indices(cur) -> None:
+    cur.execute("ALTER TABLE mediciones ADD PRIMARY KEY (id, ts)")
+    cur.execute("CREATE UNIQUE INDEX mediciones_medicion_id_ts ON mediciones (medicion_id, ts)")
+    cur.execute("CREATE INDEX mediciones_host_ts ON mediciones (hostname, ts)")
+    cur.execute("CREATE INDEX mediciones_ts ON mediciones (ts)")
+
+
+def convertir(cur, conservar: bool = False, progreso=None) -> int:
+    """
+    Convierte mediciones (tabla normal) en particionada, en la transacción
+    de `cur`: renombra la actual, crea la particionada con las mismas
+    columnas (y la misma secuencia de id), copia los datos mes a mes y
+    crea los índices. Devuelve las filas copiadas.
+    """
+    cur.execute("LOCK TABLE mediciones IN ACCESS EXCLUSIVE MODE")
+    cur.execute("ALTER TABLE mediciones RENAME TO mediciones_antigua")
+    # Los nombres de índice son globales al esquema: apartar los antiguos.
+    cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'mediciones_antigua'")
+    for (indice,) in cur.fetchall():
+        cur.execute(f"ALTER INDEX {indice} RENAME TO {indice}_antigua")
+
+    cur.execute("CREATE TABLE mediciones (LIKE mediciones_antigua INCLUDING DEFAULTS) PARTITION BY RANGE (ts)")
+    cur.execute("ALTER SEQUENCE mediciones_id_seq OWNED BY mediciones.id")
+    cur.execute(f"CREATE TABLE {DEFAULT} PARTITION OF mediciones DEFAULT")
+
+    cur.execute("SELECT MIN(ts), MAX(ts) FROM mediciones_antigua")
+    minimo, maximo = cur.fetchone()
+    copiadas = 0
+    if minimo is not None:
+        asegurar(cur, minimo, maximo)
+        mes = _mes(minimo)
+        while mes <= _mes(maximo):
+            siguiente = _sumar_meses(mes, 1)
+            cur.execute(
+                "INSERT INTO mediciones SELECT * FROM mediciones_antigua WHERE ts >= %s AND ts < %s",
+                (mes, siguiente),
+            )
+            copiadas += cur.rowcount
+            if progreso:
+                progreso(mes, cur.rowcount)
+            mes = siguiente
+    mantener(cur)
+    _crear_indices(cur)
+    if not conservar:
+        cur.execute("DROP TABLE mediciones_antigua")
+    return copiadas
+
+
+def preparar(cur) -> None:
+    """
+    Con PG_PARTICIONADO: convierte mediciones si aún está vacía (base
+    nueva) y crea las particiones futuras. Una tabla con datos se deja tal
+    cual: se convierte con `python -m monitor.particiones migrar`.
+    """
+    if not esta_particionada(cur):
+        cur.execute("SELECT EXISTS (SELECT 1 FROM mediciones)")
+        if cur.fetchone()[0]:
+            return
+        convertir(cur)
+        return
+    mantener(cur)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="orden", required=True)
+    migrar = sub.add_parser("migrar", help="convierte la tabla existente en particionada")
+    migrar.add_argument("--conservar", action="store_true", help="no borrar mediciones_antigua")
+    sub.add_parser("mantener", help="crea las particiones futuras")
+    sub.add_parser("listar", help="muestra las particiones")
+    args = parser.parse_args()
+
+    from monitor.historico import _pool_pg
+
+    with _pool_pg.conexion() as conn:
+        cur = conn.cursor()
+        if args.orden == "migrar":
+            if esta_particionada(cur):
+                print("mediciones ya está particionada.")
+                return
+            filas = convertir(cur, args.conservar, lambda mes, n: print(f"{mes:%Y-%m}: {n} filas"))
+            print(f"Convertida: {filas} filas copiadas.")
+        elif args.orden == "mantener":
+            print("Creadas:", ", ".join(mantener(cur)) or "ninguna")
+        else:
+            for mes in listar(cur):
+                print(_nombre(mes))
+
+
+if __name__ == "__main__":
+    main()
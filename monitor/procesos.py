@@ -0,0 +1,132 @@
+"""
+Procesos locales que más CPU y RAM consumen (top N).
+
+- Cada barrido usa process_iter() solo con cpu_times, memory_info y
+  create_time (una lectura de /proc/<pid>/stat y statm por proceso en
+  Linux); nombre y usuario se piden únicamente para los N ganadores y se
+  guardan por (pid, create_time).
+- La CPU sale de dos barridos separados PROCESOS_INTERVALO_SEG. El último
+  barrido se guarda, así que si el anterior tiene menos de
+  PROCESOS_MAX_ANTIGUEDAD_SEG no hace falta esperar.
+- La selección es con heapq.nlargest (montículo de tamaño N), sin ordenar
+  todos los procesos.
+"""
+
+import heapq
+import threading
+import time
+from typing import Optional
+
+import psutil
+
+from utils.config import PROCESOS_TOP_N, PROCESOS_INTERVALO_SEG, PROCESOS_MAX_ANTIGUEDAD_SEG
+
+ATRIBUTOS = ["cpu_times", "memory_info", "create_time"]
+
+
+def _cpu_seg(tiempos) -> float:
+    return tiempos.user + tiempos.system
+
+
+class RecolectorProcesos:
+    def __init__(
+        self,
+        intervalo_seg: float = PROCESOS_INTERVALO_SEG,
+        max_antiguedad_seg: float = PROCESOS_MAX_ANTIGUEDAD_SEG,
+    ):
+        self.intervalo_seg = intervalo_seg
+        self.max_antiguedad_seg = max_antiguedad_seg
+        self._lock = threading.Lock()
+        self._previo: dict[int, tuple[float, float]] = {}  # pid -> (create_time, cpu_seg)
+        self._ts_previo = 0.0  # monotonic del último barrido
+        self._nombres: dict[tuple[int, float], tuple[str, str]] = {}  # (pid, create_time) -> (nombre, usuario)
+
+    def _barrer(self) -> tuple[dict, float]:
+        """pid -> (create_time, cpu_seg, rss) de todos los procesos visibles."""
+        procesos = {}
+        for p in psutil.process_iter(ATRIBUTOS, ad_value=None):
+            info = p.info
+            if info["cpu_times"] is None or info["create_time"] is None:
+                continue  # sin permiso o ya terminado
+            rss = info["memory_info"].rss if info["memory_info"] is not None else 0
+            procesos[p.pid] = (info["create_time"], _cpu_seg(info["cpu_times"]), rss)
+        return procesos, time.monotonic()
+
+    def _nombre(self, pid: int, creado: float) -> tuple[str, str]:
+        clave = (pid, creado)
+        if clave not in self._nombres:
+            try:
+                p = psutil.Process(pid)
+                with p.oneshot():
+                    nombre = p.name()
+                    try:
+                        usuario = p.username()
+                    except (psutil.AccessDenied, KeyError):
+                        usuario = "?"
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                nombre, usuario = "?", "?"
+            self._nombres[clave] = (nombre, usuario)
+        return self._nombres[clave]
+
+    def top(self, n: int = PROCESOS_TOP_N) -> dict:
+        """
+        {"cpu": [...], "ram": [...], "procesos": total, "intervalo_seg": s}.
+        Cada entrada: pid, nombre, usuario, cpu_pct (del total de la
+        máquina, como el CPU de Zabbix), rss_bytes, ram_pct.
+        """
+        with self._lock:
+            previo, ts_previo = self._previo, self._ts_previo
+            if not previo or time.monotonic() - ts_previo > self.max_antiguedad_seg:
+                previo, ts_previo = self._barrer()
+                time.sleep(self.intervalo_seg)
+            actual, ts = self._barrer()
+            self._previo, self._ts_previo = {pid: v[:2] for pid, v in actual.items()}, ts
+
+            dt = (ts - ts_previo) * (psutil.cpu_count(logical=True) or 1)
+            ram_total = psutil.virtual_memory().total
+
+            def cpu_pct(pid: int) -> float:
+                creado, cpu, _ = actual[pid]
+                antes = previo.get(pid)
+                if antes is None or antes[0] != creado:
+                    return 0.0  # nuevo desde el barrido anterior (o PID reutilizado)
+                return max(cpu - antes[1], 0.0) / dt * 100 if dt > 0 else 0.0
+
+            def entrada(pid: int) -> dict:
+                creado, _, rss = actual[pid]
+                nombre, usuario = self._nombre(pid, creado)
+                return {
+                    "pid": pid,
+                    "nombre": nombre,
+                    "usuario": usuario,
+                    "cpu_pct": round(cpu_pct(pid), 1),
+                    "rss_bytes": rss,
+                    "ram_pct": round(rss / ram_total * 100, 1) if ram_total else None,
+                }
+
+            top_cpu = heapq.nlargest(n, actual, key=cpu_pct)
+            top_ram = heapq.nlargest(n, actual, key=lambda pid: actual[pid][2])
+            resultado = {
+                "cpu": [entrada(pid) for pid in top_cpu],
+                "ram": [entrada(pid) for pid in top_ram],
+                "procesos": len(actual),
+                "intervalo_seg": round(ts - ts_previo, 2),
+            }
+
+            # Olvidar los nombres de procesos que ya no existen.
+            if len(self._nombres) > 4 * n + len(actual):
+                self._nombres = {k: v for k, v in self._nombres.items() if actual.get(k[0], (None,))[0] == k[1]}
+        return resultado
+
+
+def resumen_motivo(top: dict, recurso: str, n: int = 3) -> Optional[str]:
+    """Texto corto con los procesos que más consumen `recurso` ("cpu" o "ram")."""
+    campo = "cpu_pct" if recurso == "cpu" else "ram_pct"
+    partes = [f"{e['nombre']} (pid {e['pid']}, {e[campo]:.1f}%)" for e in top.get(recurso, [])[:n] if e[campo]]
+    if not partes:
+        return None
+    return f"Procesos con más {recurso.upper()}: " + ", ".join(partes) + "."
+
+
+# Compartido: el barrido anterior sirve de primera foto del siguiente.
+recolector = RecolectorProcesos()
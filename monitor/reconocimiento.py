@@ -1,24 +1,101 @@
 # monitor/reconocimiento.py
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional
+
 from monitor.red import medir_latencia
 from monitor.historico import obtener_resumen
-from .sistema_local import obtener_info_sistema_local
+from .sistema_local import obtener_info_sistema_local, muestreador
 from .zabbix_client import ZabbixClient
 from monitor.netdata_client import NetdataClient
-from utils.config import ZABBIX_URL, ZABBIX_TOKEN, ZABBIX_HOSTNAME, HOST_RAM_GB, HOST_CPU_CORES, NETDATA_ENABLED
+from monitor.tendencias import calcular_uso_sostenido
+from monitor import procesos
+from utils.config import ZABBIX_URL, ZABBIX_TOKEN, ZABBIX_HOSTNAME, HOST_RAM_GB, HOST_CPU_CORES, NETDATA_ENABLED, TENDENCIAS_ENABLED
+from utils.config import RECONOCIMIENTO_PLAZO_SEG, RECONOCIMIENTO_TIMEOUT_FASE_SEG, MUESTREO_VENTANA_SEG, PROCESOS_ENABLED
+
+
+def _ventana_decision(por_ventana: dict) -> Optional[int]:
+    """Ventana (días) a usar para decidir: la configurada o la más larga con datos."""
+    from utils.config import TENDENCIAS_VENTANA_DECISION
 
+    con_datos = [d for d, agg in por_ventana.items() if agg]
+    if not con_datos:
+        return None
+    return TENDENCIAS_VENTANA_DECISION if TENDENCIAS_VENTANA_DECISION in con_datos else max(con_datos)
 
-def calcular_recomendaciones_vm(info_local: dict) -> dict:
+
+def _recomendaciones_por_uso(nombre: str, por_ventana: dict, actual: float, maximo: float, unidad: str, minimo: float) -> list[str]:
+    """
+    Dimensiona según el p95 de los máximos horarios: apunta a que ese p95
+    quede en torno al 70 % de lo asignado, sin pasar de `maximo` (límite
+    seguro respecto al host). Avisa además si la pendiente lleva el p95
+    por encima del 90 % en los próximos 30 días.
+    """
+    recomendaciones = []
+    dias = _ventana_decision(por_ventana)
+    if dias is None:
+        return recomendaciones
+    agg = por_ventana[dias]
+    p95 = agg["p95_max"]
+    pico = f"pico habitual hacia las {agg['hora_pico']:02d}:00"
+
+    objetivo = actual * p95 / 70
+    if unidad == "cores":
+        objetivo = float(math.ceil(objetivo))
+    if p95 >= 85:
+        if maximo and objetivo > maximo:
+            objetivo = maximo
+        if objetivo > actual:
+            recomendaciones.append(
+                f"{nombre} sostenida alta: p95 de máximos horarios {p95:.1f}% en {dias} días ({pico}). "
+                f"Aumente la VM a ~{objetivo:.{0 if unidad == 'cores' else 1}f} {unidad}."
+            )
+        else:
+            recomendaciones.append(
+                f"{nombre} sostenida alta: p95 de máximos horarios {p95:.1f}% en {dias} días ({pico}), "
+                f"pero la VM ya está en el límite seguro del host. Revise la carga o amplíe el host."
+            )
+    elif p95 < 40:
+        objetivo = max(minimo, objetivo)
+        if objetivo < actual:
+            recomendaciones.append(
+                f"{nombre} infrautilizada: p95 de máximos horarios {p95:.1f}% en {dias} días. "
+                f"Puede reducir la VM a ~{objetivo:.{0 if unidad == 'cores' else 1}f} {unidad}."
+            )
+
+    # Crecimiento: pendiente sobre la ventana más larga con datos.
+    larga = max(d for d, a in por_ventana.items() if a)
+    pendiente = por_ventana[larga]["pendiente_dia"]
+    proyeccion = p95 + pendiente * 30
+    if pendiente > 0 and proyeccion >= 90 and p95 < 90:
+        recomendaciones.append(
+            f"{nombre} en crecimiento: +{pendiente:.2f} puntos/día en {larga} días; "
+            f"en ~30 días el p95 llegaría a {min(proyeccion, 100):.0f}%."
+        )
+    return recomendaciones
+
+
+def calcular_recomendaciones_vm(info_local: dict, uso: Optional[dict] = None) -> dict:
     """
     A partir de la RAM/CPU de la VM y los límites del host (configurados),
     devuelve un dict con lista de recomendaciones de capacidad.
+    Si se pasa `uso` (ver monitor.tendencias.calcular_uso_sostenido), las
+    recomendaciones se basan en la carga sostenida; sin datos de uso, en la
+    capacidad estática.
     """
     recomendaciones = []
+    uso = uso or {}
     ram_vm = info_local.get("ram_total_gb")
     cores_vm = info_local.get("cpu_cores_logicos")
 
     from utils.config import HOST_RAM_GB, HOST_CPU_CORES
 
-    if HOST_RAM_GB and ram_vm:
+    if uso.get("ram") and any(uso["ram"].values()) and ram_vm:
+        recomendaciones += _recomendaciones_por_uso(
+            "RAM", uso["ram"], ram_vm, HOST_RAM_GB * 0.8, "GB", minimo=2.0
+        )
+    elif HOST_RAM_GB and ram_vm:
         ram_max_segura = HOST_RAM_GB * 0.8  # 80% del host
         if ram_vm < ram_max_segura:
             recomendaciones.append(
@@ -26,7 +103,11 @@ def calcular_recomendaciones_vm(info_local: dict) -> dict:
                 f"sin exceder el 80% de la RAM del host ({HOST_RAM_GB} GB)."
             )
 
-    if HOST_CPU_CORES and cores_vm:
+    if uso.get("cpu") and any(uso["cpu"].values()) and cores_vm:
+        recomendaciones += _recomendaciones_por_uso(
+            "CPU", uso["cpu"], cores_vm, int(HOST_CPU_CORES * 0.75), "cores", minimo=1
+        )
+    elif HOST_CPU_CORES and cores_vm:
         cores_max_seguro = int(HOST_CPU_CORES * 0.75)
         if cores_vm < cores_max_seguro:
             recomendaciones.append(
@@ -99,42 +180,156 @@ def calcular_estado_global(diag_zbx: dict) -> dict:
     }
 
 
+def _cronometrar(funcion, *args):
+    """Ejecuta una fase y devuelve (resultado, segundos)."""
+    inicio = time.perf_counter()
+    return funcion(*args), time.perf_counter() - inicio
+
+
+def _ejecutar_fases(fases: dict, dependientes: dict, plazo_seg: float, timeout_fase: float) -> tuple[dict, dict, dict]:
+    """
+    Lanza en paralelo `fases` (nombre -> callable sin argumentos) y, cuando
+    termina bien la fase de la que dependen, las de `dependientes`
+    (nombre -> (fase previa, callable que recibe su resultado)).
+
+    Cada fase tiene `timeout_fase` segundos desde que empieza y todas
+    comparten el plazo total. Devuelve (resultados, tiempos, errores): una
+    fase que falla o no llega queda fuera de resultados, con su error.
+    Los hilos que no llegan se abandonan (no tocan nada compartido).
+    """
+    limite_total = time.monotonic() + plazo_seg
+    resultados, tiempos, errores = {}, {}, {}
+    pool = ThreadPoolExecutor(max_workers=len(fases) + len(dependientes), thread_name_prefix="reconocimiento")
+    try:
+        pendientes = {}
+
+        def lanzar(nombre, funcion, *args):
+            limite = min(time.monotonic() + timeout_fase, limite_total)
+            pendientes[pool.submit(_cronometrar, funcion, *args)] = (nombre, time.monotonic(), limite)
+
+        for nombre, funcion in fases.items():
+            lanzar(nombre, funcion)
+
+        while pendientes:
+            proximo = min(limite for _, _, limite in pendientes.values())
+            hechos, _ = wait(pendientes, timeout=max(proximo - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                nombre, empezada, _ = pendientes.pop(futuro)
+                try:
+                    resultados[nombre], tiempos[nombre] = futuro.result()
+                except Exception as e:
+                    tiempos[nombre] = time.monotonic() - empezada
+                    errores[nombre] = f"{type(e).__name__}: {e}"
+                    continue
+                for dependiente, (previa, funcion) in dependientes.items():
+                    if previa == nombre:
+                        lanzar(dependiente, funcion, resultados[nombre])
+
+            ahora = time.monotonic()
+            for futuro, (nombre, empezada, limite) in list(pendientes.items()):
+                if ahora >= limite:
+                    pendientes.pop(futuro)
+                    futuro.cancel()
+                    tiempos[nombre] = ahora - empezada
+                    errores[nombre] = f"Sin respuesta en {limite - empezada:.1f} s."
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return resultados, tiempos, errores
+
+
 def reconocimiento_inicial() -> dict:
     """
     - Lee hardware local (VM/físico, CPU, RAM, disco).
     - Pide diagnóstico a Zabbix para WIN-LAPTOP.
-    - Añade recomendaciones de capacidad para la VM.
+    - Añade recomendaciones de capacidad para la VM (según tendencias de Zabbix si hay).
+
+    Las fases son independientes y se ejecutan en paralelo con un timeout
+    por fase y un plazo total (RECONOCIMIENTO_*). Una fase que falla o no
+    llega deja su parte vacía y su error en "fases"; si falla Zabbix, el
+    estado global es "DESCONOCIDO".
     """
-    info_local = obtener_info_sistema_local()
-    zbx_client = ZabbixClient(ZABBIX_URL, ZABBIX_TOKEN)
-    diag_zbx = zbx_client.obtener_diagnostico_host(ZABBIX_HOSTNAME)
-    rec_vm = calcular_recomendaciones_vm(info_local)
-    estado = calcular_estado_global(diag_zbx)
+    inicio = time.perf_counter()
+    errores_previos = {}
+    zbx_client = None
+    try:
+        zbx_client = ZabbixClient(ZABBIX_URL, ZABBIX_TOKEN)
+    except ValueError as e:
+        errores_previos["zabbix"] = str(e)
 
-    lat_zbx = medir_latencia("192.168.1.9")  # IP del Zabbix server o gateway
-    info_red = {"latencia_zabbix_ms": lat_zbx}
-    resumen = obtener_resumen(20)
+    fases = {
+        "sistema_local": obtener_info_sistema_local,
+        "latencia": lambda: medir_latencia("192.168.1.9"),  # IP del Zabbix server o gateway
+        "resumen": lambda: obtener_resumen(20),
+    }
+    if PROCESOS_ENABLED:
+        fases["procesos"] = procesos.recolector.top
+    dependientes = {}
+    if zbx_client is not None:
+        fases["zabbix"] = lambda: zbx_client.obtener_diagnostico_host(ZABBIX_HOSTNAME)
+        if TENDENCIAS_ENABLED:
+            dependientes["tendencias"] = ("zabbix", lambda diag: calcular_uso_sostenido(zbx_client, diag["hostid"]))
+    if NETDATA_ENABLED:
+        nd = NetdataClient()
+        fases["netdata_cpu"] = nd.get_cpu_avg_last_minute
+        fases["netdata_load"] = nd.get_load_avg
+        fases["netdata_ram"] = nd.get_ram_used_pct
+
+    try:
+        res, tiempos, errores = _ejecutar_fases(
+            fases, dependientes, RECONOCIMIENTO_PLAZO_SEG, RECONOCIMIENTO_TIMEOUT_FASE_SEG
+        )
+    finally:
+        if zbx_client is not None:
+            zbx_client.cerrar()
+    errores.update(errores_previos)
+
+    info_local = res.get("sistema_local", {})
+    diag_zbx = res.get("zabbix", {})
+    uso = res.get("tendencias", {})
+    # Zabbix puede diagnosticar otro host (ZABBIX_HOSTNAME): su carga no sirve
+    # para dimensionar esta VM ni sus procesos para explicar su estado.
+    hostname_local = info_local.get("hostname", "").lower()
+    es_local = bool(hostname_local) and diag_zbx.get("hostname", "").lower() == hostname_local
+    # Sin tendencias de esta VM se recomienda por capacidad estática.
+    rec_vm = calcular_recomendaciones_vm(info_local, uso if es_local else None)
+    if "zabbix" in res:
+        estado = calcular_estado_global(diag_zbx)
+    else:
+        estado = {"estado_global": "DESCONOCIDO", "motivos_estado": [f"Sin diagnóstico de Zabbix: {errores['zabbix']}"]}
+
+    top = res.get("procesos", {})
+    if top and es_local:
+        for recurso, valor in (("cpu", diag_zbx.get("cpu_uso_pct")), ("ram", diag_zbx.get("ram_uso_pct"))):
+            motivo = procesos.resumen_motivo(top, recurso) if valor is not None and valor >= 80 else None
+            if motivo:
+                estado["motivos_estado"].append(motivo)
 
     netdata_info = {}
     if NETDATA_ENABLED:
-        nd = NetdataClient()
-        cpu_nd = nd.get_cpu_avg_last_minute()
-        load_nd = nd.get_load_avg()
-        ram_nd = nd.get_ram_used_pct()
         netdata_info = {
-            "cpu_avg_60s": cpu_nd,
-            "load_avg_1m": load_nd,
-            "ram_uso_pct": ram_nd,
+            "cpu_avg_60s": res.get("netdata_cpu"),
+            "load_avg_1m": res.get("netdata_load"),
+            "ram_uso_pct": res.get("netdata_ram"),
         }
 
+    # Picos locales entre refrescos, si el muestreo en segundo plano está activo.
+    muestreo = muestreador.ventana(MUESTREO_VENTANA_SEG) if muestreador.activo else {}
+
     return {
-         "sistema_local": info_local,
+        "sistema_local": info_local,
         "zabbix": diag_zbx,
         "recomendaciones": rec_vm["recomendaciones_capacidad"],
+        "uso_sostenido": uso,
         "estado_global": estado["estado_global"],
         "motivos_estado": estado["motivos_estado"],
-        "red": info_red,
-        "resumen": resumen,
+        "red": {"latencia_zabbix_ms": res.get("latencia")},
+        "resumen": res.get("resumen"),
         "netdata": netdata_info,
+        "muestreo_local": muestreo,
+        "procesos_top": top,
+        "fases": {
+            "tiempos_seg": tiempos,
+            "errores": errores,
+            "total_seg": time.perf_counter() - inicio,
+        },
     }
-
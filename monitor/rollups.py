@@ -0,0 +1,353 @@
+"""
+Agregados del histórico por minuto, hora y día (tablas mediciones_1m,
+mediciones_1h, mediciones_1d): muestras y avg/min/max/p95 por métrica,
+por host y cubeta.
+
+- Incremental: cada nivel guarda en rollups_estado el id de la última
+  fila cruda agregada; en cada pasada solo se recalculan (desde las filas
+  crudas, con upsert) las cubetas que tocan las filas nuevas, así también
+  entran las filas que llegan tarde (p. ej. reenviadas desde el spool).
+  En Postgres una transacción puede confirmar ids por debajo de la marca
+  (cola, reenvío y backfill escriben a la vez), así que cada pasada repasa
+  también los últimos ROLLUP_SOLAPE_IDS ids ya agregados.
+- Retención por nivel (RETENCION_*_DIAS, 0 = sin límite), borrando en
+  lotes acotados; las filas crudas solo se borran si ya están agregadas
+  (nunca las que no tienen hostname).
+  Con mediciones particionada en Postgres (monitor/particiones.py) el crudo se
+  retira por particiones mensuales enteras, y cada pasada crea también
+  las particiones futuras.
+- obtener_serie() elige el nivel más fino que no supere max_puntos y que
+  aún conserve datos del rango pedido.
+Se ejecuta en segundo plano (iniciar()) o a mano (ejecutar_rollups()).
+Las filas sin hostname (anteriores al histórico multi-host) no se agregan.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from monitor import historico, particiones
+from monitor.agregados import METRICAS_RESUMEN
+from monitor.historico import ESTADISTICAS_ROLLUP, NIVELES_ROLLUP
+from utils.config import (
+    ROLLUP_INTERVALO_SEG,
+    ROLLUP_LOTE_FILAS,
+    ROLLUP_SOLAPE_IDS,
+    ROLLUP_PURGA_LOTE,
+    ROLLUP_PURGA_MAX_LOTES,
+    ROLLUP_MAX_PUNTOS,
+    RETENCION_CRUDO_DIAS,
+    RETENCION_1M_DIAS,
+    RETENCION_1H_DIAS,
+    RETENCION_1D_DIAS,
+)
+
+RETENCION_DIAS = {
+    "crudo": RETENCION_CRUDO_DIAS,
+    "1m": RETENCION_1M_DIAS,
+    "1h": RETENCION_1H_DIAS,
+    "1d": RETENCION_1D_DIAS,
+}
+
+_COLUMNAS_ROLLUP = [f"{m}_{e}" for m in METRICAS_RESUMEN for e in ESTADISTICAS_ROLLUP]
+
+
+class _Backend:
+    """Lo que cambia entre Postgres y SQLite al agregar y purgar."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.pg = nombre == "pg"
+        self.ph = "%s" if self.pg else "?"
+
+    def cubeta(self, nivel: str, columna: str) -> str:
+        if self.pg:
+            unidad = {"1m": "minute", "1h": "hour", "1d": "day"}[nivel]
+            return f"date_trunc('{unidad}', {columna})"
+        # ts es texto ISO 'YYYY-MM-DDTHH:MM:SS'
+        return {
+            "1m": f"substr({columna}, 1, 16) || ':00'",
+            "1h": f"substr({columna}, 1, 13) || ':00:00'",
+            "1d": f"substr({columna}, 1, 10) || 'T00:00:00'",
+        }[nivel]
+
+    def fin_cubeta(self, nivel: str, columna: str) -> str:
+        seg = NIVELES_ROLLUP[nivel]
+        if self.pg:
+            return f"{columna} + interval '{seg} seconds'"
+        return f"strftime('%Y-%m-%dT%H:%M:%S', {columna}, '+{seg} seconds')"
+
+    def p95(self, columna: str) -> str:
+        if self.pg:
+            return f"percentile_cont(0.95) WITHIN GROUP (ORDER BY {columna})"
+        return f"percentil_95({columna})"
+
+    def valor_ts(self, ts: datetime):
+        return ts if self.pg else ts.isoformat(timespec="seconds")
+
+    def consultar(self, sql: str, params: tuple) -> list:
+        if self.pg:
+            filas = historico._consultar_pg(sql, params)
+            if filas is None:
+                raise RuntimeError("Postgres no disponible para los rollups.")
+            return filas
+        con = historico._base_sqlite.lector()
+        return con.execute(sql, params).fetchall() if con is not None else []
+
+    def ejecutar(self, sql: str, params: tuple) -> int:
+        """Ejecuta una sentencia de escritura y devuelve las filas afectadas."""
+        if self.pg:
+            with historico._pool_pg.conexion() as conn:
+                cur = conn.cursor()
+                cur.execute(sql, params)
+                return cur.rowcount
+        return historico._base_sqlite.ejecutar(sql, params)
+
+
+def _backends() -> list[_Backend]:
+    backends = [_Backend("sqlite")] if historico.DB_PATH.exists() else []
+    if historico._pg_enabled():
+        backends.append(_Backend("pg"))
+    return backends
+
+
+def _sql_rollup(b: _Backend, nivel: str) -> str:
+    """
+    Recalcula entera cada cubeta (hostname, cubeta) tocada por las filas
+    crudas con id en (%s, %s], leyendo por el índice (hostname, ts).
+    """
+    ph = b.ph
+    agregados = ",\n".join(
+        f"AVG(m.{c}), MIN(m.{c}), MAX(m.{c}), {b.p95('m.' + c)}" for c in METRICAS_RESUMEN
+    )
+    actualizar = ", ".join(f"{c} = excluded.{c}" for c in ["muestras"] + _COLUMNAS_ROLLUP)
+    tocadas = f"""
+        SELECT DISTINCT hostname, {b.cubeta(nivel, "ts")} AS cubeta
+        FROM mediciones
+        WHERE id > {ph} AND id <= {ph} AND hostname IS NOT NULL
+    """
+    rango = f"m.hostname = t.hostname AND m.ts >= t.cubeta AND m.ts < {b.fin_cubeta(nivel, 't.cubeta')}"
+    if b.pg:
+        # LATERAL: un recorrido del índice por cubeta (con un JOIN normal el
+        # planificador prefiere un merge join por hostname que lee todo el host).
+        origen = f"""
+        SELECT t.hostname, t.cubeta, a.*
+        FROM ({tocadas}) t
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*), {agregados}
+            FROM mediciones m
+            WHERE {rango}
+        ) a
+        """
+    else:
+        origen = f"""
+        SELECT m.hostname, t.cubeta, COUNT(*), {agregados}
+        FROM ({tocadas}) t
+        JOIN mediciones m ON {rango}
+        WHERE TRUE
+        GROUP BY m.hostname, t.cubeta
+        """
+    return f"""
+        INSERT INTO mediciones_{nivel} (hostname, cubeta, muestras, {", ".join(_COLUMNAS_ROLLUP)})
+        {origen}
+        ON CONFLICT (hostname, cubeta) DO UPDATE SET {actualizar}
+    """
+
+
+def _solape(b: _Backend) -> int:
+    """
+    Ids por debajo de la marca que se vuelven a agregar en cada pasada. En
+    SQLite los escritores se serializan y los ids se confirman en orden; en
+    Postgres una fila con id menor que el MAX(id) ya visible puede
+    confirmarse después. Las cubetas se recalculan enteras con upsert, así
+    que repasarlas no duplica nada.
+    """
+    return ROLLUP_SOLAPE_IDS if b.pg else 0
+
+
+def _agregar_nivel(b: _Backend, nivel: str, hasta_id: int) -> int:
+    """
+    Lleva el nivel hasta hasta_id, en tramos de ROLLUP_LOTE_FILAS ids,
+    empezando _solape(b) ids por debajo de la marca. Devuelve las filas
+    crudas nuevas (sin contar el solape).
+    """
+    fila = b.consultar(f"SELECT ultimo_id FROM rollups_estado WHERE nivel = {b.ph}", (nivel,))
+    marca = fila[0][0] if fila else 0
+    desde_id = max(marca - _solape(b), 0)
+    sql = _sql_rollup(b, nivel)
+    guardar = f"""
+        INSERT INTO rollups_estado (nivel, ultimo_id) VALUES ({b.ph}, {b.ph})
+        ON CONFLICT (nivel) DO UPDATE SET ultimo_id = excluded.ultimo_id
+    """
+    while desde_id < hasta_id:
+        tramo = min(desde_id + ROLLUP_LOTE_FILAS, hasta_id)
+        b.ejecutar(sql, (desde_id, tramo))
+        if tramo > marca:
+            b.ejecutar(guardar, (nivel, tramo))
+        desde_id = tramo
+    return max(hasta_id - marca, 0)
+
+
+def _purgar(b: _Backend, tabla: str, columna_ts: str, limite: datetime, extra: str = "", params: tuple = ()) -> int:
+    """Borra filas con columna_ts < limite en lotes de ROLLUP_PURGA_LOTE (como mucho ROLLUP_PURGA_MAX_LOTES)."""
+    clave = "ctid" if b.pg else "rowid"
+    sql = f"""
+        DELETE FROM {tabla} WHERE {clave} IN (
+            SELECT {clave} FROM {tabla} WHERE {columna_ts} < {b.ph} {extra} LIMIT {b.ph}
+        )
+    """
+    borradas = 0
+    for _ in range(ROLLUP_PURGA_MAX_LOTES):
+        n = b.ejecutar(sql, (b.valor_ts(limite),) + params + (ROLLUP_PURGA_LOTE,))
+        borradas += n
+        if n < ROLLUP_PURGA_LOTE:
+            break
+    return borradas
+
+
+def _mantener_particiones() -> bool:
+    """Crea las particiones futuras; False si mediciones no está particionada."""
+    with historico._pool_pg.conexion() as conn:
+        cur = conn.cursor()
+        if not particiones.esta_particionada(cur):
+            return False
+        particiones.mantener(cur)
+        return True
+
+
+def _aplicar_retencion(b: _Backend, ahora: datetime, particionada: bool = False) -> dict:
+    borradas = {}
+    for nivel in NIVELES_ROLLUP:
+        dias = RETENCION_DIAS[nivel]
+        if dias > 0:
+            borradas[nivel] = _purgar(b, f"mediciones_{nivel}", "cubeta", ahora - timedelta(days=dias))
+    if RETENCION_CRUDO_DIAS > 0:
+        # Solo filas ya agregadas en todos los niveles y fuera del solape (en
+        # Postgres aún puede faltar alguna por agregar). Las que no tienen
+        # hostname nunca se agregan: se conservan aunque su id quede por debajo.
+        fila = b.consultar("SELECT MIN(ultimo_id), COUNT(*) FROM rollups_estado", ())
+        agregado_hasta = fila[0][0] if fila and fila[0][1] == len(NIVELES_ROLLUP) else 0
+        agregado_hasta = max(agregado_hasta - _solape(b), 0)
+        limite = ahora - timedelta(days=RETENCION_CRUDO_DIAS)
+        tabla = "mediciones"
+        if particionada:
+            # Meses enteros con DROP; fila a fila solo lo que cayó en la
+            # partición por defecto (el ctid no es único entre particiones).
+            with historico._pool_pg.conexion() as conn:
+                borradas["particiones"] = particiones.purgar(conn.cursor(), limite, agregado_hasta)
+            tabla = particiones.DEFAULT
+        borradas["crudo"] = _purgar(
+            b, tabla, "ts", limite, extra=f"AND id <= {b.ph} AND hostname IS NOT NULL", params=(agregado_hasta,),
+        )
+    return borradas
+
+
+def ejecutar_rollups(ahora: Optional[datetime] = None) -> dict:
+    """
+    Una pasada: agrega las filas crudas nuevas en cada nivel y aplica la
+    retención, en cada base activa. Devuelve {backend: {"procesadas": {nivel: n},
+    "borradas": {nivel: n}, "seg": s}}; un backend que falla se informa con "error".
+    """
+    ahora = ahora or datetime.now()
+    resultado = {}
+    for b in _backends():
+        inicio = time.perf_counter()
+        try:
+            hasta_id = b.consultar("SELECT MAX(id) FROM mediciones", ())[0][0] or 0
+            procesadas = {nivel: _agregar_nivel(b, nivel, hasta_id) for nivel in NIVELES_ROLLUP}
+            # Se mira la tabla, no PG_PARTICIONADO: una base convertida con
+            # `python -m monitor.particiones migrar` no admite la purga por ctid.
+            particionada = b.pg and _mantener_particiones()
+            borradas = _aplicar_retencion(b, ahora, particionada)
+            resultado[b.nombre] = {
+                "procesadas": procesadas,
+                "borradas": borradas,
+                "seg": round(time.perf_counter() - inicio, 3),
+            }
+        except Exception as e:
+            resultado[b.nombre] = {"error": str(e)}
+    return resultado
+
+
+# ---------- Lectura ----------
+
+def elegir_nivel(desde: datetime, hasta: datetime, max_puntos: int = ROLLUP_MAX_PUNTOS,
+                 ahora: Optional[datetime] = None) -> str:
+    """
+    Nivel más fino ("crudo", "1m", "1h" o "1d") que da como mucho
+    max_puntos puntos en el rango y cuya retención aún cubre `desde`.
+    Para el crudo se supone como mucho una muestra por segundo.
+    """
+    ahora = ahora or datetime.now()
+    rango_seg = max((hasta - desde).total_seconds(), 1)
+    tamanos = {"crudo": 1, **NIVELES_ROLLUP}
+    for nivel, seg in tamanos.items():
+        dias = RETENCION_DIAS[nivel]
+        cubre = dias <= 0 or desde >= ahora - timedelta(days=dias)
+        if rango_seg / seg <= max_puntos and cubre:
+            return nivel
+    return "1d"
+
+
+def _punto(ts, muestras: int, valores) -> dict:
+    punto = {"ts": datetime.fromisoformat(ts) if isinstance(ts, str) else ts, "muestras": muestras}
+    for i, m in enumerate(METRICAS_RESUMEN):
+        punto[m] = dict(zip(ESTADISTICAS_ROLLUP, valores[i * len(ESTADISTICAS_ROLLUP):(i + 1) * len(ESTADISTICAS_ROLLUP)]))
+    return punto
+
+
+def obtener_serie(hostname: str, desde: datetime, hasta: datetime,
+                  max_puntos: int = ROLLUP_MAX_PUNTOS, nivel: Optional[str] = None) -> dict:
+    """
+    Serie de un host en [desde, hasta) desde el nivel elegido (o `nivel`):
+    {"nivel": ..., "puntos": [{"ts", "muestras", "<métrica>": {avg, min, max, p95}}]}.
+    En el nivel crudo cada punto es una medición (avg = min = max = p95).
+    Postgres si está habilitado; si falla, SQLite.
+    """
+    nivel = nivel or elegir_nivel(desde, hasta, max_puntos)
+    if nivel == "crudo":
+        puntos = [
+            _punto(d["ts"], 1, [d[m] for m in METRICAS_RESUMEN for _ in ESTADISTICAS_ROLLUP])
+            for d in historico.obtener_mediciones(hostname, desde, hasta)
+        ]
+        return {"nivel": nivel, "puntos": puntos}
+
+    filas = None
+    for b in reversed(_backends()):  # Postgres primero
+        sql = f"""
+            SELECT cubeta, muestras, {", ".join(_COLUMNAS_ROLLUP)} FROM mediciones_{nivel}
+            WHERE hostname = {b.ph} AND cubeta >= {b.ph} AND cubeta < {b.ph}
+            ORDER BY cubeta
+        """
+        try:
+            filas = b.consultar(sql, (hostname, b.valor_ts(desde), b.valor_ts(hasta)))
+            break
+        except RuntimeError:
+            continue
+    return {"nivel": nivel, "puntos": [_punto(f[0], f[1], f[2:]) for f in filas or []]}
+
+
+# ---------- Ejecución en segundo plano ----------
+
+_hilo: Optional[threading.Thread] = None
+_fin = threading.Event()
+
+
+def _bucle() -> None:
+    while not _fin.wait(ROLLUP_INTERVALO_SEG):
+        ejecutar_rollups()
+
+
+def iniciar() -> None:
+    """Ejecuta ejecutar_rollups() cada ROLLUP_INTERVALO_SEG en un hilo de fondo."""
+    global _hilo
+    if _hilo is not None and _hilo.is_alive():
+        return
+    _fin.clear()
+    _hilo = threading.Thread(target=_bucle, name="historico-rollups", daemon=True)
+    _hilo.start()
+
+
+def detener() -> None:
+    _fin.set()
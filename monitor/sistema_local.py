@@ -1,55 +1,521 @@
+"""
+Reconocimiento del sistema local.
+
+Lo que no cambia con la máquina encendida (modelo de CPU, núcleos, RAM
+total, particiones, hipervisor) se lee una vez por arranque: get_cpu_info()
+tarda del orden de un segundo. Se guarda en memoria y en
+reportes/cache_hardware.json con la clave de arranque (boot_id o boot_time),
+el hostname y los núcleos y la RAM total (que una VM puede cambiar en
+caliente); si cualquiera cambia, se vuelve a leer. En cada refresco solo se
+leen los valores baratos que sí cambian: frecuencia actual y tamaño del disco.
+
+MuestreadorLocal (instancia `muestreador`) lee en segundo plano CPU (total y
+por núcleo), memoria, swap y E/S de disco y red cada MUESTREO_INTERVALO_SEG
+y los guarda en búferes circulares de tamaño fijo, para ver picos que un
+refresco manual no ve.
+"""
+
+import functools
+import json
+import math
 import platform
 import socket
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Optional
+
 import psutil
 from cpuinfo import get_cpu_info  # py-cpuinfo
 
-def detectar_vm() -> bool:
-    info = platform.uname()
-    texto = (info.system + " " + info.node + " " + info.release + " " +
-             info.version + " " + info.machine).lower()
-    pistas_vm = ["virtualbox", "vmware", "kvm", "hyper-v"]
-    return any(tag in texto for tag in pistas_vm)
+from monitor.agregados import percentil
+from utils.archivos import guardar_json_atomico
+from utils.config import (
+    SISTEMA_LOCAL_CACHE,
+    MUESTREO_INTERVALO_SEG,
+    MUESTREO_CAPACIDAD,
+    MUESTREO_MAX_CPU_PCT,
+)
+
+CACHE_PATH = Path("reportes/cache_hardware.json")
+VERSION_CACHE = 2
+
+_lock = threading.Lock()
+_memoria: Optional[dict] = None  # {"version", "clave", "estaticos"}
+
+
+# --------- Detección de hipervisor ---------
+
+# Subcadena (en minúsculas) de los ficheros DMI -> proveedor. El orden
+# importa: "microsoft corporation" solo es Hyper-V con producto "virtual machine".
+PROVEEDORES_DMI = (
+    ("qemu", "KVM/QEMU"),
+    ("kvm", "KVM/QEMU"),
+    ("openstack", "KVM/QEMU"),
+    ("bochs", "Bochs"),
+    ("vmware", "VMware"),
+    ("innotek", "VirtualBox"),
+    ("virtualbox", "VirtualBox"),
+    ("xen", "Xen"),
+    ("amazon ec2", "Amazon EC2"),
+    ("google compute engine", "Google Compute Engine"),
+    ("parallels", "Parallels"),
+    ("virtual machine", "Hyper-V"),
+)
+FICHEROS_DMI = ("sys_vendor", "product_name", "board_vendor", "bios_vendor", "chassis_vendor")
+
+PISTAS_UNAME = (
+    ("microsoft-standard", "Hyper-V (WSL2)"),
+    ("virtualbox", "VirtualBox"),
+    ("vmware", "VMware"),
+    ("kvm", "KVM/QEMU"),
+    ("hyper-v", "Hyper-V"),
+)
+
+# Rastro de contenedor en /proc/1/cgroup -> motor.
+PISTAS_CGROUP = (
+    ("kubepods", "kubernetes"),
+    ("docker", "docker"),
+    ("libpod", "podman"),
+    ("containerd", "containerd"),
+    ("lxc", "lxc"),
+)
+
+
+def _leer(raiz: Path, ruta: str) -> Optional[str]:
+    try:
+        return (raiz / ruta).read_text(encoding="utf-8", errors="replace").strip()
+    except OSError:
+        return None
+
+
+def _flag_hypervisor(raiz: Path) -> Optional[bool]:
+    """Bit hypervisor de CPUID (línea flags de /proc/cpuinfo); None si no se sabe (ARM, sin /proc)."""
+    try:
+        with open(raiz / "proc/cpuinfo", encoding="utf-8", errors="replace") as f:
+            for linea in f:  # basta con el primer procesador
+                if linea.startswith("flags"):
+                    return "hypervisor" in linea.split()
+    except OSError:
+        pass
+    return None
+
+
+def _proveedor_dmi(raiz: Path) -> Optional[str]:
+    textos = [_leer(raiz, f"sys/class/dmi/id/{nombre}") for nombre in FICHEROS_DMI]
+    texto = " ".join(t for t in textos if t).lower()
+    for pista, proveedor in PROVEEDORES_DMI:
+        if pista in texto:
+            return proveedor
+    return None
+
+
+def _contenedor(raiz: Path) -> Optional[str]:
+    motor = _leer(raiz, "run/systemd/container")
+    if motor:
+        return motor
+    if (raiz / ".dockerenv").exists():
+        return "docker"
+    if (raiz / "run/.containerenv").exists():
+        return "podman"
+    cgroup = (_leer(raiz, "proc/1/cgroup") or "").lower()
+    for pista, motor in PISTAS_CGROUP:
+        if pista in cgroup:
+            return motor
+    return None
 
-def obtener_info_sistema_local() -> dict:
-    cpu_info = get_cpu_info() or {}
-    cpu_model = cpu_info.get("brand_raw") or cpu_info.get("brand") or "Desconocido"
-    cpu_freq_friendly = cpu_info.get("hz_advertised_friendly") or ""
-    hz_actual = cpu_info.get("hz_actual")
-    cpu_hz = cpu_info.get("hz_advertised_friendly") or ""
 
-    if hz_actual and isinstance(hz_actual, (tuple, list)) and hz_actual[0]:
-        ghz_actual = hz_actual[0] / 1_000_000_000
+def detectar_hipervisor(raiz: str = "/") -> dict:
+    """
+    Virtualización a partir de fuentes locales baratas, en orden: bit
+    hypervisor de /proc/cpuinfo, DMI (/sys/class/dmi/id), /sys/hypervisor
+    y, si nada de eso da pistas, la release del kernel o platform.uname()
+    (Windows, macOS). Los contenedores se informan aparte: no son una VM.
+
+    Devuelve {"es_vm", "proveedor", "confianza" ("alta" | "media" |
+    "baja"), "fuentes", "contenedor"}. `raiz` permite apuntar a un árbol
+    de ficheros de prueba. Memorizada por proceso y, vía la caché de
+    hardware, por arranque; cada llamada devuelve su propia copia.
+    """
+    r = _detectar_hipervisor(raiz)
+    return dict(r, fuentes=list(r["fuentes"]))
+
+
+@functools.lru_cache(maxsize=None)
+def _detectar_hipervisor(raiz: str) -> dict:
+    """Detección sin copiar; el dict es compartido, no modificarlo."""
+    base = Path(raiz)
+    fuentes = []
+    flag = _flag_hypervisor(base)
+    if flag:
+        fuentes.append("cpuinfo")
+    proveedor = _proveedor_dmi(base)
+    if proveedor:
+        fuentes.append("dmi")
+    tipo_xen = _leer(base, "sys/hypervisor/type")
+    if tipo_xen:
+        fuentes.append("sys_hypervisor")
+        proveedor = proveedor or tipo_xen.capitalize()
+
+    if flag or tipo_xen:
+        confianza = "alta"
+    elif proveedor:
+        confianza = "media"  # DMI sin bit de CPUID: ARM o hipervisor que lo oculta
     else:
-        ghz_actual = None
+        # En Linux, la release de uname es proc/sys/kernel/osrelease (así se puede simular).
+        texto = _leer(base, "proc/sys/kernel/osrelease")
+        if texto is None:
+            info = platform.uname()
+            texto = (info.system + " " + info.node + " " + info.release + " " +
+                     info.version + " " + info.machine)
+        texto = texto.lower()
+        proveedor = next((p for pista, p in PISTAS_UNAME if pista in texto), None)
+        if proveedor:
+            fuentes.append("uname")
+        # Con cpuinfo legible y sin el bit, "no es VM" es fiable en x86.
+        confianza = "baja" if proveedor or flag is None else "media"
 
-    cores_log = psutil.cpu_count(logical=True)
-    cores_fis = psutil.cpu_count(logical=False)
+    es_vm = bool(flag or proveedor)
+    return {
+        "es_vm": es_vm,
+        "proveedor": (proveedor or "desconocido") if es_vm else None,
+        "confianza": confianza,
+        "fuentes": fuentes,
+        "contenedor": _contenedor(base),
+    }
 
-    vm = psutil.virtual_memory()
-    ram_total_gb = vm.total / (1024 ** 3)
 
-    discos = [d for d in psutil.disk_partitions(all=False) if d.fstype]
-    disco_principal = discos[0].mountpoint if discos else "/"
-    disco_total_bytes = psutil.disk_usage(disco_principal).total
+def detectar_vm() -> bool:
+    return detectar_hipervisor()["es_vm"]
 
-    info = {
+
+def _id_arranque() -> str:
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        return str(int(psutil.boot_time()))  # Windows, macOS
+
+
+def _clave() -> dict:
+    return {
+        "arranque": _id_arranque(),
         "hostname": socket.gethostname(),
+        "cpu_cores_logicos": psutil.cpu_count(logical=True),
+        "ram_total_bytes": psutil.virtual_memory().total,
+    }
+
+
+def _leer_estaticos() -> dict:
+    cpu_info = get_cpu_info() or {}
+    discos = [d for d in psutil.disk_partitions(all=False) if d.fstype]
+    return {
         "so": platform.system(),
         "so_version": platform.version(),
         "release": platform.release(),
         "arquitectura": platform.machine(),
-        "es_vm": detectar_vm(),
-        "cpu_modelo": cpu_model,
-        "cpu_freq_anunciada": cpu_freq_friendly,
-        "cpu_freq_actual_ghz": ghz_actual,
-        "cpu_cores_logicos": cores_log,
-        "cpu_cores_fisicos": cores_fis,
-        "ram_total_bytes": vm.total,
-        "ram_total_gb": round(ram_total_gb, 2),
-        "disco_principal": disco_principal,
+        "virtualizacion": detectar_hipervisor(),
+        "cpu_modelo": cpu_info.get("brand_raw") or cpu_info.get("brand") or "Desconocido",
+        "cpu_freq_anunciada": cpu_info.get("hz_advertised_friendly") or "",
+        "cpu_cores_fisicos": psutil.cpu_count(logical=False),
+        "disco_principal": discos[0].mountpoint if discos else "/",
+    }
+
+
+def _cargar_cache() -> Optional[dict]:
+    try:
+        data = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None  # sin caché o corrupta: se vuelve a leer
+    return data if data.get("version") == VERSION_CACHE else None
+
+
+def _estaticos(clave: dict) -> dict:
+    global _memoria
+    if not SISTEMA_LOCAL_CACHE:
+        return _leer_estaticos()
+    with _lock:
+        if _memoria is None or _memoria["clave"] != clave:
+            data = _cargar_cache()
+            if data is None or data.get("clave") != clave:
+                data = {"version": VERSION_CACHE, "clave": clave, "estaticos": _leer_estaticos()}
+                guardar_json_atomico(CACHE_PATH, data)
+            _memoria = data
+        return _memoria["estaticos"]
+
+
+def _freq_actual_ghz() -> Optional[float]:
+    try:
+        freq = psutil.cpu_freq()
+    except (OSError, NotImplementedError, AttributeError):
+        return None
+    return freq.current / 1000 if freq and freq.current else None
+
+
+def obtener_info_sistema_local() -> dict:
+    clave = _clave()
+    estaticos = _estaticos(clave)
+    disco_total_bytes = psutil.disk_usage(estaticos["disco_principal"]).total
+
+    info = {
+        "hostname": clave["hostname"],
+        "so": estaticos["so"],
+        "so_version": estaticos["so_version"],
+        "release": estaticos["release"],
+        "arquitectura": estaticos["arquitectura"],
+        "es_vm": estaticos["virtualizacion"]["es_vm"],
+        "hipervisor": estaticos["virtualizacion"]["proveedor"],
+        "hipervisor_confianza": estaticos["virtualizacion"]["confianza"],
+        "contenedor": estaticos["virtualizacion"]["contenedor"],
+        "cpu_modelo": estaticos["cpu_modelo"],
+        "cpu_freq_anunciada": estaticos["cpu_freq_anunciada"],
+        "cpu_freq_actual_ghz": _freq_actual_ghz(),
+        "cpu_cores_logicos": clave["cpu_cores_logicos"],
+        "cpu_cores_fisicos": estaticos["cpu_cores_fisicos"],
+        "ram_total_bytes": clave["ram_total_bytes"],
+        "ram_total_gb": round(clave["ram_total_bytes"] / (1024 ** 3), 2),
+        "disco_principal": estaticos["disco_principal"],
         "disco_total_bytes": disco_total_bytes,
     }
 
     # Aquí más adelante puedes rellenar campos derivados, por ejemplo:
     # info["ram_max_recomendada_vm_gb"] = calcular_max_ram_vm(info)
     return info
+
+
+# --------- Muestreo en segundo plano ---------
+
+SERIES = (
+    "cpu_pct",
+    "cpu_nucleo_max_pct",  # el núcleo más cargado: picos de un solo hilo
+    "ram_pct",
+    "swap_pct",
+    "disco_lectura_bps",
+    "disco_escritura_bps",
+    "red_rx_bps",
+    "red_tx_bps",
+)
+
+
+def _ceros(n: int) -> array:
+    return array("d", bytes(8 * n))
+
+
+def _total_cpu(t) -> float:
+    # guest y guest_nice ya van incluidos en user y nice (Linux).
+    return sum(t) - getattr(t, "guest", 0.0) - getattr(t, "guest_nice", 0.0)
+
+
+class MuestreadorLocal:
+    """
+    Muestreo periódico de psutil en búferes circulares preasignados
+    (array('d') por serie, más uno de núcleos x capacidad para la CPU por
+    núcleo): en cada muestra se sobrescriben posiciones, sin crear listas
+    ni dicts. Lo que no se puede leer (p. ej. E/S de disco en un
+    contenedor) se guarda como NaN.
+
+    El coste de CPU del hilo se mide con thread_time(); si supera
+    MUESTREO_MAX_CPU_PCT (% de un núcleo) se alarga el intervalo, y se
+    vuelve al configurado cuando sobra margen.
+    """
+
+    def __init__(
+        self,
+        intervalo_seg: float = MUESTREO_INTERVALO_SEG,
+        capacidad: int = MUESTREO_CAPACIDAD,
+        max_cpu_pct: float = MUESTREO_MAX_CPU_PCT,
+    ):
+        self.intervalo_base = intervalo_seg
+        self.intervalo_seg = intervalo_seg
+        self.capacidad = capacidad
+        self.max_cpu_pct = max_cpu_pct
+        self.nucleos = psutil.cpu_count(logical=True) or 1
+
+        self._ts = _ceros(capacidad)  # epoch
+        self._series = {nombre: _ceros(capacidad) for nombre in SERIES}
+        self._por_nucleo = _ceros(capacidad * self.nucleos)
+        self._siguiente = 0  # posición a escribir
+        self._n = 0  # muestras guardadas (hasta capacidad)
+
+        # Contadores de la muestra anterior, para calcular porcentajes y tasas.
+        self._prev_total = _ceros(self.nucleos)
+        self._prev_inactivo = _ceros(self.nucleos)
+        self._prev_contadores = _ceros(4)  # disco lectura/escritura, red rx/tx
+        self._prev_t = 0.0
+
+        self._cpu_seg = 0.0  # CPU consumida por el hilo de muestreo
+        self._coste_medio = 0.0  # s de CPU por muestra (media móvil)
+        self._muestras = 0
+        self._inicio = 0.0
+
+        self._lock = threading.Lock()
+        self._fin = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    # --------- Lectura de psutil ---------
+
+    def _leer_contadores(self) -> None:
+        """Guarda los contadores acumulados actuales en _prev_*."""
+        for i, t in enumerate(psutil.cpu_times(percpu=True)[:self.nucleos]):
+            self._prev_total[i] = _total_cpu(t)
+            self._prev_inactivo[i] = t.idle + getattr(t, "iowait", 0.0)
+        disco = psutil.disk_io_counters()
+        red = psutil.net_io_counters()
+        c = self._prev_contadores
+        c[0], c[1] = (disco.read_bytes, disco.write_bytes) if disco else (math.nan, math.nan)
+        c[2], c[3] = (red.bytes_recv, red.bytes_sent) if red else (math.nan, math.nan)
+        self._prev_t = time.monotonic()
+
+    def _muestrear(self) -> None:
+        pos = self._siguiente
+        base = pos * self.nucleos
+        ocupado_total = total_total = 0.0
+        nucleo_max = 0.0
+        with self._lock:
+            for i, t in enumerate(psutil.cpu_times(percpu=True)[:self.nucleos]):
+                total = _total_cpu(t)
+                inactivo = t.idle + getattr(t, "iowait", 0.0)
+                d_total = total - self._prev_total[i]
+                d_ocupado = d_total - (inactivo - self._prev_inactivo[i])
+                pct = min(max(d_ocupado / d_total * 100, 0.0), 100.0) if d_total > 0 else 0.0
+                self._por_nucleo[base + i] = pct
+                nucleo_max = max(nucleo_max, pct)
+                ocupado_total += d_ocupado
+                total_total += d_total
+                self._prev_total[i] = total
+                self._prev_inactivo[i] = inactivo
+
+            series = self._series
+            series["cpu_pct"][pos] = min(max(ocupado_total / total_total * 100, 0.0), 100.0) if total_total > 0 else 0.0
+            series["cpu_nucleo_max_pct"][pos] = nucleo_max
+            series["ram_pct"][pos] = psutil.virtual_memory().percent
+            series["swap_pct"][pos] = psutil.swap_memory().percent
+
+            ahora = time.monotonic()
+            dt = ahora - self._prev_t
+            c = self._prev_contadores
+            disco = psutil.disk_io_counters()
+            red = psutil.net_io_counters()
+            for j, nombre, valor in (
+                (0, "disco_lectura_bps", disco.read_bytes if disco else math.nan),
+                (1, "disco_escritura_bps", disco.write_bytes if disco else math.nan),
+                (2, "red_rx_bps", red.bytes_recv if red else math.nan),
+                (3, "red_tx_bps", red.bytes_sent if red else math.nan),
+            ):
+                # Un contador que retrocede (reinicio de interfaz) deja NaN.
+                delta = valor - c[j]
+                series[nombre][pos] = delta / dt if dt > 0 and delta >= 0 else math.nan
+                c[j] = valor
+            self._prev_t = ahora
+
+            self._ts[pos] = time.time()
+            self._siguiente = (pos + 1) % self.capacidad
+            self._n = min(self._n + 1, self.capacidad)
+
+    # --------- Hilo ---------
+
+    def _ajustar_intervalo(self, coste: float) -> None:
+        self._coste_medio = coste if self._muestras == 1 else 0.9 * self._coste_medio + 0.1 * coste
+        pct = self._coste_medio / self.intervalo_seg * 100
+        if pct > self.max_cpu_pct:
+            self.intervalo_seg = min(self.intervalo_seg * 2, self.intervalo_base * 64)
+        elif pct * 2 < self.max_cpu_pct / 2 and self.intervalo_seg > self.intervalo_base:
+            # Con la mitad de intervalo seguiría por debajo de la mitad del tope.
+            self.intervalo_seg = max(self.intervalo_seg / 2, self.intervalo_base)
+
+    def _bucle(self) -> None:
+        proxima = time.monotonic()
+        while not self._fin.wait(max(proxima - time.monotonic(), 0)):
+            cpu_antes = time.thread_time()
+            try:
+                self._muestrear()
+            except Exception:
+                pass  # una lectura fallida no para el muestreo
+            coste = time.thread_time() - cpu_antes
+            self._cpu_seg += coste
+            self._muestras += 1
+            self._ajustar_intervalo(coste)
+            proxima += self.intervalo_seg
+            if proxima < time.monotonic():  # atrasado (suspensión, carga): no recuperar a ráfagas
+                proxima = time.monotonic() + self.intervalo_seg
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self) -> None:
+        if self.activo:
+            return
+        self._leer_contadores()
+        self._inicio = time.monotonic()
+        self._fin.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="muestreo-local", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._fin.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+
+    # --------- Consulta ---------
+
+    def ultimo(self) -> Optional[dict]:
+        """La muestra más reciente (O(1)), con la CPU por núcleo; None si aún no hay."""
+        with self._lock:
+            if not self._n:
+                return None
+            pos = (self._siguiente - 1) % self.capacidad
+            base = pos * self.nucleos
+            muestra = {nombre: _valor(self._series[nombre][pos]) for nombre in SERIES}
+            muestra["ts"] = self._ts[pos]
+            muestra["cpu_nucleos_pct"] = self._por_nucleo[base:base + self.nucleos].tolist()
+        return muestra
+
+    def ventana(self, seg: float) -> dict:
+        """
+        min/avg/max/p95 de cada serie en los últimos `seg` segundos. Copia
+        solo las muestras de la ventana (del final hacia atrás).
+        """
+        limite = time.time() - seg
+        with self._lock:
+            pos = self._siguiente
+            k = 0
+            while k < self._n and self._ts[(pos - 1 - k) % self.capacidad] >= limite:
+                k += 1
+            inicio = (pos - k) % self.capacidad
+            if inicio + k <= self.capacidad:
+                copias = {n: self._series[n][inicio:inicio + k] for n in SERIES}
+            else:
+                copias = {n: self._series[n][inicio:] + self._series[n][:pos] for n in SERIES}
+
+        estadisticas = {}
+        for nombre, valores in copias.items():
+            validos = sorted(v for v in valores if v == v)  # fuera NaN
+            if not validos:
+                estadisticas[nombre] = None
+                continue
+            estadisticas[nombre] = {
+                "min": validos[0],
+                "avg": math.fsum(validos) / len(validos),
+                "max": validos[-1],
+                "p95": percentil(validos, 95),
+            }
+        return {"muestras": k, "ventana_seg": seg, "series": estadisticas}
+
+    def sobrecarga(self) -> dict:
+        """CPU gastada por el muestreo (% de un núcleo) e intervalo en uso."""
+        transcurrido = time.monotonic() - self._inicio if self._inicio else 0.0
+        return {
+            "cpu_pct": self._cpu_seg / transcurrido * 100 if transcurrido > 0 else 0.0,
+            "seg_por_muestra": self._cpu_seg / self._muestras if self._muestras else 0.0,
+            "muestras": self._muestras,
+            "intervalo_seg": self.intervalo_seg,
+        }
+
+
+def _valor(v: float) -> Optional[float]:
+    return None if v != v else v
+
+
+# Compartido por la GUI, el reconocimiento y las exportaciones.
+muestreador = MuestreadorLocal()
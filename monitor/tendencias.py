@@ -0,0 +1,170 @@
+"""
+Uso sostenido de CPU/RAM a partir de las tendencias horarias de Zabbix
+(trend.get: min/avg/max por hora), para dimensionar la VM con carga real
+en vez de con un valor puntual.
+
+Por cada métrica y ventana (TENDENCIAS_VENTANAS_DIAS, p. ej. 7/30/90 días)
+calcula: promedio, máximo, p95 de los máximos horarios, hora del día con
+más carga y pendiente de crecimiento (puntos % por día).
+Usa NumPy si está instalado; si no, el mismo cálculo en Python puro.
+"""
+
+import threading
+import time
+from array import array
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError:  # opcional: solo acelera los agregados
+    np = None
+
+from monitor.agregados import percentil
+from utils.config import TENDENCIAS_VENTANAS_DIAS, TENDENCIAS_CACHE_TTL
+
+# métrica -> clave de item en Zabbix
+ITEMS_TENDENCIA = {
+    "cpu": "system.cpu.util",
+    "ram": "vm.memory.util",
+}
+
+# trend.get se pide en tramos de este tamaño (todos en un mismo lote).
+TRAMO_TENDENCIAS_SEG = 30 * 86400
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+
+def obtener_tendencias(cliente, itemids: list[str], time_from: int, time_till: int) -> dict[str, dict[str, array]]:
+    """
+    itemid -> {"clock": array('q'), "avg": array('d'), "max": array('d')},
+    ordenado por clock. Una sola petición HTTP para todos los items.
+    """
+    with cliente.lote() as lote:
+        llamadas = [
+            lote.agregar("trend.get", {
+                "output": ["itemid", "clock", "value_avg", "value_max"],
+                "itemids": list(itemids),
+                "time_from": desde,
+                "time_till": min(desde + TRAMO_TENDENCIAS_SEG - 1, time_till),
+            })
+            for desde in range(time_from, time_till + 1, TRAMO_TENDENCIAS_SEG)
+        ]
+
+    filas: dict[str, list] = {itemid: [] for itemid in itemids}
+    for llamada in llamadas:
+        for f in llamada.resultado:
+            filas.setdefault(f["itemid"], []).append(
+                (int(f["clock"]), float(f["value_avg"]), float(f["value_max"]))
+            )
+
+    series = {}
+    for itemid, lista in filas.items():
+        lista.sort()
+        series[itemid] = {
+            "clock": array("q", (c for c, _, _ in lista)),
+            "avg": array("d", (a for _, a, _ in lista)),
+            "max": array("d", (m for _, _, m in lista)),
+        }
+    return series
+
+
+def _agregar_numpy(clock, avg, maxs, desde: int, desfase_seg: int) -> Optional[dict]:
+    c = np.frombuffer(clock, dtype=np.int64)
+    inicio = int(np.searchsorted(c, desde))
+    c = c[inicio:]
+    if not len(c):
+        return None
+    a = np.frombuffer(avg, dtype=np.float64)[inicio:]
+    m = np.frombuffer(maxs, dtype=np.float64)[inicio:]
+
+    horas = ((c + desfase_seg) // 3600) % 24
+    por_hora = np.bincount(horas, weights=a, minlength=24) / np.maximum(np.bincount(horas, minlength=24), 1)
+    dias = (c - c[0]) / 86400.0
+    pendiente = float(np.polyfit(dias, a, 1)[0]) if len(c) > 1 and dias[-1] > 0 else 0.0
+    return {
+        "horas": int(len(c)),
+        "promedio": float(a.mean()),
+        "maximo": float(m.max()),
+        "p95_max": float(np.percentile(m, 95)),
+        "hora_pico": int(por_hora.argmax()),
+        "pendiente_dia": pendiente,
+    }
+
+
+def _agregar_python(clock, avg, maxs, desde: int, desfase_seg: int) -> Optional[dict]:
+    from bisect import bisect_left
+
+    inicio = bisect_left(clock, desde)
+    c, a, m = clock[inicio:], avg[inicio:], maxs[inicio:]
+    n = len(c)
+    if not n:
+        return None
+
+    suma_hora = [0.0] * 24
+    cuenta_hora = [0] * 24
+    for ci, ai in zip(c, a):
+        h = ((ci + desfase_seg) // 3600) % 24
+        suma_hora[h] += ai
+        cuenta_hora[h] += 1
+    por_hora = [s / k if k else 0.0 for s, k in zip(suma_hora, cuenta_hora)]
+
+    # Mínimos cuadrados: pendiente de avg frente a días transcurridos.
+    xs = [(ci - c[0]) / 86400.0 for ci in c]
+    mx = sum(xs) / n
+    my = sum(a) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    pendiente = sum((x - mx) * (y - my) for x, y in zip(xs, a)) / sxx if sxx > 0 else 0.0
+
+    return {
+        "horas": n,
+        "promedio": my,
+        "maximo": max(m),
+        "p95_max": percentil(sorted(m), 95),
+        "hora_pico": max(range(24), key=por_hora.__getitem__),
+        "pendiente_dia": pendiente,
+    }
+
+
+def agregar_serie(serie: dict[str, array], ventanas_dias, ahora: Optional[float] = None) -> dict:
+    """ventana (días) -> agregados, o None si no hay datos en esa ventana."""
+    ahora = ahora if ahora is not None else time.time()
+    desfase = time.localtime(ahora).tm_gmtoff  # hora pico en hora local
+    agregar = _agregar_numpy if np is not None else _agregar_python
+    return {
+        dias: agregar(serie["clock"], serie["avg"], serie["max"], int(ahora - dias * 86400), desfase)
+        for dias in ventanas_dias
+    }
+
+
+def calcular_uso_sostenido(cliente, hostid: str, ventanas_dias=TENDENCIAS_VENTANAS_DIAS) -> dict:
+    """
+    {"cpu": {7: {...}, 30: {...}, 90: {...}}, "ram": {...}} para el host.
+    Se pide una sola vez la ventana más larga y las demás se recortan de
+    ella. El resultado se reutiliza durante TENDENCIAS_CACHE_TTL segundos
+    (las tendencias solo cambian una vez por hora).
+    """
+    ventanas = tuple(sorted(ventanas_dias))
+    clave = (cliente.url, hostid, ventanas)
+    with _cache_lock:
+        previo = _cache.get(clave)
+        if previo and time.time() - previo[0] < TENDENCIAS_CACHE_TTL:
+            return previo[1]
+
+    items = cliente.get_items_for_host(hostid, list(ITEMS_TENDENCIA.values()))
+    ahora = int(time.time())
+    series = obtener_tendencias(
+        cliente,
+        [items[k] for k in ITEMS_TENDENCIA.values() if k in items],
+        ahora - ventanas[-1] * 86400,
+        ahora,
+    )
+
+    uso = {}
+    for metrica, key_zbx in ITEMS_TENDENCIA.items():
+        if key_zbx in items and items[key_zbx] in series:
+            uso[metrica] = agregar_serie(series[items[key_zbx]], ventanas, ahora)
+
+    with _cache_lock:
+        _cache[clave] = (time.time(), uso)
+    return uso
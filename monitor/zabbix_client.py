@@ -1,30 +1,198 @@
 import os
 import json
+import random
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator
 import requests
-from utils.config import ZABBIX_URL, ZABBIX_TOKEN, ZABBIX_HOSTNAME
+from requests.adapters import HTTPAdapter
+from monitor.indice_claves import IndiceClaves
+from monitor.cache_resolucion import CacheResolucion, cache_compartida
+from utils.config import (
+    ZABBIX_URL,
+    ZABBIX_TOKEN,
+    ZABBIX_HOSTNAME,
+    ZABBIX_POOL_SIZE,
+    ZABBIX_CONNECT_TIMEOUT,
+    ZABBIX_READ_TIMEOUT,
+    ZABBIX_REINTENTOS,
+    ZABBIX_BACKOFF_SEG,
+    ZABBIX_MODO_VALORES,
+    ZABBIX_MAX_ANTIGUEDAD_SEG,
+)
+
+# Clave de item -> (campo del diagnóstico, value_type para history.get)
+# value_type: 0 = float, 3 = unsigned
+METRICAS_DIAGNOSTICO = {
+    "system.cpu.util": ("cpu_uso_pct", 0),
+    "vm.memory.util": ("ram_uso_pct", 0),
+    "vfs.fs.dependent.size[C:,pused]": ("disco_c_uso_pct", 0),
+    "vfs.fs.dependent.size[C:,free]": ("disco_c_libre_bytes", 3),
+    "system.uptime": ("uptime_seg", 3),
+    "system.swap.pfree": ("swap_pfree_pct", 0),
+}
+
+# Servicios críticos: clave de item -> nombre mostrado (value_type 3)
+SERVICIOS_CLAVE = {
+    'service.info["AnyDesk",state]': "AnyDesk",
+    'service.info["AudioEndpointBuilder",state]': "AudioEndpointBuilder",
+}
+
+# Ventana para buscar el último valor en lote; lo más viejo se pide item a item.
+VENTANA_HISTORIAL_SEG = 900
+
+# Tamaño de cada tramo al recorrer rangos largos de historial.
+HISTORIAL_BLOQUE_SEG = 6 * 3600
+
+# Respuestas HTTP que se consideran transitorias para los reintentos.
+ESTADOS_REINTENTABLES = {429, 502, 503, 504}
+BACKOFF_MAX_SEG = 5.0
+
+# "lastvalue": item.get con lastvalue/lastclock; "history": history.get siempre.
+MODOS_VALORES = ("lastvalue", "history")
+
+@lru_cache(maxsize=32)
+def _indice_para(search_keys: tuple[str, ...]) -> IndiceClaves:
+    return IndiceClaves(search_keys)
+
 
 class ZabbixClient:
     """
     Cliente para Zabbix API usando token tipo Bearer en el header.
     NO usa el campo 'auth' en el cuerpo (compatible con Zabbix 7.x).
+
+    Mantiene una sesión HTTP keep-alive con pool de conexiones y reintenta
+    los métodos de solo lectura (*.get) con backoff exponencial con jitter.
+    Los últimos valores se leen por defecto de item.get (lastvalue/lastclock)
+    y solo se recurre a history.get para los vacíos o viejos; con
+    modo_valores="history" se leen siempre de history.get.
+    Los hostid/itemid resueltos se guardan en una CacheResolucion (por
+    defecto la compartida del proceso; cache=None la desactiva).
     """
 
-    def __init__(self, url: str, token: str):
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        pool_size: int = ZABBIX_POOL_SIZE,
+        connect_timeout: float = ZABBIX_CONNECT_TIMEOUT,
+        read_timeout: float = ZABBIX_READ_TIMEOUT,
+        reintentos: int = ZABBIX_REINTENTOS,
+        backoff_seg: float = ZABBIX_BACKOFF_SEG,
+        cache: CacheResolucion | None = cache_compartida,
+        modo_valores: str = ZABBIX_MODO_VALORES,
+        max_antiguedad_seg: float = ZABBIX_MAX_ANTIGUEDAD_SEG,
+    ):
         if not url or not token:
             raise ValueError("URL de Zabbix o token no configurados.")
         self.url = url
         self.token = token
+        self.timeout = (connect_timeout, read_timeout)
+        self.reintentos = reintentos
+        self.backoff_seg = backoff_seg
+        self.cache = cache
+        if modo_valores not in MODOS_VALORES:
+            raise ValueError(f"Modo de valores desconocido: {modo_valores} (use {' o '.join(MODOS_VALORES)})")
+        self.modo_valores = modo_valores
+        self.max_antiguedad_seg = max_antiguedad_seg
         self._request_id = 0
+        self._id_lock = threading.Lock()
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Content-Type": "application/json-rpc",
+            "Authorization": f"Bearer {self.token}",
+        })
+
+        # método -> contadores de latencia (ver estadisticas())
+        self._stats: dict[str, dict] = {}
+        self._stats_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones del pool."""
+        self._session.close()
 
     def _next_id(self) -> int:
-        self._request_id += 1
-        return self._request_id
+        with self._id_lock:
+            self._request_id += 1
+            return self._request_id
+
+    def _registrar(self, method: str, duracion: float, reintentos: int, error: bool) -> None:
+        with self._stats_lock:
+            st = self._stats.setdefault(
+                method,
+                {"llamadas": 0, "errores": 0, "reintentos": 0, "total_seg": 0.0, "max_seg": 0.0},
+            )
+            st["llamadas"] += 1
+            st["reintentos"] += reintentos
+            st["total_seg"] += duracion
+            st["max_seg"] = max(st["max_seg"], duracion)
+            if error:
+                st["errores"] += 1
+
+    def _marcar_error(self, method: str) -> None:
+        with self._stats_lock:
+            self._stats[method]["errores"] += 1
+
+    def estadisticas(self) -> dict:
+        """
+        Devuelve los contadores por método:
+        {"host.get": {"llamadas", "errores", "reintentos", "total_seg", "max_seg", "prom_ms"}, ...}
+        """
+        with self._stats_lock:
+            copia = {m: dict(st) for m, st in self._stats.items()}
+        for st in copia.values():
+            st["prom_ms"] = st["total_seg"] / st["llamadas"] * 1000 if st["llamadas"] else 0.0
+        return copia
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+    def _espera_backoff(self, intento: int) -> float:
+        # "Full jitter": aleatorio entre 0 y base * 2^intento, con tope.
+        return random.uniform(0, min(BACKOFF_MAX_SEG, self.backoff_seg * (2 ** intento)))
+
+    def _post(self, payload, etiqueta: str, reintentable: bool):
+        """
+        Envía el cuerpo JSON-RPC y devuelve la respuesta ya decodificada.
+        Reintenta fallos de red, timeouts y HTTP 429/5xx solo si `reintentable`.
+        Registra la latencia total (incluidos reintentos) bajo `etiqueta`.
+        """
+        cuerpo = json.dumps(payload)
+        inicio = time.perf_counter()
+        intento = 0
+        while True:
+            try:
+                resp = self._session.post(self.url, data=cuerpo, timeout=self.timeout)
+                resp.raise_for_status()
+                data = resp.json()
+                self._registrar(etiqueta, time.perf_counter() - inicio, intento, error=False)
+                return data
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                es_transitorio = not isinstance(e, requests.HTTPError) or (
+                    e.response is not None and e.response.status_code in ESTADOS_REINTENTABLES
+                )
+                if not (reintentable and es_transitorio and intento < self.reintentos):
+                    self._registrar(etiqueta, time.perf_counter() - inicio, intento, error=True)
+                    raise
+                time.sleep(self._espera_backoff(intento))
+                intento += 1
 
     def _call_api(self, method: str, params: dict):
-        headers = {
-            "Content-Type": "application/json-rpc",
-            "Authorization": f"Bearer {self.token}",
-        }
         payload = {
             "jsonrpc": "2.0",
             "method": method,
@@ -33,39 +201,99 @@ class ZabbixClient:
             # SIN "auth"
         }
 
-        resp = requests.post(self.url, headers=headers, data=json.dumps(payload), timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = self._post(payload, method, reintentable=method.endswith(".get"))
         if "error" in data:
+            self._marcar_error(method)
             raise RuntimeError(f"Error API Zabbix: {data['error']}")
         return data["result"]
 
+    # --------- Lotes JSON-RPC ---------
+
+    def lote(self) -> "LoteZabbix":
+        """
+        Agrupa varias llamadas en un solo POST (array JSON-RPC 2.0).
+
+            with cliente.lote() as lote:
+                h = cliente.get_host_id("WIN-LAPTOP", lote=lote)
+                i = lote.agregar("item.get", {...})
+            hostid = h.resultado
+        """
+        return LoteZabbix(self)
+
+    def _llamar(self, method: str, params: dict, transformar, lote: "LoteZabbix | None"):
+        """
+        Sin lote ejecuta la llamada y devuelve el resultado ya transformado;
+        con lote la encola y devuelve la LlamadaLote pendiente.
+        """
+        if lote is None:
+            return transformar(self._call_api(method, params))
+        return lote.agregar(method, params, transformar)
+
     # --------- Alto nivel ---------
 
-    def get_host_id(self, hostname: str) -> str:
+    def get_host_id(self, hostname: str, lote: "LoteZabbix | None" = None) -> str:
+        hostid = self.cache.hostid(self.url, hostname) if self.cache else None
+        if hostid is not None:
+            return hostid if lote is None else LlamadaLote.resuelta("host.get", hostid)
+
         params = {
             "output": ["hostid", "host"],
             "filter": {"host": [hostname]},
         }
-        result = self._call_api("host.get", params)
-        if not result:
-            raise ValueError(f"No se encontró host con nombre {hostname}")
-        return result[0]["hostid"]
 
-    def get_items_for_host(self, hostid: str, search_keys: list[str]) -> dict:
+        def extraer(result):
+            if not result:
+                raise ValueError(f"No se encontró host con nombre {hostname}")
+            if self.cache:
+                self.cache.guardar_host(self.url, hostname, result[0]["hostid"])
+            return result[0]["hostid"]
+
+        return self._llamar("host.get", params, extraer, lote)
+
+    def get_items_for_host(
+        self,
+        hostid: str | None,
+        search_keys: list[str],
+        lote: "LoteZabbix | None" = None,
+        hostname: str | None = None,
+    ) -> dict:
+        """
+        Mapea cada clave buscada al itemid cuyo key_ la contiene.
+        El filtrado grueso lo hace Zabbix (search por key_, cualquiera de
+        las claves); el índice local aplica la regla exacta de subcadena.
+        Si no se conoce el hostid se puede filtrar por `hostname` (útil en
+        lotes, donde host.get y item.get viajan en la misma petición).
+        """
+        if hostid is None and self.cache:
+            hostid = self.cache.hostid(self.url, hostname)
+        mapping = self.cache.items(self.url, hostid, search_keys) if self.cache and hostid else None
+        if mapping is not None:
+            return mapping if lote is None else LlamadaLote.resuelta("item.get", mapping)
+
         params = {
             "output": ["itemid", "name", "key_"],
-            "hostids": [hostid],
+            "search": {"key_": list(search_keys)},
+            "searchByAny": True,
         }
-        result = self._call_api("item.get", params)
-        mapping: dict[str, str] = {}
-        for item in result:
-            for key_wanted in search_keys:
-                if key_wanted in item["key_"]:
-                    mapping[key_wanted] = item["itemid"]
-        return mapping
+        if hostid is not None:
+            params["hostids"] = [hostid]
+        else:
+            params["host"] = hostname
+
+        indice = _indice_para(tuple(search_keys))
+
+        def mapear(result):
+            mapping = indice.mapear(result)
+            if self.cache:
+                # Con filtro por nombre, el hostid sale del propio host.get del lote.
+                hid = hostid if hostid is not None else self.cache.hostid(self.url, hostname)
+                if hid is not None:
+                    self.cache.guardar_items(self.url, hid, search_keys, mapping)
+            return mapping
+
+        return self._llamar("item.get", params, mapear, lote)
 
-    def get_last_history_value(self, itemid: str, value_type: int = 0) -> float:
+    def get_last_history_value(self, itemid: str, value_type: int = 0, lote: "LoteZabbix | None" = None) -> float:
         params = {
             "output": "extend",
             "history": value_type,
@@ -74,27 +302,274 @@ class ZabbixClient:
             "sortorder": "DESC",
             "limit": 1,
         }
-        result = self._call_api("history.get", params)
-        if not result:
-            raise ValueError(f"Sin valores de history para item {itemid}")
-        return float(result[0]["value"])
-
-    def obtener_diagnostico_host(self, hostname: str) -> dict:
-        hostid = self.get_host_id(hostname)
-
-        search_keys = [
-            "system.cpu.util",
-            "vm.memory.util",
-            "vfs.fs.dependent.size[C:,pused]",
-            "vfs.fs.dependent.size[C:,free]",
-            "system.uptime",
-            "system.swap.pfree",
-            'service.info["AnyDesk",state]',
-            'service.info["AudioEndpointBuilder",state]',
+
+        def extraer(result):
+            if not result:
+                raise ValueError(f"Sin valores de history para item {itemid}")
+            return float(result[0]["value"])
+
+        return self._llamar("history.get", params, extraer, lote)
+
+    def get_last_history_values(self, items: dict[str, int], ventana_seg: int = VENTANA_HISTORIAL_SEG) -> dict[str, float]:
+        """
+        Último valor de varios items a la vez.
+        items: itemid -> value_type. Envía un history.get por value_type
+        (acotado a los últimos `ventana_seg` segundos), todos en un mismo
+        lote, y elige en el cliente el valor más reciente de cada item.
+        Los items sin datos en la ventana se piden con limit=1 en un
+        segundo lote.
+        """
+        return {itemid: valor for itemid, (_, valor) in self._ultimos_history(items, ventana_seg).items()}
+
+    def _ultimos_history(
+        self, items: dict[str, int], ventana_seg: int = VENTANA_HISTORIAL_SEG, estricto: bool = True
+    ) -> dict[str, tuple[int, float]]:
+        """
+        Como get_last_history_values, pero devuelve itemid -> (clock, valor).
+        Con estricto=False los items sin ningún valor se omiten en vez de
+        lanzar ValueError.
+        """
+        por_tipo: dict[int, list[str]] = {}
+        for itemid, value_type in items.items():
+            por_tipo.setdefault(value_type, []).append(itemid)
+
+        time_from = int(time.time()) - ventana_seg
+        with self.lote() as lote:
+            pendientes = [
+                lote.agregar("history.get", {
+                    "output": ["itemid", "clock", "ns", "value"],
+                    "history": value_type,
+                    "itemids": itemids,
+                    "time_from": time_from,
+                    "sortfield": "clock",
+                    "sortorder": "DESC",
+                })
+                for value_type, itemids in por_tipo.items()
+            ]
+
+        ultimos: dict[str, tuple[int, int, float]] = {}  # itemid -> (clock, ns, valor)
+        for llamada in pendientes:
+            for fila in llamada.resultado:
+                marca = (int(fila["clock"]), int(fila.get("ns", 0)))
+                previo = ultimos.get(fila["itemid"])
+                if previo is None or marca > previo[:2]:
+                    ultimos[fila["itemid"]] = (marca[0], marca[1], float(fila["value"]))
+
+        resultado = {itemid: (v[0], v[2]) for itemid, v in ultimos.items()}
+        faltantes = [itemid for itemid in items if itemid not in resultado]
+        if faltantes:
+            with self.lote() as lote:
+                viejos = {
+                    itemid: lote.agregar("history.get", {
+                        "output": ["itemid", "clock", "value"],
+                        "history": items[itemid],
+                        "itemids": [itemid],
+                        "sortfield": "clock",
+                        "sortorder": "DESC",
+                        "limit": 1,
+                    })
+                    for itemid in faltantes
+                }
+            for itemid, llamada in viejos.items():
+                filas = llamada.resultado
+                if not filas:
+                    if not estricto:
+                        continue
+                    raise ValueError(f"Sin valores de history para item {itemid}")
+                resultado[itemid] = (int(filas[0]["clock"]), float(filas[0]["value"]))
+        return resultado
+
+    def _ultimos_lastvalue(self, items: dict[str, int], estricto: bool = True) -> dict[str, tuple[int, float]]:
+        """
+        itemid -> (clock, valor) leyendo lastvalue/lastclock de un solo
+        item.get, sin tocar las tablas de history. Los items sin lastvalue,
+        desaparecidos o con lastclock más viejo que max_antiguedad_seg se
+        completan con history.get.
+        """
+        result = self._call_api("item.get", {
+            "output": ["itemid", "lastvalue", "lastclock"],
+            "itemids": list(items),
+        })
+        limite = time.time() - self.max_antiguedad_seg
+        resultado: dict[str, tuple[int, float]] = {}
+        for item in result:
+            clock = int(item.get("lastclock") or 0)
+            if item["itemid"] in items and item.get("lastvalue", "") != "" and clock >= limite:
+                resultado[item["itemid"]] = (clock, float(item["lastvalue"]))
+
+        viejos = {itemid: vt for itemid, vt in items.items() if itemid not in resultado}
+        if viejos:
+            resultado.update(self._ultimos_history(viejos, estricto=estricto))
+        return resultado
+
+    def obtener_ultimos_valores(self, items: dict[str, int], estricto: bool = True) -> dict[str, tuple[int, float]]:
+        """
+        itemid -> (clock, valor) según el modo configurado:
+        "lastvalue" (item.get, con respaldo en history.get) o "history".
+        Con estricto=False los items sin datos se omiten del resultado.
+        """
+        if not items:
+            return {}
+        if self.modo_valores == "lastvalue":
+            return self._ultimos_lastvalue(items, estricto=estricto)
+        return self._ultimos_history(items, estricto=estricto)
+
+    # --------- Rangos de historial ---------
+
+    def _bloque_historial(self, itemid: str, value_type: int, desde: int, hasta: int) -> tuple[array, array]:
+        """Un tramo [desde, hasta] de history.get como arrays (clocks, valores)."""
+        filas = self._call_api("history.get", {
+            "output": ["clock", "value"],
+            "history": value_type,
+            "itemids": [itemid],
+            "time_from": desde,
+            "time_till": hasta,
+            "sortfield": "clock",
+            "sortorder": "ASC",
+        })
+        clocks = array("q", (int(f["clock"]) for f in filas))
+        valores = array("d", (float(f["value"]) for f in filas))
+        return clocks, valores
+
+    def iterar_historial_bloques(
+        self,
+        itemid: str,
+        value_type: int,
+        time_from: int,
+        time_till: int,
+        bloque_seg: int = HISTORIAL_BLOQUE_SEG,
+        concurrencia: int = 1,
+    ) -> Iterator[tuple[array, array]]:
+        """
+        Recorre el historial de un item entre time_from y time_till en tramos
+        de `bloque_seg` (time_from/time_till de history.get) y genera, en
+        orden cronológico, un par de arrays compactos (clocks 'q', valores 'd')
+        por tramo. Con concurrencia > 1 se piden varios tramos por adelantado;
+        en memoria nunca hay más de `concurrencia` tramos a la vez.
+        """
+        tramos = [
+            (desde, min(desde + bloque_seg - 1, time_till))
+            for desde in range(time_from, time_till + 1, bloque_seg)
         ]
+        if concurrencia <= 1:
+            for desde, hasta in tramos:
+                yield self._bloque_historial(itemid, value_type, desde, hasta)
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix="historial") as pool:
+            en_vuelo: deque = deque()
+            siguientes = iter(tramos)
+            try:
+                for desde, hasta in siguientes:
+                    en_vuelo.append(pool.submit(self._bloque_historial, itemid, value_type, desde, hasta))
+                    if len(en_vuelo) >= concurrencia:
+                        yield en_vuelo.popleft().result()
+                while en_vuelo:
+                    yield en_vuelo.popleft().result()
+            finally:
+                for futuro in en_vuelo:
+                    futuro.cancel()
+
+    def iterar_historial(
+        self,
+        itemid: str,
+        value_type: int,
+        time_from: int,
+        time_till: int,
+        bloque_seg: int = HISTORIAL_BLOQUE_SEG,
+        concurrencia: int = 1,
+    ) -> Iterator[tuple[int, float]]:
+        """Como iterar_historial_bloques, pero fila a fila: (clock, valor)."""
+        for clocks, valores in self.iterar_historial_bloques(
+            itemid, value_type, time_from, time_till, bloque_seg, concurrencia
+        ):
+            yield from zip(clocks, valores)
 
-        items = self.get_items_for_host(hostid, search_keys)
+    # --------- Varios hosts ---------
 
+    def get_host_ids(self, hostnames: list[str] | None = None, grupo: str | None = None) -> dict[str, str]:
+        """
+        hostname -> hostid de una lista de hosts o de un grupo de hosts
+        de Zabbix (por nombre), en una o dos llamadas.
+        """
+        if hostnames is None and grupo is None:
+            raise ValueError("Indique una lista de hosts o un grupo.")
+
+        resueltos: dict[str, str] = {}
+        if hostnames is not None and self.cache:
+            for nombre in hostnames:
+                hostid = self.cache.hostid(self.url, nombre)
+                if hostid is not None:
+                    resueltos[nombre] = hostid
+            hostnames = [h for h in hostnames if h not in resueltos]
+            if not hostnames and grupo is None:
+                return resueltos
+
+        params: dict = {"output": ["hostid", "host"]}
+        if hostnames is not None:
+            params["filter"] = {"host": list(hostnames)}
+        if grupo is not None:
+            grupos = self._call_api("hostgroup.get", {"output": ["groupid"], "filter": {"name": [grupo]}})
+            if not grupos:
+                raise ValueError(f"No se encontró el grupo de hosts {grupo}")
+            params["groupids"] = [g["groupid"] for g in grupos]
+
+        nuevos = {host["host"]: host["hostid"] for host in self._call_api("host.get", params)}
+        if self.cache:
+            self.cache.guardar_hosts(self.url, nuevos)
+        resueltos.update(nuevos)
+        return resueltos
+
+    def get_items_for_hosts(self, hostids: list[str], search_keys: list[str]) -> dict[str, dict]:
+        """
+        hostid -> {clave buscada: itemid} para varios hosts con un solo item.get
+        (los que ya están en caché no viajan).
+        """
+        mapeos: dict[str, dict] = {}
+        pendientes = []
+        for hostid in hostids:
+            mapping = self.cache.items(self.url, hostid, search_keys) if self.cache else None
+            if mapping is not None:
+                mapeos[hostid] = mapping
+            else:
+                pendientes.append(hostid)
+        if not pendientes:
+            return mapeos
+
+        result = self._call_api("item.get", {
+            "output": ["itemid", "hostid", "key_"],
+            "hostids": pendientes,
+            "search": {"key_": list(search_keys)},
+            "searchByAny": True,
+        })
+        por_host: dict[str, list] = {hostid: [] for hostid in pendientes}
+        for item in result:
+            por_host.setdefault(item["hostid"], []).append(item)
+
+        indice = _indice_para(tuple(search_keys))
+        nuevos = {hostid: indice.mapear(items) for hostid, items in por_host.items()}
+        if self.cache:
+            self.cache.guardar_items_lote(self.url, search_keys, nuevos)
+        mapeos.update(nuevos)
+        return mapeos
+
+    # --------- Diagnóstico ---------
+
+    @staticmethod
+    def pedidos_para(items: dict) -> dict[str, int]:
+        """itemid -> value_type de todo lo que hay que leer para el diagnóstico."""
+        pedidos: dict[str, int] = {}
+        for key_zbx, (_, value_type) in METRICAS_DIAGNOSTICO.items():
+            if key_zbx in items:
+                pedidos[items[key_zbx]] = value_type
+        for key_zbx in SERVICIOS_CLAVE:
+            if key_zbx in items:
+                pedidos[items[key_zbx]] = 3
+        return pedidos
+
+    @staticmethod
+    def armar_diagnostico(hostname: str, hostid: str, items: dict, ultimos: dict) -> dict:
+        """Construye el dict de diagnóstico; los items sin valor quedan en None."""
         diag = {
             "hostname": hostname,
             "hostid": hostid,
@@ -105,47 +580,133 @@ class ZabbixClient:
             "uptime_seg": None,
             "swap_pfree_pct": None,
             "servicios": {},  # nombre -> estado
+            "frescura_seg": {},  # campo o servicio -> segundos desde el último dato
         }
 
-        if "system.cpu.util" in items:
-            diag["cpu_uso_pct"] = self.get_last_history_value(
-                items["system.cpu.util"], value_type=0
-            )
+        ahora = time.time()
+        for key_zbx, (campo, _) in METRICAS_DIAGNOSTICO.items():
+            if key_zbx in items and items[key_zbx] in ultimos:
+                clock, diag[campo] = ultimos[items[key_zbx]]
+                diag["frescura_seg"][campo] = max(0, int(ahora - clock))
 
-        if "vm.memory.util" in items:
-            diag["ram_uso_pct"] = self.get_last_history_value(
-                items["vm.memory.util"], value_type=0
-            )
+        # Servicios críticos (Zabbix devuelve 0=stopped,1=running,... según value map) [web:150][web:261]
+        for key_zbx, nombre_serv in SERVICIOS_CLAVE.items():
+            if key_zbx in items and items[key_zbx] in ultimos:
+                clock, estado = ultimos[items[key_zbx]]
+                diag["servicios"][nombre_serv] = int(estado)
+                diag["frescura_seg"][nombre_serv] = max(0, int(ahora - clock))
 
-        if "vfs.fs.dependent.size[C:,pused]" in items:
-            diag["disco_c_uso_pct"] = self.get_last_history_value(
-                items["vfs.fs.dependent.size[C:,pused]"], value_type=0
-            )
+        return diag
 
-        if "vfs.fs.dependent.size[C:,free]" in items:
-            diag["disco_c_libre_bytes"] = self.get_last_history_value(
-                items["vfs.fs.dependent.size[C:,free]"], value_type=3
-            )
+    def obtener_diagnostico_host(self, hostname: str, _reintento: bool = False) -> dict:
+        search_keys = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
 
-        if "system.uptime" in items:
-            diag["uptime_seg"] = self.get_last_history_value(
-                items["system.uptime"], value_type=3
-            )
+        # host.get + item.get en una sola petición HTTP (ninguna si están en caché)
+        desde_cache = bool(self.cache and self.cache.hostid(self.url, hostname) is not None)
+        with self.lote() as lote:
+            llamada_host = self.get_host_id(hostname, lote=lote)
+            llamada_items = self.get_items_for_host(None, search_keys, lote=lote, hostname=hostname)
+        hostid = llamada_host.resultado
+        items = llamada_items.resultado
 
-        if "system.swap.pfree" in items:
-            diag["swap_pfree_pct"] = self.get_last_history_value(
-                items["system.swap.pfree"], value_type=0
-            )
+        try:
+            ultimos = self.obtener_ultimos_valores(self.pedidos_para(items))
+        except (ValueError, RuntimeError):
+            # Un itemid cacheado sin datos o con error puede estar obsoleto
+            # (item borrado/recreado): se olvida la resolución y se repite una vez.
+            if not desde_cache or _reintento:
+                raise
+            self.cache.invalidar(self.url, hostname)
+            return self.obtener_diagnostico_host(hostname, _reintento=True)
 
-        # Servicios críticos (Zabbix devuelve 0=stopped,1=running,... según value map) [web:150][web:261]
-        servicios_clave = {
-            'service.info["AnyDesk",state]': "AnyDesk",
-            'service.info["AudioEndpointBuilder",state]': "AudioEndpointBuilder",
-        }
-        for key_zbx, nombre_serv in servicios_clave.items():
-            if key_zbx in items:
-                estado = self.get_last_history_value(items[key_zbx], value_type=3)
-                diag["servicios"][nombre_serv] = int(estado)
+        return self.armar_diagnostico(hostname, hostid, items, ultimos)
 
-        return diag
+class LlamadaLote:
+    """
+    Llamada encolada en un LoteZabbix. `resultado` está disponible cuando
+    el lote se ha enviado; si Zabbix devolvió error para esta llamada, lo
+    lanza aquí (RuntimeError), sin afectar al resto del lote. La
+    transformación se aplica en el primer acceso y se guarda.
+    """
+
+    def __init__(self, method: str, params: dict, request_id: int, transformar=None):
+        self.method = method
+        self.params = params
+        self.id = request_id
+        self._transformar = transformar
+        self._enviada = False
+        self._resultado = None
+        self._error = None
+
+    @classmethod
+    def resuelta(cls, method: str, valor) -> "LlamadaLote":
+        """Llamada ya resuelta (p. ej. desde caché) que no viaja en el lote."""
+        llamada = cls(method, {}, 0)
+        llamada._enviada = True
+        llamada._resultado = valor
+        return llamada
+
+    def _resolver(self, respuesta: dict | None) -> None:
+        self._enviada = True
+        if respuesta is None:
+            self._error = {"message": "Respuesta ausente en el lote", "id": self.id}
+        elif "error" in respuesta:
+            self._error = respuesta["error"]
+        else:
+            self._resultado = respuesta.get("result")
+
+    @property
+    def resultado(self):
+        if not self._enviada:
+            raise RuntimeError(f"La llamada {self.method} (id={self.id}) aún no se ha enviado.")
+        if self._error is not None:
+            raise RuntimeError(f"Error API Zabbix: {self._error}")
+        if self._transformar is not None:
+            # Una sola vez: la transformación puede escribir en la caché.
+            self._resultado = self._transformar(self._resultado)
+            self._transformar = None
+        return self._resultado
+
+
+class LoteZabbix:
+    """
+    Cola de llamadas JSON-RPC que se envían juntas en un solo POST.
+    Como gestor de contexto, envía al salir del bloque si no hubo excepción.
+    """
+
+    def __init__(self, cliente: ZabbixClient):
+        self._cliente = cliente
+        self._llamadas: list[LlamadaLote] = []
+
+    def agregar(self, method: str, params: dict, transformar=None) -> LlamadaLote:
+        llamada = LlamadaLote(method, params, self._cliente._next_id(), transformar)
+        self._llamadas.append(llamada)
+        return llamada
+
+    def enviar(self) -> None:
+        if not self._llamadas:
+            return
+        llamadas, self._llamadas = self._llamadas, []
+        payload = [
+            {"jsonrpc": "2.0", "method": ll.method, "params": ll.params, "id": ll.id}
+            for ll in llamadas
+        ]
+        reintentable = all(ll.method.endswith(".get") for ll in llamadas)
+        data = self._cliente._post(payload, "lote", reintentable=reintentable)
+
+        if isinstance(data, dict):
+            # Error a nivel de petición (p. ej. JSON inválido): afecta a todas.
+            data = [dict(data, id=ll.id) for ll in llamadas]
+        por_id = {r.get("id"): r for r in data}
+        for ll in llamadas:
+            respuesta = por_id.get(ll.id)
+            if respuesta is None or "error" in respuesta:
+                self._cliente._marcar_error("lote")
+            ll._resolver(respuesta)
+
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.enviar()
@@ -0,0 +1,70 @@
+"""
+Fixtures compartidas: histórico SQLite en un directorio temporal y un
+sustituto en memoria del pool de Postgres.
+"""
+
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+from monitor import historico
+
+
+@pytest.fixture
+def base_tmp(tmp_path, monkeypatch):
+    """historico con reportes/historico.db en tmp_path y Postgres desactivado."""
+    monkeypatch.delenv("PG_ENABLED", raising=False)
+    monkeypatch.setattr(historico, "DB_PATH", tmp_path / "historico.db")
+    historico._resumenes.reiniciar()
+    historico.preparar_sqlite()
+    yield historico._base_sqlite
+    historico._base_sqlite.cerrar()
+    historico._resumenes.reiniciar()
+
+
+class PgFalso:
+    """
+    Sustituto de historico._pool_pg: guarda las filas del INSERT en
+    self.filas. `error` se lanza para cualquier lote; las filas cuyo
+    medicion_id está en `veneno` se rechazan con un error de datos.
+    """
+
+    def __init__(self, fallos_apertura: int = 3, espera_seg: float = 60):
+        self.interruptor = historico._Interruptor(fallos_apertura, espera_seg)
+        self.filas: list[tuple] = []
+        self.error = None
+        self.veneno: set[str] = set()
+
+    @contextmanager
+    def conexion(self):
+        # Mismo contrato que _PoolPG.conexion con el interruptor.
+        if not self.interruptor.permitir():
+            raise psycopg2.OperationalError("Postgres no disponible (interruptor abierto).")
+        try:
+            yield self
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.interruptor.fallo()
+            raise
+        else:
+            self.interruptor.exito()
+
+    def cursor(self):
+        return self
+
+    def insertar(self, filas: list[tuple]) -> None:
+        if self.error is not None:
+            raise self.error
+        for fila in filas:
+            if fila[0] in self.veneno:
+                raise psycopg2.errors.InvalidTextRepresentation(f"valor inválido en {fila[0]}")
+        self.filas.extend(filas)
+
+
+@pytest.fixture
+def pg_falso(base_tmp, monkeypatch):
+    pg = PgFalso()
+    monkeypatch.setenv("PG_ENABLED", "true")
+    monkeypatch.setattr(historico, "_pool_pg", pg)
+    monkeypatch.setattr(historico, "execute_values", lambda cur, sql, filas, page_size=None: cur.insertar(list(filas)))
+    return pg
@@ -0,0 +1,26 @@
+"""
+guardar_json_atomico (utils/archivos.py): cachés JSON en disco.
+"""
+
+import json
+
+from utils.archivos import guardar_json_atomico
+
+
+def test_escribe_y_reemplaza(tmp_path):
+    ruta = tmp_path / "reportes" / "cache.json"
+    assert guardar_json_atomico(ruta, {"version": 1})
+    assert guardar_json_atomico(ruta, {"version": 2})
+    assert json.loads(ruta.read_text(encoding="utf-8")) == {"version": 2}
+    assert [p.name for p in ruta.parent.iterdir()] == ["cache.json"]  # sin temporales
+
+
+def test_fallo_de_escritura_no_lanza_ni_deja_temporales(tmp_path):
+    ocupado = tmp_path / "reportes"
+    ocupado.write_text("no soy un directorio")
+    assert not guardar_json_atomico(ocupado / "cache.json", {"a": 1})
+
+    ruta = tmp_path / "cache.json"
+    ruta.mkdir()  # os.replace no puede pisar un directorio
+    assert not guardar_json_atomico(ruta, {"a": 1})
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
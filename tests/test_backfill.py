@@ -0,0 +1,95 @@
+"""
+Backfill (monitor/backfill.py) sobre un SQLite temporal: filas nuevas
+contadas con total_changes y resúmenes incrementales invalidados, en este
+proceso y en otro con el histórico abierto.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor import backfill, historico
+from monitor.cache_resolucion import CacheResolucion
+from monitor.zabbix_client import ZabbixClient
+
+INICIO = datetime(2026, 10, 1, 12, 0, 0)
+
+
+def filas(n: int, cpu: float, desde: datetime, hostname: str = "A") -> list[tuple]:
+    zbx = {"hostname": hostname, "cpu_uso_pct": cpu}
+    return [
+        historico._fila_medicion({"zabbix": zbx}, ts=desde + timedelta(minutes=i), medicion_id=str(uuid.uuid4()))
+        for i in range(n)
+    ]
+
+
+def por_sql(hostname=None) -> dict:
+    return historico._obtener_resumen_sqlite(20, hostname)
+
+
+def test_cuenta_solo_filas_nuevas(base_tmp):
+    lote = filas(5, 10.0, INICIO)
+    assert backfill._escribir_sqlite(lote, ("A", 1, 2)) == 5
+    assert backfill._escribir_sqlite(lote + filas(1, 10.0, INICIO + timedelta(hours=1)), ("A", 2, 3)) == 1
+    puntos = historico._base_sqlite.lector().execute("SELECT desde, filas FROM backfill_puntos ORDER BY desde")
+    assert puntos.fetchall() == [(1, 5), (2, 1)]
+
+
+def test_resumen_tras_backfill(base_tmp):
+    historico._escribir_filas(filas(5, 10.0, INICIO + timedelta(hours=1)))
+    assert historico.obtener_resumen(20, "A")["muestras"] == 5
+
+    backfill._escribir_sqlite(filas(15, 90.0, INICIO), None)
+    for hostname in ("A", None):
+        resumen = historico.obtener_resumen(20, hostname)
+        assert resumen["muestras"] == 20
+        assert resumen["cpu_prom"] == pytest.approx(por_sql(hostname)["cpu_prom"])
+    assert historico.obtener_resumen(20, "A")["cpu_prom"] == pytest.approx(70.0)
+
+
+def test_otro_proceso_nota_la_invalidacion(base_tmp):
+    # Otra instancia de _Resumenes hace de la app abierta mientras el
+    # backfill corre en otro proceso.
+    app = historico._Resumenes()
+
+    def medir(lote):  # mismo orden que _escribir_filas
+        app.preparar(lote)
+        historico._guardar_filas_sqlite(lote)
+        app.actualizar(lote)
+
+    medir(filas(5, 10.0, INICIO + timedelta(hours=1)))
+    assert app.obtener("A").resumen(20)["muestras"] == 5
+
+    backfill._escribir_sqlite(filas(15, 90.0, INICIO), None)
+    claves = historico._base_sqlite.lector().execute("SELECT clave FROM resumenes").fetchall()
+    assert claves == []
+
+    # Siguiente medición de la app: el UPDATE no encuentra la fila y el
+    # agregado se vuelve a sembrar desde la base.
+    medir(filas(1, 10.0, INICIO + timedelta(hours=2)))
+    assert app.obtener("A") is None
+    medir(filas(1, 10.0, INICIO + timedelta(hours=3)))
+    resumen = app.obtener("A").resumen(20)
+    assert resumen["muestras"] == 20
+    assert resumen["cpu_prom"] == pytest.approx(por_sql("A")["cpu_prom"])
+
+
+def test_ejecutar_backfill_contra_zabbix_simulado(base_tmp):
+    hasta = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    historico._escribir_filas(filas(3, 10.0, hasta + timedelta(minutes=10), hostname="SIM-1"))
+    assert historico.obtener_resumen(20, "SIM-1")["muestras"] == 3
+
+    with ServidorZabbixSimulado(["SIM-1"]) as srv:
+        cliente = ZabbixClient(srv.url, "token", cache=CacheResolucion(ruta=None))
+        try:
+            stats = backfill.ejecutar_backfill(hasta - timedelta(hours=1), hasta, hosts=["SIM-1"], cliente=cliente)
+        finally:
+            cliente.cerrar()
+    assert stats["errores"] == 0 and stats["filas"] > 0
+
+    resumen = historico.obtener_resumen(20, "SIM-1")
+    esperado = por_sql("SIM-1")
+    assert resumen["muestras"] == esperado["muestras"] == 20
+    assert resumen["cpu_prom"] == pytest.approx(esperado["cpu_prom"])
@@ -0,0 +1,80 @@
+"""
+Caché de resolución hostid/itemids (monitor/cache_resolucion.py) con el
+Zabbix simulado: un itemid cacheado que ya no devuelve datos, o cuya
+lectura falla, se olvida y la resolución se repite una sola vez.
+"""
+
+import pytest
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor.cache_resolucion import CacheResolucion
+from monitor.zabbix_client import METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE, ZabbixClient
+
+CLAVES = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
+CLAVE_CPU = next(iter(METRICAS_DIAGNOSTICO))
+
+
+@pytest.fixture
+def srv():
+    with ServidorZabbixSimulado(["SIM-1"]) as servidor:
+        yield servidor
+
+
+def recrear_item(srv, key_: str, nuevo_itemid: str = "99999") -> str:
+    """Borra el item de esa clave y lo vuelve a crear con otro itemid; devuelve el viejo."""
+    item = next(it for it in srv.datos.items.values() if it["key_"] == key_)
+    del srv.datos.items[item["itemid"]]
+    srv.datos.items[nuevo_itemid] = dict(item, itemid=nuevo_itemid)
+    return item["itemid"]
+
+
+def cliente_para(srv, cache, modo="history") -> ZabbixClient:
+    return ZabbixClient(srv.url, "token", reintentos=0, cache=cache, modo_valores=modo)
+
+
+@pytest.mark.parametrize("modo", ["history", "lastvalue"])
+def test_item_recreado_invalida_y_resuelve_de_nuevo(srv, tmp_path, modo):
+    cache = CacheResolucion(ttl_seg=3600, ruta=tmp_path / "cache.json")
+    with cliente_para(srv, cache, modo) as cliente:
+        cliente.obtener_diagnostico_host("SIM-1")
+        viejo = recrear_item(srv, CLAVE_CPU)
+        srv.reiniciar_contadores()
+
+        diag = cliente.obtener_diagnostico_host("SIM-1")
+    assert diag["cpu_uso_pct"] is not None
+    assert srv.contadores()["llamadas"]["host.get"] == 1  # resolución repetida una vez
+
+    # La caché (también la del disco) ya tiene el itemid nuevo.
+    releida = CacheResolucion(ttl_seg=3600, ruta=tmp_path / "cache.json")
+    items = releida.items(srv.url, releida.hostid(srv.url, "SIM-1"), CLAVES)
+    assert items[CLAVE_CPU] == "99999" != viejo
+
+
+def test_error_al_leer_valores_cacheados_invalida_una_vez(srv):
+    cache = CacheResolucion(ttl_seg=3600, ruta=None)
+    with cliente_para(srv, cache) as cliente:
+        cliente.obtener_diagnostico_host("SIM-1")
+        srv.tasa_error_api = 1.0
+        srv.reiniciar_contadores()
+        with pytest.raises(RuntimeError, match="Application error"):
+            cliente.obtener_diagnostico_host("SIM-1")
+    assert cache.hostid(srv.url, "SIM-1") is None
+    assert srv.contadores()["llamadas"]["host.get"] == 1  # sin bucle de reintentos
+
+
+def test_resolucion_recien_pedida_no_se_repite(srv):
+    cache = CacheResolucion(ttl_seg=3600, ruta=None)
+    with cliente_para(srv, cache) as cliente:
+        srv._history_get = lambda params: []  # items que nunca han tenido datos
+        with pytest.raises(ValueError, match="Sin valores de history"):
+            cliente.obtener_diagnostico_host("SIM-1")
+    assert srv.contadores()["llamadas"]["host.get"] == 1
+
+
+def test_ttl_cero_desactiva_la_cache(srv):
+    cache = CacheResolucion(ttl_seg=0, ruta=None)
+    with cliente_para(srv, cache) as cliente:
+        cliente.obtener_diagnostico_host("SIM-1")
+        cliente.obtener_diagnostico_host("SIM-1")
+    assert srv.contadores()["llamadas"]["host.get"] == 2
+    assert cache.hostid(srv.url, "SIM-1") is None
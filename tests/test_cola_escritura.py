@@ -0,0 +1,77 @@
+"""
+Cola de escritura asíncrona del histórico (_ColaEscritura) sobre un SQLite
+temporal: lotes por tamaño, vaciado al cerrar y lotes que fallan.
+"""
+
+import uuid
+
+from monitor import historico
+
+
+def filas(n: int) -> list[tuple]:
+    return [historico._fila_medicion({"hostname": "A"}, medicion_id=str(uuid.uuid4())) for _ in range(n)]
+
+
+def contar() -> int:
+    return historico._base_sqlite.lector().execute("SELECT COUNT(*) FROM mediciones").fetchone()[0]
+
+
+def test_cerrar_escribe_el_lote_a_medias(base_tmp):
+    # Ni lote lleno ni intervalo cumplido: solo la marca de fin lo escribe.
+    cola = historico._ColaEscritura(100, lote=50, intervalo_seg=3600, espera_seg=1)
+    for fila in filas(7):
+        assert cola.encolar(fila)
+    assert cola.vaciar(timeout=5, fin=True)
+    assert contar() == 7
+    assert not cola._hilo.is_alive()
+    st = cola.estadisticas()
+    assert (st["encoladas"], st["escritas_sqlite"], st["lotes"], st["en_cola"]) == (7, 7, 1, 0)
+
+
+def test_lotes_por_tamano(base_tmp):
+    cola = historico._ColaEscritura(100, lote=3, intervalo_seg=3600, espera_seg=1)
+    for fila in filas(7):
+        cola.encolar(fila)
+    assert cola.vaciar(timeout=5, fin=True)
+    assert contar() == 7
+    assert cola.estadisticas()["lotes"] == 3  # 3 + 3 + el resto al cerrar
+
+
+def test_vaciar_sin_hilo_ni_pendientes(base_tmp):
+    cola = historico._ColaEscritura(10, lote=5, intervalo_seg=1, espera_seg=1)
+    assert cola.vaciar(timeout=0.1, fin=True)
+    assert cola._hilo is None
+
+
+def test_un_lote_fallido_no_mata_el_hilo(base_tmp, monkeypatch):
+    escribir = historico._escribir_filas
+    llamadas = []
+
+    def escribir_fallando_una_vez(lote):
+        llamadas.append(len(lote))
+        if len(llamadas) == 1:
+            raise RuntimeError("fallo inesperado")
+        return escribir(lote)
+
+    monkeypatch.setattr(historico, "_escribir_filas", escribir_fallando_una_vez)
+    cola = historico._ColaEscritura(100, lote=2, intervalo_seg=3600, espera_seg=1)
+    for fila in filas(2):
+        cola.encolar(fila)
+    assert cola.vaciar(timeout=5)
+    assert cola._hilo.is_alive()
+
+    for fila in filas(3):
+        cola.encolar(fila)
+    assert cola.vaciar(timeout=5, fin=True)
+    st = cola.estadisticas()
+    assert (st["perdidas"], st["escritas_sqlite"]) == (2, 3)
+    assert contar() == 3
+
+
+def test_cola_llena_descarta(base_tmp, monkeypatch):
+    cola = historico._ColaEscritura(1, lote=5, intervalo_seg=1, espera_seg=0.01)
+    monkeypatch.setattr(cola, "_arrancar", lambda: None)  # nadie consume la cola
+    uno, dos = filas(2)
+    assert cola.encolar(uno)
+    assert not cola.encolar(dos)
+    assert cola.estadisticas()["descartadas"] == 1
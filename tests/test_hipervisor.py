@@ -0,0 +1,77 @@
+"""
+detectar_hipervisor contra árboles de ficheros simulados (/proc/cpuinfo,
+DMI, /sys/hypervisor, marcas de contenedor), uno por rama.
+
+Uso (desde la raíz del repo):
+    python -m pytest -q tests
+"""
+
+from pathlib import Path
+
+import pytest
+
+from monitor.sistema_local import detectar_hipervisor
+
+CPU_VM = "processor\t: 0\nflags\t\t: fpu vme sse2 hypervisor lahf_lm\n"
+CPU_FISICA = "processor\t: 0\nflags\t\t: fpu vme sse2 lahf_lm\n"
+CPU_ARM = "processor\t: 0\nFeatures\t: fp asimd evtstrm\n"
+
+# caso -> (ficheros, (es_vm, proveedor, confianza, contenedor) esperado)
+ARBOLES = {
+    "kvm": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "QEMU",
+             "sys/class/dmi/id/product_name": "Standard PC (Q35 + ICH9, 2009)"},
+            (True, "KVM/QEMU", "alta", None)),
+    "vmware": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "VMware, Inc.",
+                "sys/class/dmi/id/product_name": "VMware Virtual Platform"},
+               (True, "VMware", "alta", None)),
+    "virtualbox": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "innotek GmbH",
+                    "sys/class/dmi/id/product_name": "VirtualBox"},
+                   (True, "VirtualBox", "alta", None)),
+    "hyper-v": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "Microsoft Corporation",
+                 "sys/class/dmi/id/product_name": "Virtual Machine"},
+                (True, "Hyper-V", "alta", None)),
+    "ec2": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "Amazon EC2"},
+            (True, "Amazon EC2", "alta", None)),
+    "cpuid sin dmi": ({"proc/cpuinfo": CPU_VM}, (True, "desconocido", "alta", None)),
+    "xen pv": ({"proc/cpuinfo": CPU_FISICA, "sys/hypervisor/type": "xen"}, (True, "Xen", "alta", None)),
+    "arm kvm": ({"proc/cpuinfo": CPU_ARM, "sys/class/dmi/id/sys_vendor": "QEMU"}, (True, "KVM/QEMU", "media", None)),
+    "wsl2": ({"proc/cpuinfo": CPU_ARM, "proc/sys/kernel/osrelease": "5.15.90.1-microsoft-standard-WSL2"},
+             (True, "Hyper-V (WSL2)", "baja", None)),
+    "físico": ({"proc/cpuinfo": CPU_FISICA, "sys/class/dmi/id/sys_vendor": "Dell Inc.",
+                "proc/sys/kernel/osrelease": "6.8.0-45-generic"},
+               (False, None, "media", None)),
+    "arm físico": ({"proc/cpuinfo": CPU_ARM, "proc/sys/kernel/osrelease": "6.8.0-rpi"}, (False, None, "baja", None)),
+    "docker en físico": ({"proc/cpuinfo": CPU_FISICA, ".dockerenv": "", "proc/sys/kernel/osrelease": "6.8.0"},
+                         (False, None, "media", "docker")),
+    "podman en kvm": ({"proc/cpuinfo": CPU_VM, "sys/class/dmi/id/sys_vendor": "QEMU", "run/.containerenv": ""},
+                      (True, "KVM/QEMU", "alta", "podman")),
+    "kubernetes": ({"proc/cpuinfo": CPU_VM, "proc/1/cgroup": "0::/kubepods/burstable/pod1234/abcd\n"},
+                   (True, "desconocido", "alta", "kubernetes")),
+    "lxc (systemd)": ({"proc/cpuinfo": CPU_FISICA, "run/systemd/container": "lxc", "proc/sys/kernel/osrelease": "6.8.0"},
+                      (False, None, "media", "lxc")),
+}
+
+
+def crear_arbol(raiz: Path, ficheros: dict) -> None:
+    for ruta, contenido in ficheros.items():
+        destino = raiz / ruta
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(contenido, encoding="utf-8")
+
+
+@pytest.mark.parametrize("caso", list(ARBOLES))
+def test_arbol(tmp_path, caso):
+    ficheros, esperado = ARBOLES[caso]
+    crear_arbol(tmp_path, ficheros)
+    r = detectar_hipervisor(str(tmp_path))
+    assert (r["es_vm"], r["proveedor"], r["confianza"], r["contenedor"]) == esperado
+
+
+def test_resultado_no_compartido(tmp_path):
+    crear_arbol(tmp_path, ARBOLES["kvm"][0])
+    r = detectar_hipervisor(str(tmp_path))
+    r["es_vm"] = False
+    r["fuentes"].append("modificada")
+    otra = detectar_hipervisor(str(tmp_path))
+    assert otra["es_vm"] is True
+    assert "modificada" not in otra["fuentes"]
@@ -0,0 +1,32 @@
+"""
+IndiceClaves contra el bucle anidado original (items x claves con `in`),
+a ambos lados de UMBRAL_TRIE.
+"""
+
+import pytest
+
+from benchmarks.bench_indice_claves import items_sinteticos, mapear_bucle
+from monitor.indice_claves import UMBRAL_TRIE, IndiceClaves
+from monitor.zabbix_client import METRICAS_DIAGNOSTICO, SERVICIOS_CLAVE
+
+BASE = list(METRICAS_DIAGNOSTICO) + list(SERVICIOS_CLAVE)
+
+
+@pytest.mark.parametrize("extra", [0, UMBRAL_TRIE, 100])
+def test_mapear_igual_que_el_bucle(extra):
+    search_keys = BASE + [f'service.info["Srv{i}",state]' for i in range(extra)]
+    items = items_sinteticos(5000, search_keys)
+    indice = IndiceClaves(search_keys)
+    assert indice._bucle == (len(search_keys) < UMBRAL_TRIE)
+    assert indice.mapear(items) == mapear_bucle(items, search_keys)
+
+
+@pytest.mark.parametrize("relleno", [0, UMBRAL_TRIE])
+def test_claves_solapadas_y_vacia(relleno):
+    search_keys = ["system.cpu", "system.cpu.util", "cpu", ""] + [f"x{i}" for i in range(relleno)]
+    indice = IndiceClaves(search_keys)
+    esperadas = {"system.cpu", "system.cpu.util", "cpu", ""}
+    assert set(indice.coincidencias("system.cpu.util[,idle]")) == esperadas
+    assert set(indice.coincidencias("vm.memory")) == {""}
+    items = [{"itemid": "1", "key_": "system.cpu.util"}, {"itemid": "2", "key_": "cpu"}]
+    assert indice.mapear(items) == mapear_bucle(items, search_keys)
@@ -0,0 +1,114 @@
+"""
+Lotes JSON-RPC de ZabbixClient (LoteZabbix / LlamadaLote) contra el Zabbix
+simulado (benchmarks/mock_zabbix.py): a qué llamada va cada error.
+"""
+
+import pytest
+import requests
+
+from benchmarks.mock_zabbix import ServidorZabbixSimulado
+from monitor.cache_resolucion import CacheResolucion
+from monitor.zabbix_client import ZabbixClient
+
+
+@pytest.fixture
+def srv():
+    with ServidorZabbixSimulado(["SIM-1"]) as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def cliente(srv):
+    c = ZabbixClient(srv.url, "token", reintentos=2, backoff_seg=0.001, cache=CacheResolucion(ruta=None))
+    yield c
+    c.cerrar()
+
+
+def test_el_error_de_una_llamada_no_afecta_al_resto(srv, cliente):
+    with cliente.lote() as lote:
+        host = cliente.get_host_id("SIM-1", lote=lote)
+        mala = lote.agregar("host.inventado", {})
+        grupos = lote.agregar("hostgroup.get", {})
+    assert srv.contadores()["peticiones_http"] == 1
+    assert host.resultado == "10000"
+    assert [g["name"] for g in grupos.resultado] == ["Simulados"]
+    with pytest.raises(RuntimeError, match="Method not found"):
+        mala.resultado
+    assert cliente.estadisticas()["lote"]["errores"] == 1
+
+
+def test_host_inexistente_falla_al_leer_el_resultado(cliente):
+    with cliente.lote() as lote:
+        host = cliente.get_host_id("NO-EXISTE", lote=lote)
+    with pytest.raises(ValueError, match="NO-EXISTE"):
+        host.resultado
+
+
+def test_errores_de_api_inyectados(srv, cliente):
+    srv.tasa_error_api = 1.0
+    with cliente.lote() as lote:
+        llamadas = [lote.agregar("host.get", {}) for _ in range(3)]
+    for llamada in llamadas:
+        with pytest.raises(RuntimeError, match="Application error"):
+            llamada.resultado
+    assert cliente.estadisticas()["lote"]["errores"] == 3
+
+
+def test_respuesta_ausente_y_error_de_peticion(cliente, monkeypatch):
+    post = cliente._post
+
+    def sin_la_segunda(payload, etiqueta, reintentable):
+        return [r for r in post(payload, etiqueta, reintentable) if r["id"] != payload[1]["id"]]
+
+    monkeypatch.setattr(cliente, "_post", sin_la_segunda)
+    lote = cliente.lote()
+    primera, segunda = lote.agregar("hostgroup.get", {}), lote.agregar("hostgroup.get", {})
+    lote.enviar()
+    assert primera.resultado
+    with pytest.raises(RuntimeError, match="Respuesta ausente"):
+        segunda.resultado
+
+    # Un objeto en vez de un array (p. ej. JSON inválido): el error es de todas.
+    error = {"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error."}, "id": None}
+    monkeypatch.setattr(cliente, "_post", lambda payload, etiqueta, reintentable: error)
+    lote = cliente.lote()
+    llamadas = [lote.agregar("hostgroup.get", {}) for _ in range(2)]
+    lote.enviar()
+    for llamada in llamadas:
+        with pytest.raises(RuntimeError, match="Parse error"):
+            llamada.resultado
+
+
+def test_http_503_solo_se_reintenta_si_todo_el_lote_es_de_lectura(srv, cliente):
+    srv.tasa_error_http = 1.0
+    lote = cliente.lote()
+    lote.agregar("host.get", {})
+    with pytest.raises(requests.HTTPError):
+        lote.enviar()
+    assert srv.contadores()["peticiones_http"] == 3  # 1 + 2 reintentos
+
+    srv.reiniciar_contadores()
+    lote = cliente.lote()
+    lote.agregar("host.get", {})
+    lote.agregar("host.update", {})
+    with pytest.raises(requests.HTTPError):
+        lote.enviar()
+    assert srv.contadores()["peticiones_http"] == 1
+
+
+def test_resultado_antes_de_enviar_y_bloque_con_excepcion(srv, cliente):
+    with pytest.raises(KeyError):
+        with cliente.lote() as lote:
+            llamada = lote.agregar("host.get", {})
+            with pytest.raises(RuntimeError, match="aún no se ha enviado"):
+                llamada.resultado
+            raise KeyError("fallo en el bloque")
+    assert srv.contadores()["peticiones_http"] == 0  # el lote no se envía
+
+
+def test_la_transformacion_se_aplica_una_vez(cliente):
+    veces = []
+    with cliente.lote() as lote:
+        llamada = lote.agregar("hostgroup.get", {}, transformar=lambda r: veces.append(1) or len(r))
+    assert llamada.resultado == llamada.resultado == 1
+    assert veces == [1]
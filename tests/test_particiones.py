@@ -0,0 +1,121 @@
+"""
+Particionado mensual de mediciones (monitor/particiones.py) contra un
+Postgres real (PG_HOST, PG_USER...): cada test usa una base desechable.
+Se saltan si no hay Postgres accesible.
+"""
+
+import uuid
+from datetime import date, datetime
+
+import psycopg2
+import pytest
+
+from monitor import historico, particiones
+from utils.config import PG_DB, PG_HOST, PG_PASSWORD, PG_PORT, PG_USER
+
+
+def _conectar(dbname: str):
+    return psycopg2.connect(
+        host=PG_HOST, port=int(PG_PORT), dbname=dbname, user=PG_USER, password=PG_PASSWORD or None, connect_timeout=2,
+    )
+
+
+@pytest.fixture
+def cur(monkeypatch):
+    try:
+        admin = _conectar(PG_DB)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"sin Postgres: {e}")
+    admin.autocommit = True
+    nombre = f"diag_test_{uuid.uuid4().hex[:12]}"
+    try:
+        admin.cursor().execute(f"CREATE DATABASE {nombre}")
+    except psycopg2.Error as e:
+        admin.close()
+        pytest.skip(f"no se puede crear una base de prueba: {e}")
+    conn = _conectar(nombre)
+    monkeypatch.setattr(historico, "PG_PARTICIONADO", False)  # se parte de la tabla normal
+    try:
+        historico._asegurar_esquema_pg(conn)
+        yield conn.cursor()
+    finally:
+        conn.close()
+        admin.cursor().execute(f"DROP DATABASE {nombre}")
+        admin.close()
+
+
+def insertar(cur, ts: datetime, hostname="A") -> int:
+    cur.execute(
+        "INSERT INTO mediciones (medicion_id, ts, hostname, cpu_uso) VALUES (%s, %s, %s, 1.0) RETURNING id",
+        (str(uuid.uuid4()), ts, hostname),
+    )
+    return cur.fetchone()[0]
+
+
+def filas_en(cur, tabla: str) -> int:
+    cur.execute(f"SELECT COUNT(*) FROM {tabla}")
+    return cur.fetchone()[0]
+
+
+def test_convertir_copia_mes_a_mes_y_conserva_la_secuencia(cur):
+    ids = [insertar(cur, datetime(2026, m, 10)) for m in (1, 1, 2, 4)]
+    insertar(cur, datetime(2026, 2, 1), hostname=None)
+
+    assert particiones.convertir(cur, conservar=True, progreso=lambda mes, n: None) == 5
+    assert particiones.esta_particionada(cur)
+    meses = particiones.listar(cur)
+    assert {date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1), date(2026, 4, 1)} <= set(meses)
+    assert filas_en(cur, "mediciones_2026_01") == 2
+    assert filas_en(cur, particiones.DEFAULT) == 0
+    assert filas_en(cur, "mediciones_antigua") == 5
+
+    # Mismos ids y la secuencia sigue por donde iba.
+    assert insertar(cur, datetime(2026, 4, 11)) > max(ids)
+    # Idempotencia de historico sobre (medicion_id, ts) en la particionada.
+    cur.execute("SELECT medicion_id, ts FROM mediciones WHERE id = %s", (ids[0],))
+    medicion_id, ts = cur.fetchone()
+    cur.execute(
+        "INSERT INTO mediciones (medicion_id, ts) VALUES (%s, %s) ON CONFLICT (medicion_id, ts) DO NOTHING",
+        (medicion_id, ts),
+    )
+    assert cur.rowcount == 0
+
+
+def test_preparar_convierte_solo_la_tabla_vacia(cur):
+    insertar(cur, datetime(2026, 1, 10))
+    particiones.preparar(cur)
+    assert not particiones.esta_particionada(cur)  # con datos: migrar a mano
+
+    cur.execute("DELETE FROM mediciones")
+    particiones.preparar(cur)
+    assert particiones.esta_particionada(cur)
+    assert date.today().replace(day=1) in particiones.listar(cur)
+
+
+def test_filas_en_default_pasan_a_su_particion(cur):
+    particiones.convertir(cur)
+    insertar(cur, datetime(2019, 5, 3))  # mes sin partición
+    assert filas_en(cur, particiones.DEFAULT) == 1
+
+    assert "mediciones_2019_05" in particiones.mantener(cur)
+    assert filas_en(cur, particiones.DEFAULT) == 0
+    assert filas_en(cur, "mediciones_2019_05") == 1
+
+
+def test_purgar_solo_meses_vencidos_y_agregados(cur):
+    particiones.convertir(cur)
+    for d in (1, 2):
+        insertar(cur, datetime(2020, 1, d))
+    insertar(cur, datetime(2020, 2, 1), hostname=None)  # los rollups no la agregan
+    marzo = insertar(cur, datetime(2020, 3, 1))
+    insertar(cur, datetime(2020, 4, 1))
+    particiones.mantener(cur)
+
+    # Febrero tiene filas sin host; marzo y abril aún no están agregados.
+    borradas = particiones.purgar(cur, datetime(2020, 5, 1), agregado_hasta=marzo - 1)
+    assert borradas == ["mediciones_2020_01"]
+    assert date(2020, 2, 1) in particiones.listar(cur)
+    assert filas_en(cur, "mediciones") == 3
+
+    # Abril tampoco está agregado: ahí se para.
+    assert particiones.purgar(cur, datetime(2020, 5, 1), agregado_hasta=marzo) == ["mediciones_2020_03"]
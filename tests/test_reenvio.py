@@ -0,0 +1,111 @@
+"""
+Spool salida_pg y reenvío a Postgres (_Reenvio) contra un Postgres falso
+(ver conftest.PgFalso): filas rechazadas por sus datos, errores que
+afectan a todo el lote e interruptor.
+"""
+
+import time
+import uuid
+
+from psycopg2 import errors
+
+from monitor import historico
+
+
+def filas(n: int, hostname: str = "A") -> list[tuple]:
+    return [historico._fila_medicion({"hostname": hostname}, medicion_id=str(uuid.uuid4())) for _ in range(n)]
+
+
+def contar(tabla: str) -> int:
+    return historico._base_sqlite.lector().execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+
+def reenvio_sin_hilo(monkeypatch, lote: int = 100) -> historico._Reenvio:
+    r = historico._Reenvio(lote, espera_seg=3600)
+    monkeypatch.setattr(r, "_arrancar", lambda: None)  # el reenvío se lanza a mano
+    return r
+
+
+def test_fila_envenenada_se_aparta(pg_falso, monkeypatch):
+    r = reenvio_sin_hilo(monkeypatch)
+    lote = filas(3)
+    pg_falso.veneno.add(lote[1][0])
+
+    assert r.escribir(lote) == "escritas_pg"
+    assert [f[0] for f in pg_falso.filas] == [lote[0][0], lote[2][0]]
+    apartadas = historico._base_sqlite.lector().execute(
+        "SELECT medicion_id, error FROM salida_pg_rechazadas"
+    ).fetchall()
+    assert [a[0] for a in apartadas] == [lote[1][0]]
+    assert apartadas[0][1].startswith("InvalidTextRepresentation")
+    assert contar("salida_pg") == 0
+    assert r.estadisticas()["rechazadas_pg"] == 1
+
+
+def test_fila_envenenada_en_el_spool_no_bloquea(pg_falso, monkeypatch):
+    r = reenvio_sin_hilo(monkeypatch)
+    lote = filas(5)
+    historico._guardar_filas_sqlite(lote, al_spool=True)
+    pg_falso.veneno.add(lote[2][0])
+
+    assert r.reenviar_lote()
+    assert contar("salida_pg") == 0
+    assert contar("salida_pg_rechazadas") == 1
+    assert len(pg_falso.filas) == 4
+    assert r.estadisticas()["reenviadas"] == 4
+
+
+def test_solo_lectura_queda_en_spool_y_abre_el_interruptor(pg_falso, monkeypatch):
+    # Lo que devuelve Postgres tras un failover a una réplica: no es culpa de la fila.
+    pg_falso.error = errors.ReadOnlySqlTransaction("cannot execute INSERT in a read-only transaction")
+    r = reenvio_sin_hilo(monkeypatch)
+    lote = filas(3)
+
+    assert r.escribir(lote) == "al_spool"
+    assert contar("salida_pg") == 3
+    assert contar("mediciones") == 3
+    assert contar("salida_pg_rechazadas") == 0
+
+    assert not r.reenviar_lote()
+    assert not r.reenviar_lote()
+    assert pg_falso.interruptor.estado == "abierto"
+    assert contar("salida_pg") == 3
+
+
+def test_permisos_y_tabla_ausente_cuentan_como_caida(pg_falso, monkeypatch):
+    r = reenvio_sin_hilo(monkeypatch)
+    for error in (errors.InsufficientPrivilege("permission denied"), errors.UndefinedTable("no existe")):
+        pg_falso.error = error
+        assert r.escribir(filas(1)) == "al_spool"
+    assert contar("salida_pg_rechazadas") == 0
+    assert contar("salida_pg") == 2
+
+
+def test_reenvio_tras_recuperarse(pg_falso, monkeypatch):
+    pg_falso.interruptor = historico._Interruptor(1, 0.05)
+    pg_falso.error = errors.ReadOnlySqlTransaction("read-only")
+    r = reenvio_sin_hilo(monkeypatch, lote=2)
+    lote = filas(5)
+    assert r.escribir(lote) == "al_spool"
+    assert pg_falso.interruptor.estado == "abierto"
+    assert not r.reenviar_lote()  # interruptor abierto: ni se intenta
+
+    pg_falso.error = None
+    time.sleep(0.1)
+    while r.estadisticas()["en_spool"] or contar("salida_pg"):
+        assert r.reenviar_lote()
+    assert [f[0] for f in pg_falso.filas] == [f[0] for f in lote]  # en orden
+    assert r.estadisticas()["reenviadas"] == 5
+    assert pg_falso.interruptor.estado == "cerrado"
+
+
+def test_con_spool_las_filas_nuevas_no_se_adelantan(pg_falso, monkeypatch):
+    r = reenvio_sin_hilo(monkeypatch)
+    antiguas = filas(2)
+    historico._guardar_filas_sqlite(antiguas, al_spool=True)
+    nuevas = filas(1)
+
+    assert r.escribir(nuevas) == "al_spool"
+    assert pg_falso.filas == []
+    assert r.reenviar_lote()
+    assert [f[0] for f in pg_falso.filas] == [f[0] for f in antiguas + nuevas]
@@ -0,0 +1,105 @@
+"""
+Rollups del histórico (monitor/rollups.py) sobre un SQLite temporal:
+marca de agua, repaso de los ids ya agregados y retención del crudo.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from monitor import historico, rollups
+
+AHORA = datetime(2026, 10, 17, 12, 0, 0)
+
+
+def insertar(ts: datetime, cpu: float, hostname="A", id_=None) -> None:
+    """Fila cruda mínima; con id_ se fija el id (p. ej. una fila confirmada tarde)."""
+    historico._base_sqlite.ejecutar(
+        "INSERT INTO mediciones (id, medicion_id, ts, hostname, cpu_uso) VALUES (?, ?, ?, ?, ?)",
+        (id_, str(uuid.uuid4()), ts.isoformat(timespec="seconds"), hostname, cpu),
+    )
+
+
+def cubeta_1m(ts: datetime, hostname="A"):
+    return historico._base_sqlite.lector().execute(
+        "SELECT muestras, cpu_uso_avg FROM mediciones_1m WHERE hostname = ? AND cubeta = ?",
+        (hostname, ts.replace(second=0).isoformat(timespec="seconds")),
+    ).fetchone()
+
+
+def contar_crudo() -> int:
+    return historico._base_sqlite.lector().execute("SELECT COUNT(*) FROM mediciones").fetchone()[0]
+
+
+def test_incremental_recalcula_la_cubeta(base_tmp):
+    t = AHORA - timedelta(minutes=5)
+    insertar(t, 10.0)
+    insertar(t + timedelta(seconds=10), 20.0)
+    r = rollups.ejecutar_rollups(AHORA)["sqlite"]
+    assert r["procesadas"] == {"1m": 2, "1h": 2, "1d": 2}
+    assert cubeta_1m(t) == (2, 15.0)
+
+    insertar(t + timedelta(seconds=20), 60.0)
+    r = rollups.ejecutar_rollups(AHORA)["sqlite"]
+    assert r["procesadas"]["1m"] == 1
+    assert cubeta_1m(t) == (3, 30.0)
+
+    assert rollups.ejecutar_rollups(AHORA)["sqlite"]["procesadas"]["1m"] == 0
+
+
+def test_filas_sin_hostname_no_se_agregan(base_tmp):
+    t = AHORA - timedelta(minutes=5)
+    insertar(t, 10.0, hostname=None)
+    rollups.ejecutar_rollups(AHORA)
+    assert historico._base_sqlite.lector().execute("SELECT COUNT(*) FROM mediciones_1m").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize("solape, esperado", [(0, (1, 10.0)), (10, (2, 50.0))])
+def test_fila_confirmada_por_debajo_de_la_marca(base_tmp, monkeypatch, solape, esperado):
+    # Como en Postgres: el id 2 se reservó antes que el 3 pero se confirma después.
+    monkeypatch.setattr(rollups, "_solape", lambda b: solape)
+    t = AHORA - timedelta(minutes=5)
+    insertar(t, 10.0, id_=1)
+    insertar(t - timedelta(hours=3), 0.0, id_=3)
+    rollups.ejecutar_rollups(AHORA)
+
+    insertar(t + timedelta(seconds=5), 90.0, id_=2)
+    r = rollups.ejecutar_rollups(AHORA)["sqlite"]
+    assert r["procesadas"]["1m"] == 0  # el solape no cuenta como filas nuevas
+    assert cubeta_1m(t) == esperado
+
+
+def test_retencion_crudo_solo_lo_agregado(base_tmp, monkeypatch):
+    monkeypatch.setattr(rollups, "RETENCION_CRUDO_DIAS", 7)
+    viejo = AHORA - timedelta(days=10)
+    for i in range(3):
+        insertar(viejo + timedelta(minutes=i), 10.0)
+    insertar(viejo, 10.0, hostname=None)  # anterior al histórico multi-host
+    rollups.ejecutar_rollups(AHORA)
+    assert contar_crudo() == 1  # solo queda la fila sin hostname
+    assert cubeta_1m(viejo) == (1, 10.0)  # los agregados se conservan
+
+    # Filas viejas que llegan después de la pasada: no se borran sin agregar.
+    monkeypatch.setattr(rollups, "_agregar_nivel", lambda b, nivel, hasta_id: 0)
+    insertar(viejo + timedelta(minutes=10), 10.0)
+    rollups.ejecutar_rollups(AHORA)
+    assert contar_crudo() == 2
+
+
+def test_retencion_respeta_el_solape(base_tmp, monkeypatch):
+    monkeypatch.setattr(rollups, "RETENCION_CRUDO_DIAS", 7)
+    monkeypatch.setattr(rollups, "_solape", lambda b: 2)
+    viejo = AHORA - timedelta(days=10)
+    for i in range(5):
+        insertar(viejo + timedelta(minutes=i), 10.0)
+    rollups.ejecutar_rollups(AHORA)
+    assert contar_crudo() == 2  # los 2 últimos ids pueden volver a agregarse
+
+
+def test_sin_retencion_del_crudo_no_se_borra(base_tmp, monkeypatch):
+    monkeypatch.setattr(rollups, "RETENCION_CRUDO_DIAS", 0)
+    viejo = AHORA - timedelta(days=3000)
+    insertar(viejo, 10.0)
+    rollups.ejecutar_rollups(AHORA)
+    assert contar_crudo() == 1
@@ -0,0 +1,28 @@
+"""
+Escritura de ficheros auxiliares en reportes/ (cachés en disco).
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+def guardar_json_atomico(ruta: Path, data) -> bool:
+    """
+    Escribe `data` como JSON en un temporal junto a `ruta` y lo renombra
+    encima (os.replace): quien lea ve el fichero anterior o el nuevo,
+    nunca uno a medias. Devuelve False si no se pudo escribir; las cachés
+    en disco son opcionales y el llamador sigue con la de memoria.
+    """
+    tmp = ruta.with_name(f"{ruta.name}.{os.getpid()}.tmp")
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, ruta)
+    except OSError:
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+    return True
@@ -20,3 +20,100 @@ PG_PASSWORD = os.getenv("PG_PASSWORD", "")
 
 NETDATA_URL = os.getenv("NETDATA_URL", "http://localhost:19999")
 NETDATA_ENABLED = os.getenv("NETDATA_ENABLED", "false").lower() == "true"
+
+# Cliente HTTP de Zabbix
+ZABBIX_POOL_SIZE = int(os.getenv("ZABBIX_POOL_SIZE", "10"))
+ZABBIX_CONNECT_TIMEOUT = float(os.getenv("ZABBIX_CONNECT_TIMEOUT", "3"))
+ZABBIX_READ_TIMEOUT = float(os.getenv("ZABBIX_READ_TIMEOUT", "10"))
+ZABBIX_REINTENTOS = int(os.getenv("ZABBIX_REINTENTOS", "3"))
+ZABBIX_BACKOFF_SEG = float(os.getenv("ZABBIX_BACKOFF_SEG", "0.2"))
+ZABBIX_CACHE_TTL = float(os.getenv("ZABBIX_CACHE_TTL", "3600"))  # segundos; 0 = sin caché
+ZABBIX_MODO_VALORES = os.getenv("ZABBIX_MODO_VALORES", "lastvalue")  # lastvalue | history
+ZABBIX_MAX_ANTIGUEDAD_SEG = float(os.getenv("ZABBIX_MAX_ANTIGUEDAD_SEG", "600"))
+
+# Hardware local: lo estático se lee una vez por arranque (reportes/cache_hardware.json)
+SISTEMA_LOCAL_CACHE = os.getenv("SISTEMA_LOCAL_CACHE", "true").lower() == "true"
+
+# Muestreo local en segundo plano (monitor/sistema_local.py, MuestreadorLocal)
+MUESTREO_ENABLED = os.getenv("MUESTREO_ENABLED", "true").lower() == "true"
+MUESTREO_INTERVALO_SEG = float(os.getenv("MUESTREO_INTERVALO_SEG", "1"))
+MUESTREO_CAPACIDAD = int(os.getenv("MUESTREO_CAPACIDAD", "3600"))  # muestras por serie
+MUESTREO_MAX_CPU_PCT = float(os.getenv("MUESTREO_MAX_CPU_PCT", "1"))  # % de un núcleo; por encima se alarga el intervalo
+MUESTREO_VENTANA_SEG = float(os.getenv("MUESTREO_VENTANA_SEG", "300"))  # ventana del reconocimiento y los informes
+
+# Procesos locales con más CPU/RAM (monitor/procesos.py)
+PROCESOS_ENABLED = os.getenv("PROCESOS_ENABLED", "true").lower() == "true"
+PROCESOS_TOP_N = int(os.getenv("PROCESOS_TOP_N", "5"))
+PROCESOS_INTERVALO_SEG = float(os.getenv("PROCESOS_INTERVALO_SEG", "0.5"))  # entre las dos fotos de CPU
+PROCESOS_MAX_ANTIGUEDAD_SEG = float(os.getenv("PROCESOS_MAX_ANTIGUEDAD_SEG", "30"))  # reusar el barrido anterior
+
+# reconocimiento_inicial(): fases en paralelo (segundos)
+RECONOCIMIENTO_PLAZO_SEG = float(os.getenv("RECONOCIMIENTO_PLAZO_SEG", "10"))  # plazo total
+RECONOCIMIENTO_TIMEOUT_FASE_SEG = float(os.getenv("RECONOCIMIENTO_TIMEOUT_FASE_SEG", "8"))  # por fase
+
+# Diagnóstico de flota (muchos hosts)
+ZABBIX_FLOTA_CONCURRENCIA = int(os.getenv("ZABBIX_FLOTA_CONCURRENCIA", "8"))
+ZABBIX_FLOTA_BLOQUE = int(os.getenv("ZABBIX_FLOTA_BLOQUE", "50"))  # hosts por petición
+ZABBIX_FLOTA_TIMEOUT = float(os.getenv("ZABBIX_FLOTA_TIMEOUT", "30"))  # segundos por host
+
+# Recomendaciones según tendencias horarias de Zabbix (trend.get)
+TENDENCIAS_ENABLED = os.getenv("TENDENCIAS_ENABLED", "true").lower() == "true"
+TENDENCIAS_VENTANAS_DIAS = tuple(
+    int(d) for d in os.getenv("TENDENCIAS_VENTANAS_DIAS", "7,30,90").split(",") if d.strip()
+)
+TENDENCIAS_VENTANA_DECISION = int(os.getenv("TENDENCIAS_VENTANA_DECISION", "30"))
+TENDENCIAS_CACHE_TTL = float(os.getenv("TENDENCIAS_CACHE_TTL", "3600"))
+
+# Pool de conexiones PostgreSQL (histórico)
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "5"))
+PG_POOL_CHEQUEO_SEG = float(os.getenv("PG_POOL_CHEQUEO_SEG", "30"))  # validar conexiones ociosas más que esto
+
+# SQLite local del histórico (fallback)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()  # OFF / NORMAL / FULL
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "8192"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "64"))
+
+# Cola de escritura del histórico (write-behind)
+HISTORICO_ASINCRONO = os.getenv("HISTORICO_ASINCRONO", "true").lower() == "true"
+HISTORICO_COLA_MAX = int(os.getenv("HISTORICO_COLA_MAX", "10000"))
+HISTORICO_LOTE = int(os.getenv("HISTORICO_LOTE", "500"))
+HISTORICO_FLUSH_SEG = float(os.getenv("HISTORICO_FLUSH_SEG", "1"))
+HISTORICO_COLA_ESPERA_SEG = float(os.getenv("HISTORICO_COLA_ESPERA_SEG", "0.2"))  # espera máx. con la cola llena
+
+# Postgres caído: timeout de conexión, circuit breaker y reenvío del spool
+PG_CONNECT_TIMEOUT = int(os.getenv("PG_CONNECT_TIMEOUT", "3"))
+PG_INTERRUPTOR_FALLOS = int(os.getenv("PG_INTERRUPTOR_FALLOS", "3"))
+PG_INTERRUPTOR_SEG = float(os.getenv("PG_INTERRUPTOR_SEG", "30"))
+PG_REENVIO_LOTE = int(os.getenv("PG_REENVIO_LOTE", "1000"))
+PG_REENVIO_SEG = float(os.getenv("PG_REENVIO_SEG", "5"))
+
+# mediciones de Postgres particionada por mes (monitor/particiones.py)
+PG_PARTICIONADO = os.getenv("PG_PARTICIONADO", "false").lower() == "true"
+PG_PARTICIONES_FUTURAS = int(os.getenv("PG_PARTICIONES_FUTURAS", "3"))  # meses creados por adelantado
+
+# Resúmenes incrementales del histórico (obtener_resumen sin consultar la base)
+HISTORICO_RESUMEN_INCREMENTAL = os.getenv("HISTORICO_RESUMEN_INCREMENTAL", "true").lower() == "true"
+HISTORICO_VENTANA_RESUMEN = int(os.getenv("HISTORICO_VENTANA_RESUMEN", "20"))  # filas en la ventana circular
+HISTORICO_EWMA_ALFA = float(os.getenv("HISTORICO_EWMA_ALFA", "0.2"))
+
+# Rollups 1m/1h/1d del histórico y retención (días; 0 = sin límite)
+ROLLUP_INTERVALO_SEG = float(os.getenv("ROLLUP_INTERVALO_SEG", "60"))
+ROLLUP_LOTE_FILAS = int(os.getenv("ROLLUP_LOTE_FILAS", "50000"))
+ROLLUP_SOLAPE_IDS = int(os.getenv("ROLLUP_SOLAPE_IDS", "10000"))  # Postgres: ids ya agregados que se repasan
+ROLLUP_PURGA_LOTE = int(os.getenv("ROLLUP_PURGA_LOTE", "5000"))
+ROLLUP_PURGA_MAX_LOTES = int(os.getenv("ROLLUP_PURGA_MAX_LOTES", "20"))
+ROLLUP_MAX_PUNTOS = int(os.getenv("ROLLUP_MAX_PUNTOS", "1000"))
+RETENCION_CRUDO_DIAS = int(os.getenv("RETENCION_CRUDO_DIAS", "0"))  # el crudo no se borra salvo que se pida
+RETENCION_1M_DIAS = int(os.getenv("RETENCION_1M_DIAS", "30"))
+RETENCION_1H_DIAS = int(os.getenv("RETENCION_1H_DIAS", "365"))
+RETENCION_1D_DIAS = int(os.getenv("RETENCION_1D_DIAS", "0"))
+
+# Estadísticas de capacidad del histórico (monitor/analitica.py)
+ANALITICA_SQL = os.getenv("ANALITICA_SQL", "true").lower() == "true"  # en Postgres, calcular en la base
+ANALITICA_MAX_HUECO_SEG = float(os.getenv("ANALITICA_MAX_HUECO_SEG", "300"))  # tope por muestra del tiempo sobre umbral
+
+# Backfill del historial de Zabbix en mediciones (python -m monitor.backfill)
+BACKFILL_CONCURRENCIA = int(os.getenv("BACKFILL_CONCURRENCIA", "4"))
+BACKFILL_VENTANA_SEG = int(os.getenv("BACKFILL_VENTANA_SEG", "86400"))  # unidad de trabajo y de checkpoint
+BACKFILL_PASO_SEG = int(os.getenv("BACKFILL_PASO_SEG", "60"))  # una fila por host cada tanto
@@ -6,6 +6,7 @@ Exportación de diagnósticos a CSV y preparación para PDF.
 import csv
 import json
 from datetime import datetime
+from html import escape
 from pathlib import Path
 from typing import Dict, Any, List
 
@@ -14,6 +15,30 @@ def _timestamp_iso() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+# Series del muestreo local (monitor/sistema_local.py): nombre, divisor, unidad.
+_SERIES_MUESTREO = {
+    "cpu_pct": ("CPU", 1, "%"),
+    "cpu_nucleo_max_pct": ("CPU núcleo más cargado", 1, "%"),
+    "ram_pct": ("RAM", 1, "%"),
+    "swap_pct": ("Swap usada", 1, "%"),
+    "disco_lectura_bps": ("Disco lectura", 1024 ** 2, "MB/s"),
+    "disco_escritura_bps": ("Disco escritura", 1024 ** 2, "MB/s"),
+    "red_rx_bps": ("Red recibido", 1024 ** 2, "MB/s"),
+    "red_tx_bps": ("Red enviado", 1024 ** 2, "MB/s"),
+}
+
+
+def _filas_muestreo(diag: Dict[str, Any]) -> List[tuple]:
+    """(nombre, unidad, min, media, máx, p95) de cada serie con datos."""
+    filas = []
+    for serie, est in diag.get("muestreo_local", {}).get("series", {}).items():
+        if not est or serie not in _SERIES_MUESTREO:
+            continue
+        nombre, divisor, unidad = _SERIES_MUESTREO[serie]
+        filas.append((nombre, unidad, *(est[k] / divisor for k in ("min", "avg", "max", "p95"))))
+    return filas
+
+
 def exportar_diagnostico_csv(diag: Dict[str, Any], ruta_salida: str = None) -> str:
     """
     Exporta un diagnóstico (dict) a CSV.
@@ -46,6 +71,11 @@ def exportar_diagnostico_csv(diag: Dict[str, Any], ruta_salida: str = None) -> s
         es_vm = info.get("es_vm", False)
         tipo = "Máquina Virtual" if es_vm else "Sistema Físico"
         filas.append(["SISTEMA LOCAL", "Tipo de sistema", tipo, "", "OK", ""])
+        if es_vm:
+            filas.append(["SISTEMA LOCAL", "Hipervisor", info.get("hipervisor") or "-", "",
+                          f"confianza {info.get('hipervisor_confianza', '-')}", ""])
+        if info.get("contenedor"):
+            filas.append(["SISTEMA LOCAL", "Contenedor", info["contenedor"], "", "OK", ""])
 
         cores_l = info.get("cpu_cores_logicos", "-")
         filas.append(["SISTEMA LOCAL", "CPUs (lógicos)", cores_l, "núcleos", "OK", ""])
@@ -117,6 +147,22 @@ def exportar_diagnostico_csv(diag: Dict[str, Any], ruta_salida: str = None) -> s
             )
 
 
+    # Sección: Muestreo local (picos entre refrescos)
+    for nombre, unidad, minimo, media, maximo, p95 in _filas_muestreo(diag):
+        filas.append([
+            "MUESTREO LOCAL", nombre,
+            f"mín {minimo:.1f} / media {media:.1f} / máx {maximo:.1f} / p95 {p95:.1f}", unidad, "", "",
+        ])
+
+    # Sección: Procesos locales con más consumo
+    top = diag.get("procesos_top", {})
+    for recurso, campo in (("cpu", "cpu_pct"), ("ram", "ram_pct")):
+        for e in top.get(recurso, []):
+            filas.append([
+                f"PROCESOS TOP {recurso.upper()}", f"{e['nombre']} (pid {e['pid']}, {e['usuario']})",
+                f"{e[campo]:.1f}" if e[campo] is not None else "-", "%", "", "",
+            ])
+
     # Sección: Recomendaciones de capacidad (VM vs host)
     recs = diag.get("recomendaciones", [])
     if recs:
@@ -256,6 +302,11 @@ def generar_html_diagnostico(diag: Dict[str, Any], titulo: str = "Diagnóstico d
         es_vm = info.get("es_vm", False)
         tipo = "Máquina Virtual" if es_vm else "Sistema Físico"
         html += f"<tr><td>Tipo de Sistema</td><td>{tipo}</td></tr>\n"
+        if es_vm:
+            html += (f"<tr><td>Hipervisor</td><td>{info.get('hipervisor') or '-'} "
+                     f"(confianza {info.get('hipervisor_confianza', '-')})</td></tr>\n")
+        if info.get("contenedor"):
+            html += f"<tr><td>Contenedor</td><td>{info['contenedor']}</td></tr>\n"
         
         html += f"<tr><td>CPUs (lógicos)</td><td>{info.get('cpu_cores_logicos', '-')}</td></tr>\n"
         html += f"<tr><td>CPUs (físicos)</td><td>{info.get('cpu_cores_fisicos', '-')}</td></tr>\n"
@@ -288,7 +339,8 @@ def generar_html_diagnostico(diag: Dict[str, Any], titulo: str = "Diagnóstico d
         if motivos_estado:
             html += "<ul>\n"
             for m in motivos_estado:
-                html += f"<li>{m}</li>\n"
+                # Pueden citar nombres de procesos locales.
+                html += f"<li>{escape(m)}</li>\n"
             html += "</ul>\n"
 
         html += """
@@ -385,6 +437,56 @@ def generar_html_diagnostico(diag: Dict[str, Any], titulo: str = "Diagnóstico d
             html += f"<li>RAM usada en la VM (promedio últimos 60 s): {netdata['ram_uso_pct']:.1f} %</li>\n"
         html += "</ul>\n"
 
+    # Sección: Muestreo local
+    filas_muestreo = _filas_muestreo(diag)
+    if filas_muestreo:
+        minutos = diag["muestreo_local"]["ventana_seg"] / 60
+        html += f"""
+        <h2>Muestreo local (últimos {minutos:.0f} min)</h2>
+        <table>
+            <tr>
+                <th>Métrica</th>
+                <th>Mín</th>
+                <th>Media</th>
+                <th>Máx</th>
+                <th>p95</th>
+            </tr>
+"""
+        for nombre, unidad, minimo, media, maximo, p95 in filas_muestreo:
+            html += (
+                f"<tr><td>{nombre} ({unidad})</td><td>{minimo:.1f}</td><td>{media:.1f}</td>"
+                f"<td>{maximo:.1f}</td><td>{p95:.1f}</td></tr>\n"
+            )
+        html += """
+        </table>
+"""
+
+    # Sección: Procesos locales con más consumo
+    top = diag.get("procesos_top", {})
+    if top.get("cpu") or top.get("ram"):
+        html += f"""
+        <h2>Procesos locales con más consumo ({top['procesos']} procesos)</h2>
+        <table>
+            <tr>
+                <th>Top</th>
+                <th>Proceso</th>
+                <th>PID</th>
+                <th>Usuario</th>
+                <th>CPU</th>
+                <th>RAM</th>
+            </tr>
+"""
+        for recurso in ("cpu", "ram"):
+            for e in top.get(recurso, []):
+                ram = f"{e['rss_bytes'] / 1024 ** 2:.0f} MB ({e['ram_pct']:.1f} %)" if e["ram_pct"] is not None else "-"
+                html += (
+                    f"<tr><td>{recurso.upper()}</td><td>{escape(e['nombre'])}</td><td>{e['pid']}</td>"
+                    f"<td>{escape(e['usuario'])}</td><td>{e['cpu_pct']:.1f} %</td><td>{ram}</td></tr>\n"
+                )
+        html += """
+        </table>
+"""
+
     # Sección: Resumen histórico
     resumen = diag.get("resumen", {})
     if resumen and resumen.get("muestras"):